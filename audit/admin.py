@@ -1,17 +1,98 @@
-from django.contrib import admin
-from .models import AuditLog
+from itertools import islice
+
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.auth import get_user_model
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from .models import AuditDailySummary, AuditLog
+from .query import filters_from_params
+from .segments import SegmentReader
+
+SEGMENT_PAGE_SIZE = 50
 
 
 @admin.register(AuditLog)
 class AuditLogAdmin(admin.ModelAdmin):
     list_display = ('action', 'actor', 'target_model', 'target_repr', 'created_at')
-    list_filter = ('action', 'actor')
-    search_fields = ('target_model', 'target_repr')
+    list_select_related = ('actor',)
+    # Indexed filters only: an actor filter lists every user and a LIKE on
+    # target_repr scans the log. users.views.audit_list filters by actor and time.
+    list_filter = ('action', 'target_model')
+    search_fields = ('=target_model',)
+    # skip the unfiltered COUNT(*) on every changelist page
+    show_full_result_count = False
     readonly_fields = ('actor', 'action', 'target_model', 'target_repr', 'details', 'created_at')
 
+    change_list_template = 'admin/audit/auditlog/change_list.html'
+
     def has_add_permission(self, request):
         # prevent manual creation via admin UI
         return False
+
+    def changelist_view(self, request, extra_context=None):
+        # the table stays empty while audit.sink writes to segment files
+        if settings.AUDIT_BACKEND == 'segments':
+            return redirect('admin:audit_auditlog_segments')
+        return super().changelist_view(request, extra_context)
+
+    def get_urls(self):
+        return [
+            path('segments/', self.admin_site.admin_view(self.segments_view), name='audit_auditlog_segments'),
+        ] + super().get_urls()
+
+    def segments_view(self, request):
+        """Newest-first pages of the segment store (AUDIT_BACKEND = 'segments'), read through mmap."""
+        try:
+            filters = filters_from_params(request.GET)
+        except ValueError as exc:
+            self.message_user(request, str(exc), messages.ERROR)
+            filters = {}
+        before = request.GET.get('before')
+        with SegmentReader(settings.AUDIT_SEGMENT_DIR) as reader:
+            total = len(reader)
+            entries = list(islice(
+                reader.entries(before=int(before) if before and before.isdigit() else None, **filters),
+                SEGMENT_PAGE_SIZE + 1,
+            ))
+        more = len(entries) > SEGMENT_PAGE_SIZE
+        entries = entries[:SEGMENT_PAGE_SIZE]
+        actors = get_user_model().objects.in_bulk({entry.actor_id for entry in entries if entry.actor_id})
+        for entry in entries:
+            entry.actor = actors.get(entry.actor_id)
+
+        params = request.GET.copy()
+        params.pop('before', None)
+        return TemplateResponse(request, 'admin/audit/auditlog/segments.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Audit segment store',
+            'opts': self.model._meta,
+            'entries': entries,
+            'total': total,
+            'next_before': entries[-1].seq if more else None,
+            'filters': {key: request.GET.get(key, '') for key in ('since', 'until', 'action', 'model', 'actor')},
+            'actions': AuditLog.ACTION_CHOICES,
+            'query': params.urlencode(),
+        })
 from django.contrib import admin
 
 # Register your models here.
+
+
+@admin.register(AuditDailySummary)
+class AuditDailySummaryAdmin(admin.ModelAdmin):
+    """Per-day counts left behind by ``compact_audit``; ``compact_audit --rehydrate`` reads a day's entries back."""
+    list_display = ('day', 'action', 'target_model', 'actor', 'count')
+    list_select_related = ('actor',)
+    list_filter = ('action', 'target_model')
+    date_hierarchy = 'day'
+    show_full_result_count = False
+    readonly_fields = ('day', 'action', 'target_model', 'actor', 'count')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,165 @@
+"""Roll old audit entries into daily summaries and gzipped archive files.
+
+``compact`` takes the entries older than a cutoff one local day at a time,
+oldest first, in chunks of ``chunk_size``. Each chunk is appended to the
+day's archive, ``AUDIT_ARCHIVE_DIR/YYYY/MM/YYYY-MM-DD.jsonl.gz``, as its
+own gzip member and fsynced. Only then, in one transaction, are its counts
+added to ``AuditDailySummary`` (per action, target model and actor) and
+its rows deleted. A crash between the two leaves the chunk in the file and
+in the table; the next run archives it again and counts it once, and
+``rehydrate_day`` drops the duplicate lines by id.
+
+``rehydrate_day`` reads a day back as unsaved ``AuditLog`` instances with
+their original ids and timestamps.
+"""
+import gzip
+import json
+import os
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import AuditDailySummary, AuditLog
+from .query import EXPORT_FIELDS
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to an in-process lock only
+    fcntl = None
+
+LOCK_NAME = '.compact.lock'
+_thread_lock = threading.Lock()
+
+
+def archive_dir():
+    return Path(settings.AUDIT_ARCHIVE_DIR)
+
+
+def archive_path(day, directory=None):
+    return Path(directory or archive_dir()) / f'{day:%Y}' / f'{day:%m}' / f'{day.isoformat()}.jsonl.gz'
+
+
+def archived_days(directory=None):
+    """The days that have an archive file, oldest first."""
+    return sorted(
+        datetime.strptime(path.name.split('.')[0], '%Y-%m-%d').date()
+        for path in Path(directory or archive_dir()).glob('*/*/*.jsonl.gz')
+    )
+
+
+def day_start(day):
+    """Aware start of local ``day``."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def cutoff_for(days, now=None):
+    """Start of the local day ``days`` days before today; compaction takes whole days only."""
+    return day_start(timezone.localdate(now) - timedelta(days=days))
+
+
+@contextmanager
+def _lock(directory):
+    # one compaction at a time, or two runs would count the same chunk twice
+    with _thread_lock:
+        directory.mkdir(parents=True, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(directory / LOCK_NAME, 'w') as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def row_line(row):
+    """One JSON line for a dict of ``EXPORT_FIELDS``."""
+    # isoformat keeps the microseconds DjangoJSONEncoder would drop
+    return json.dumps({**row, 'created_at': row['created_at'].isoformat()}, cls=DjangoJSONEncoder) + '\n'
+
+
+def _append_archive(path, rows):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lines = ''.join(row_line(row) for row in rows)
+    with open(path, 'ab') as fh:
+        fh.write(gzip.compress(lines.encode()))
+        fh.flush()
+        os.fsync(fh.fileno())
+
+
+def _add_to_summary(day, rows):
+    counts = Counter((row['action'], row['target_model'], row['actor_id']) for row in rows)
+    for (action, target_model, actor_id), n in counts.items():
+        updated = AuditDailySummary.objects.filter(
+            day=day, action=action, target_model=target_model, actor_id=actor_id,
+        ).update(count=F('count') + n)
+        if not updated:
+            AuditDailySummary.objects.create(
+                day=day, action=action, target_model=target_model, actor_id=actor_id, count=n,
+            )
+
+
+def pending(cutoff):
+    """Entries ``compact(cutoff)`` would move."""
+    return AuditLog.objects.filter(created_at__lt=cutoff)
+
+
+def compact(cutoff, chunk_size=None, directory=None, progress=None):
+    """Summarise, archive and delete every entry created before ``cutoff``.
+
+    Returns ``(days, entries)``. ``progress(day, entries)`` is called after
+    each day.
+    """
+    chunk_size = chunk_size or settings.AUDIT_COMPACT_CHUNK_SIZE
+    directory = Path(directory or archive_dir())
+    days = entries = 0
+    with _lock(directory):
+        while True:
+            oldest = pending(cutoff).order_by('created_at', 'id').values_list('created_at', flat=True).first()
+            if oldest is None:
+                return days, entries
+            day = timezone.localdate(oldest)
+            # the oldest entry is on ``day``, so oldest-first chunks below this bound stay on it
+            rows = pending(min(day_start(day + timedelta(days=1)), cutoff)).order_by('created_at', 'id')
+            path = archive_path(day, directory)
+            moved = 0
+            while True:
+                chunk = list(rows.values(*EXPORT_FIELDS)[:chunk_size])
+                if not chunk:
+                    break
+                _append_archive(path, chunk)
+                with transaction.atomic():
+                    _add_to_summary(day, chunk)
+                    # the audit post_delete receiver rules out a fast delete
+                    batch = AuditLog.objects.filter(pk__in=[row['id'] for row in chunk])
+                    batch._raw_delete(batch.db)
+                moved += len(chunk)
+            days += 1
+            entries += moved
+            if progress:
+                progress(day, moved)
+
+
+def rehydrate_day(day, directory=None):
+    """Yield ``day``'s archived entries as unsaved ``AuditLog`` instances, oldest first."""
+    path = archive_path(day, directory)
+    if not path.exists():
+        raise FileNotFoundError(f'No audit archive for {day.isoformat()} ({path})')
+    rows = {}
+    # gzip reads every appended member in turn
+    with gzip.open(path, 'rt', encoding='utf-8') as fh:
+        for line in fh:
+            row = json.loads(line)
+            row['created_at'] = datetime.fromisoformat(row['created_at'])
+            rows[row['id']] = row
+    for row in sorted(rows.values(), key=lambda row: (row['created_at'], row['id'])):
+        yield AuditLog(**row)
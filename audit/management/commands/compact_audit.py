@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Roll audit log entries older than --older-than days into daily summaries and move the raw '
+            'entries into gzipped per-day archive files. --rehydrate prints an archived day as JSON lines.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, metavar='DAYS',
+                            help='Compact entries from before this many days ago (default: AUDIT_RETENTION_DAYS)')
+        parser.add_argument('--chunk-size', type=int,
+                            help='Entries archived and deleted per transaction (default: AUDIT_COMPACT_CHUNK_SIZE)')
+        parser.add_argument('--dir', help='Archive directory (default: AUDIT_ARCHIVE_DIR)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be compacted')
+        parser.add_argument('--rehydrate', metavar='YYYY-MM-DD', help='Print the archived entries of this day instead')
+        parser.add_argument('--output', '-o', default='-', help="With --rehydrate: file to write, or '-' for stdout")
+
+    def handle(self, *args, **options):
+        # import lazily to avoid startup circular imports
+        from django.conf import settings
+        from django.utils.dateparse import parse_date
+        from audit import archive
+
+        if options['rehydrate']:
+            day = parse_date(options['rehydrate'])
+            if day is None:
+                raise CommandError(f"Not a date: {options['rehydrate']!r}")
+            return self.rehydrate(archive, day, options)
+
+        older_than = settings.AUDIT_RETENTION_DAYS if options['older_than'] is None else options['older_than']
+        if older_than < 1:
+            raise CommandError('--older-than must be at least 1 day')
+        cutoff = archive.cutoff_for(older_than)
+        if settings.AUDIT_BACKEND == 'segments':
+            # dropping records would break the hash chain verify_audit_chain checks
+            self.stderr.write(self.style.WARNING(
+                "AUDIT_BACKEND is 'segments': only AuditLog rows written before the switch are compacted; "
+                'segment records are kept as written'
+            ))
+
+        if options['dry_run']:
+            pending = archive.pending(cutoff)
+            oldest = pending.order_by('created_at').values_list('created_at', flat=True).first()
+            if oldest is None:
+                self.stdout.write(f'No audit entries before {cutoff:%Y-%m-%d}')
+            else:
+                self.stdout.write(
+                    f'Would compact {pending.count()} audit entries from {oldest:%Y-%m-%d} up to {cutoff:%Y-%m-%d}'
+                )
+            return
+
+        def progress(day, entries):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{day}: archived {entries} entries')
+
+        days, entries = archive.compact(
+            cutoff, chunk_size=options['chunk_size'], directory=options['dir'], progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Compacted {entries} audit entries from {days} days before {cutoff:%Y-%m-%d}'
+        ))
+
+    def rehydrate(self, archive, day, options):
+        try:
+            entries = list(archive.rehydrate_day(day, directory=options['dir']))
+        except FileNotFoundError as exc:
+            raise CommandError(str(exc))
+        lines = (archive.row_line({field: getattr(entry, field) for field in archive.EXPORT_FIELDS}) for entry in entries)
+        if options['output'] == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8') as fh:
+            fh.writelines(lines)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(entries)} archived audit entries to {options['output']}"))
@@ -0,0 +1,49 @@
+import gzip
+import sys
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Stream audit log entries in a time window as JSON lines, optionally gzipped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Start of the window (ISO date or datetime, inclusive)')
+        parser.add_argument('--until', help='End of the window (ISO datetime exclusive, or a date included in full)')
+        parser.add_argument('--action', help='Only this action, e.g. create')
+        parser.add_argument('--model', help='Only this target model, e.g. users.Vote')
+        parser.add_argument('--actor', help='Only entries by this username')
+        parser.add_argument('--output', '-o', default='-', help="File to write, or '-' for stdout (default)")
+        parser.add_argument('--gzip', action='store_true', help='Gzip the output')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Entries read per query')
+
+    def handle(self, *args, **options):
+        # import lazily to avoid startup circular imports
+        from audit.query import audit_lines, filters_from_params
+
+        try:
+            filters = filters_from_params(options)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        lines = audit_lines(filters, chunk_size=options['chunk_size'])
+
+        to_stdout = options['output'] == '-'
+        if options['gzip']:
+            # closing a GzipFile leaves a passed-in stdout open
+            fh = gzip.open(sys.stdout.buffer if to_stdout else options['output'], 'wt', encoding='utf-8')
+        elif to_stdout:
+            fh = None
+        else:
+            fh = open(options['output'], 'w', encoding='utf-8')
+        written = 0
+        try:
+            for line in lines:
+                if fh is None:
+                    self.stdout.write(line, ending='')
+                else:
+                    fh.write(line)
+                written += 1
+        finally:
+            if fh is not None:
+                fh.close()
+        if not to_stdout:
+            self.stdout.write(self.style.SUCCESS(f"Exported {written} audit entries to {options['output']}"))
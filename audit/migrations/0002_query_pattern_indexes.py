@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['target_model', 'created_at'], name='audit_target_created_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:31
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0002_query_pattern_indexes'),
+    ]
+
+    # The default is applied in Python and the column is unchanged, so skip
+    # the table rebuild SQLite would otherwise do on the audit table.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='auditlog',
+                    name='created_at',
+                    field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+                ),
+            ],
+        ),
+    ]
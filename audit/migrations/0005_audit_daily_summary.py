@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0004_audit_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('action', models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('delete', 'Delete'), ('backup', 'Backup'), ('other', 'Other')], max_length=20)),
+                ('target_model', models.CharField(blank=True, max_length=200)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'audit daily summaries',
+                'ordering': ['-day', 'target_model', 'action'],
+                'indexes': [models.Index(fields=['day', 'target_model'], name='audit_summary_day_idx')],
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 
 class AuditLog(models.Model):
@@ -17,10 +18,41 @@ class AuditLog(models.Model):
 	target_model = models.CharField(max_length=200, blank=True)
 	target_repr = models.TextField(blank=True)
 	details = models.JSONField(default=dict, blank=True, null=True)
-	created_at = models.DateTimeField(auto_now_add=True)
+	# Stamped when the event happens; audit.sink may write it a moment later
+	created_at = models.DateTimeField(default=timezone.now, editable=False)
 
 	class Meta:
 		ordering = ['-created_at']
+		indexes = [
+			models.Index(fields=['target_model', 'created_at'], name='audit_target_created_idx'),
+			# audit.query: one per filter, each ending in the keyset sort key
+			models.Index(fields=['created_at'], name='audit_created_idx'),
+			models.Index(fields=['action', 'created_at'], name='audit_action_created_idx'),
+			models.Index(fields=['actor', 'created_at'], name='audit_actor_created_idx'),
+		]
 
 	def __str__(self):
 		return f"{self.get_action_display()} by {self.actor or 'system'} on {self.target_model} — {self.target_repr}"
+
+
+class AuditDailySummary(models.Model):
+	"""Count of one day's audit entries per action, target model and actor.
+
+	Written by ``manage.py compact_audit``, which moves the raw rows into the
+	day's archive file (see audit.archive).
+	"""
+	day = models.DateField()
+	action = models.CharField(max_length=20, choices=AuditLog.ACTION_CHOICES)
+	target_model = models.CharField(max_length=200, blank=True)
+	actor = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+	count = models.PositiveIntegerField(default=0)
+
+	class Meta:
+		ordering = ['-day', 'target_model', 'action']
+		verbose_name_plural = 'audit daily summaries'
+		indexes = [
+			models.Index(fields=['day', 'target_model'], name='audit_summary_day_idx'),
+		]
+
+	def __str__(self):
+		return f"{self.day}: {self.count} × {self.get_action_display()} on {self.target_model} by {self.actor_id or 'system'}"
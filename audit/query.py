@@ -0,0 +1,176 @@
+"""Filtered reads and streaming export of the audit log.
+
+Each filter has a composite index that ends in ``created_at``:
+``(action, created_at)``, ``(actor, created_at)`` and
+``(target_model, created_at)``, with a plain ``created_at`` index for the
+unfiltered log. SQLite appends the rowid to every index, so a time window
+ordered by ``(created_at, id)`` is one index range scan. Pages use
+``users.pagination.keyset_page`` and cost the same at any depth.
+
+``export_lines`` walks a window oldest first in keyset chunks and yields
+one JSON object per line. The result set is never held in memory and no
+long-running read cursor is kept open. ``gzip_stream`` compresses those
+lines on the fly.
+
+With ``AUDIT_BACKEND = 'segments'`` the table stays empty, so
+``audit_page`` and ``audit_lines`` read the segment store instead, with
+sequence numbers as cursors and export ids.
+"""
+import json
+import zlib
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from users.pagination import KeysetPage, keyset_page
+from .models import AuditLog
+from .segments import SegmentReader
+
+EXPORT_FIELDS = ('id', 'created_at', 'action', 'actor_id', 'target_model', 'target_repr', 'details')
+
+
+def filter_log(since=None, until=None, action=None, target_model=None, actor_id=None):
+    """Entries in ``[since, until)`` matching every filter given."""
+    logs = AuditLog.objects.all()
+    if since:
+        logs = logs.filter(created_at__gte=since)
+    if until:
+        logs = logs.filter(created_at__lt=until)
+    if action:
+        logs = logs.filter(action=action)
+    if target_model:
+        logs = logs.filter(target_model=target_model)
+    if actor_id:
+        logs = logs.filter(actor_id=actor_id)
+    return logs
+
+
+def parse_moment(value, end=False):
+    """An aware datetime from an ISO datetime or date; a date means its start (or, with ``end``, the next day's)."""
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Not a date or datetime: {value!r}')
+        moment = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def filters_from_params(params):
+    """``filter_log`` keyword arguments from GET-style ``since``/``until``/``action``/``model``/``actor`` values.
+
+    ``actor`` is a username, resolved with one indexed lookup; an unknown
+    name matches nothing.
+    """
+    filters = {
+        'since': parse_moment(params.get('since')),
+        'until': parse_moment(params.get('until'), end=True),
+        'action': params.get('action') or None,
+        'target_model': params.get('model') or None,
+    }
+    if params.get('actor'):
+        filters['actor_id'] = (
+            get_user_model().objects.filter(username=params['actor']).values_list('pk', flat=True).first() or -1
+        )
+    return filters
+
+
+def log_page(logs, per_page=50, after=None, before=None):
+    """One newest-first keyset page of ``logs``."""
+    return keyset_page(logs.select_related('actor'), ('created_at', 'id'), per_page, after=after, before=before)
+
+
+def export_rows(logs, chunk_size=1000):
+    """Yield the entries of ``logs`` oldest first as dicts, one keyset query per chunk."""
+    rows = logs.order_by('created_at', 'id').values(*EXPORT_FIELDS)
+    chunk = list(rows[:chunk_size])
+    while chunk:
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        last = chunk[-1]
+        chunk = list(
+            rows.filter(Q(created_at__gt=last['created_at']) | Q(created_at=last['created_at'], id__gt=last['id']))[:chunk_size]
+        )
+
+
+def export_lines(logs, chunk_size=1000):
+    return json_lines(export_rows(logs, chunk_size))
+
+
+def json_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def _seq(cursor):
+    return int(cursor) if cursor and cursor.isdigit() else None
+
+
+def segment_page(filters, per_page=50, after=None, before=None, directory=None):
+    """One newest-first page of the segment store, paged like ``log_page``; cursors are sequence numbers."""
+    after, before = _seq(after), _seq(before)
+    backwards = before is not None and after is None
+    with SegmentReader(directory or settings.AUDIT_SEGMENT_DIR) as reader:
+        if backwards:
+            entries = reader.entries(after=before, oldest_first=True, **filters)
+        else:
+            entries = reader.entries(before=after, **filters)
+        rows = list(islice(entries, per_page + 1))
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+    actors = get_user_model().objects.in_bulk({row.actor_id for row in rows if row.actor_id})
+    for row in rows:
+        row.actor = actors.get(row.actor_id)
+
+    if not rows:
+        return KeysetPage(rows, None, None)
+    if backwards:
+        next_cursor, previous_cursor = str(rows[-1].seq), str(rows[0].seq) if more else None
+    else:
+        next_cursor = str(rows[-1].seq) if more else None
+        previous_cursor = str(rows[0].seq) if after is not None else None
+    return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+def segment_rows(filters, directory=None):
+    """Yield the matching records of the segment store oldest first as ``EXPORT_FIELDS`` dicts."""
+    with SegmentReader(directory or settings.AUDIT_SEGMENT_DIR) as reader:
+        for entry in reader.entries(oldest_first=True, **filters):
+            yield {'id': entry.seq, **{field: getattr(entry, field) for field in EXPORT_FIELDS[1:]}}
+
+
+def audit_page(filters, per_page=50, after=None, before=None):
+    """``log_page`` of the configured audit backend."""
+    if settings.AUDIT_BACKEND == 'segments':
+        return segment_page(filters, per_page, after=after, before=before)
+    return log_page(filter_log(**filters), per_page, after=after, before=before)
+
+
+def audit_lines(filters, chunk_size=1000):
+    """``export_lines`` of the configured audit backend."""
+    if settings.AUDIT_BACKEND == 'segments':
+        return json_lines(segment_rows(filters))
+    return export_lines(filter_log(**filters), chunk_size)
+
+
+def gzip_stream(lines):
+    """Gzip a stream of text lines into a stream of bytes."""
+    compressor = zlib.compressobj(wbits=31)  # 31: gzip header and trailer
+    for line in lines:
+        data = compressor.compress(line.encode())
+        if data:
+            yield data
+    yield compressor.flush()
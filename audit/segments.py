@@ -0,0 +1,365 @@
+"""Append-only, hash-chained audit segment store.
+
+With ``AUDIT_BACKEND = 'segments'``, the entries ``audit.sink`` would have
+inserted as ``AuditLog`` rows are appended to files in
+``AUDIT_SEGMENT_DIR``. This keeps the per-vote audit trail off SQLite's
+B-trees and its write lock.
+
+``<first seq>.seg`` starts with a 48-byte header: ``MAGIC``, the chain hash
+before its first record, and that record's sequence number. Frames follow::
+
+    [payload length: 4 bytes, big-endian][payload: JSON][chain hash: 32 bytes]
+
+The chain hash is ``sha256(previous chain hash + length + payload)``. It
+starts from 32 zero bytes and continues across segments, so editing,
+dropping or reordering any record breaks every hash after it.
+``manage.py verify_audit_chain`` checks the whole chain in one sequential
+pass. A segment is closed once it reaches ``AUDIT_SEGMENT_MAX_BYTES``.
+
+``<first seq>.idx`` holds 16 bytes per record: (time in microseconds,
+frame offset), in record order. The time is the running maximum of
+``created_at``, so it can be binary searched even if entries land slightly
+out of order. Range reads filter on each record's own time.
+
+A writer holds an exclusive ``flock`` on ``.lock`` and re-reads the tail
+under it, so several processes can append. After a crash between the
+frame and index writes, the next append indexes the orphaned frames and
+truncates a torn final frame.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to an in-process lock only
+    fcntl = None
+
+MAGIC = b'AUDSEG1\n'
+HEADER = struct.Struct('>8s32sQ')
+LENGTH = struct.Struct('>I')
+INDEX = struct.Struct('>qQ')
+HASH_SIZE = 32
+GENESIS = bytes(HASH_SIZE)
+RECORD_FIELDS = ('seq', 'created_at', 'action', 'actor_id', 'target_model', 'target_repr', 'details')
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_ACTIONS = {
+    'create': 'Create', 'update': 'Update', 'delete': 'Delete', 'backup': 'Backup', 'other': 'Other',
+}
+
+
+class ChainError(Exception):
+    """The segment files do not form one unbroken hash chain."""
+
+
+def to_micros(moment):
+    return (moment - _EPOCH) // timedelta(microseconds=1)
+
+
+def chain(previous, frame):
+    """Chain hash of a frame's length prefix and payload (``frame``) after ``previous``."""
+    digest = hashlib.sha256(previous)
+    digest.update(frame)
+    return digest.digest()
+
+
+class SegmentEntry:
+    """A decoded record; renders like an ``AuditLog`` row in templates."""
+
+    def __init__(self, record):
+        for field in RECORD_FIELDS:
+            setattr(self, field, record.get(field))
+        self.created_at = parse_datetime(self.created_at)
+        self.actor = None
+
+    def get_action_display(self):
+        return _ACTIONS.get(self.action, self.action)
+
+
+class _Tail:
+    def __init__(self, path, first_seq, next_seq, head, size, last_time):
+        self.path = path
+        self.first_seq = first_seq
+        self.next_seq = next_seq
+        self.head = head
+        self.size = size
+        self.last_time = last_time
+
+
+class SegmentStore:
+    """Appends audit entries to the chain in ``directory``."""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._thread_lock = threading.Lock()
+
+    def segments(self):
+        """``(first seq, path)`` of every segment, oldest first."""
+        if not self.directory.exists():
+            return []
+        return sorted((int(path.stem), path) for path in self.directory.glob('*.seg'))
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(self.directory / '.lock', 'a') as fh:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _start_segment(self, first_seq, head):
+        path = self.directory / f'{first_seq:016d}.seg'
+        with open(path, 'xb') as fh:
+            fh.write(HEADER.pack(MAGIC, head, first_seq))
+            fh.flush()
+            os.fsync(fh.fileno())
+        path.with_suffix('.idx').touch()
+        return _Tail(path, first_seq, first_seq, head, HEADER.size, 0)
+
+    def _tail(self):
+        """State of the newest segment, repairing what a crashed writer left behind."""
+        segments = self.segments()
+        if not segments:
+            return self._start_segment(1, GENESIS)
+        first_seq, path = segments[-1]
+        index_path = path.with_suffix('.idx')
+        with open(path, 'r+b') as seg, open(index_path, 'r+b') as idx:
+            magic, head, first_seq = HEADER.unpack(seg.read(HEADER.size))
+            if magic != MAGIC:
+                raise ChainError(f'{path.name}: not an audit segment')
+            indexed = os.fstat(idx.fileno()).st_size // INDEX.size
+            idx.truncate(indexed * INDEX.size)
+            end, last_time = HEADER.size, 0
+            if indexed:
+                idx.seek((indexed - 1) * INDEX.size)
+                last_time, offset = INDEX.unpack(idx.read(INDEX.size))
+                seg.seek(offset)
+                (length,) = LENGTH.unpack(seg.read(LENGTH.size))
+                seg.seek(offset + LENGTH.size + length)
+                head = seg.read(HASH_SIZE)
+                end = offset + LENGTH.size + length + HASH_SIZE
+            next_seq = first_seq + indexed
+
+            size = os.fstat(seg.fileno()).st_size
+            seg.seek(end)
+            idx.seek(0, os.SEEK_END)
+            while end + LENGTH.size <= size:
+                prefix = seg.read(LENGTH.size)
+                (length,) = LENGTH.unpack(prefix)
+                if end + LENGTH.size + length + HASH_SIZE > size:
+                    break
+                payload = seg.read(length)
+                digest = seg.read(HASH_SIZE)
+                if digest != chain(head, prefix + payload):
+                    break
+                moment = parse_datetime(json.loads(payload)['created_at'])
+                last_time = max(last_time, to_micros(moment))
+                idx.write(INDEX.pack(last_time, end))
+                head, next_seq = digest, next_seq + 1
+                end += LENGTH.size + length + HASH_SIZE
+            # whatever follows the last good frame is a torn write
+            seg.truncate(end)
+        return _Tail(path, first_seq, next_seq, head, end, last_time)
+
+    def append(self, entries):
+        """Append ``AuditLog`` field dicts to the chain. Returns their sequence numbers."""
+        if not entries:
+            return range(0)
+        with self._locked():
+            tail = self._tail()
+            if tail.size >= self.max_bytes and tail.next_seq > tail.first_seq:
+                tail = self._start_segment(tail.next_seq, tail.head)
+            frames, index = bytearray(), bytearray()
+            head, seq, offset, last_time = tail.head, tail.next_seq, tail.size, tail.last_time
+            for fields in entries:
+                created_at = fields.get('created_at') or timezone.now()
+                actor = fields.get('actor')
+                record = {
+                    'seq': seq,
+                    # isoformat keeps the microseconds DjangoJSONEncoder would drop
+                    'created_at': created_at.isoformat(),
+                    'action': fields.get('action'),
+                    'actor_id': fields.get('actor_id', getattr(actor, 'pk', None)),
+                    'target_model': fields.get('target_model', ''),
+                    'target_repr': fields.get('target_repr', ''),
+                    'details': fields.get('details') or {},
+                }
+                payload = json.dumps(record, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+                frame = LENGTH.pack(len(payload)) + payload
+                head = chain(head, frame)
+                last_time = max(last_time, to_micros(created_at))
+                index += INDEX.pack(last_time, offset)
+                frames += frame + head
+                offset += len(frame) + HASH_SIZE
+                seq += 1
+            with open(tail.path, 'ab') as fh:
+                fh.write(frames)
+                fh.flush()
+                os.fsync(fh.fileno())
+            # the index can be rebuilt from the frames, so it is not fsync'd
+            with open(tail.path.with_suffix('.idx'), 'ab') as fh:
+                fh.write(index)
+        return range(tail.next_seq, seq)
+
+
+class _MappedSegment:
+    def __init__(self, first_seq, path):
+        self.first_seq = first_seq
+        self.path = path
+        # index first: a writer appends frames before their index entries, so
+        # every offset in this index falls inside the data mapped after it
+        self.index = self._map(path.with_suffix('.idx'))
+        self.data = self._map(path)
+        self.count = len(self.index) // INDEX.size if self.index is not None else 0
+
+    @staticmethod
+    def _map(path):
+        with open(path, 'rb') as fh:
+            if os.fstat(fh.fileno()).st_size == 0:
+                return None
+            return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        for mapped in (self.data, self.index):
+            if mapped is not None:
+                mapped.close()
+
+    def time_at(self, i):
+        return INDEX.unpack_from(self.index, i * INDEX.size)[0]
+
+    def entry(self, i):
+        offset = INDEX.unpack_from(self.index, i * INDEX.size)[1]
+        (length,) = LENGTH.unpack_from(self.data, offset)
+        start = offset + LENGTH.size
+        return SegmentEntry(json.loads(self.data[start:start + length]))
+
+    def position(self, micros):
+        """Index of the first record whose index time is at least ``micros``."""
+        return bisect_left(range(self.count), micros, key=self.time_at)
+
+
+class SegmentReader:
+    """Memory-mapped, read-only view of the segment store; use as a context manager."""
+
+    def __init__(self, directory):
+        self.segments = [_MappedSegment(first_seq, path) for first_seq, path in SegmentStore(directory, 0).segments()]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        for segment in self.segments:
+            segment.close()
+
+    def __len__(self):
+        return sum(segment.count for segment in self.segments)
+
+    def _positions(self, since=None, until=None, before=None, after=None, oldest_first=False):
+        """``(segment, i)`` of every record in the time window and between seqs ``after`` and ``before``."""
+        since, until = since and to_micros(since), until and to_micros(until)
+        for segment in (self.segments if oldest_first else reversed(self.segments)):
+            if not segment.count:
+                continue
+            stop = segment.position(until) if until else segment.count
+            if before is not None:
+                stop = max(0, min(stop, before - segment.first_seq))
+            start = segment.position(since) if since else 0
+            if after is not None:
+                start = min(segment.count, max(start, after + 1 - segment.first_seq))
+            for i in (range(start, stop) if oldest_first else range(stop - 1, start - 1, -1)):
+                yield segment, i
+
+    def entries(self, since=None, until=None, action=None, target_model=None, actor_id=None,
+                before=None, after=None, oldest_first=False):
+        """Records in ``[since, until)`` matching every filter, newest first unless ``oldest_first``.
+
+        ``before`` and ``after`` are exclusive sequence number bounds.
+        """
+        for segment, i in self._positions(since, until, before, after, oldest_first):
+            entry = segment.entry(i)
+            if since and entry.created_at < since or until and entry.created_at >= until:
+                continue
+            if action and entry.action != action:
+                continue
+            if target_model and entry.target_model != target_model:
+                continue
+            if actor_id and entry.actor_id != actor_id:
+                continue
+            yield entry
+
+
+def verify_chain(directory, progress=None):
+    """Check every segment, frame and index entry in one pass. Returns ``(records, head hash)``.
+
+    Raises ``ChainError`` at the first break.
+    """
+    head, expected_seq, records = GENESIS, 1, 0
+    for first_seq, path in SegmentStore(directory, 0).segments():
+        with open(path, 'rb') as fh, open(path.with_suffix('.idx'), 'rb') as idx_fh:
+            data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            index = idx_fh.read()
+        view = memoryview(data)
+        try:
+            magic, prev, header_seq = HEADER.unpack_from(data, 0)
+            if magic != MAGIC or header_seq != first_seq:
+                raise ChainError(f'{path.name}: bad segment header')
+            if header_seq != expected_seq:
+                raise ChainError(f'{path.name}: starts at #{header_seq}, expected #{expected_seq}')
+            if prev != head:
+                raise ChainError(f'{path.name}: does not continue the chain from #{expected_seq - 1}')
+            offsets = [offset for _, offset in INDEX.iter_unpack(index[:len(index) - len(index) % INDEX.size])]
+            offset, size, n = HEADER.size, len(data), 0
+            while offset < size:
+                if offset + LENGTH.size > size:
+                    raise ChainError(f'{path.name}: torn frame at byte {offset}')
+                (length,) = LENGTH.unpack_from(data, offset)
+                end = offset + LENGTH.size + length
+                if end + HASH_SIZE > size:
+                    raise ChainError(f'{path.name}: torn frame at byte {offset}')
+                head = chain(head, view[offset:end])
+                if view[end:end + HASH_SIZE] != head:
+                    raise ChainError(f'{path.name}: record #{expected_seq} does not match its chain hash')
+                if n < len(offsets) and offsets[n] != offset:
+                    raise ChainError(f'{path.name}: index entry for #{expected_seq} points at the wrong frame')
+                offset, n, expected_seq = end + HASH_SIZE, n + 1, expected_seq + 1
+            if len(offsets) > n:
+                raise ChainError(f'{path.name}: index lists {len(offsets)} records, segment holds {n}')
+        finally:
+            view.release()
+            data.close()
+        records += n
+        if progress:
+            progress(path, records)
+    return records, head
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store():
+    key = (str(settings.AUDIT_SEGMENT_DIR), settings.AUDIT_SEGMENT_MAX_BYTES)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = SegmentStore(*key)
+        return _stores[key]
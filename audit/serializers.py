@@ -0,0 +1,132 @@
+"""How each audited model is described in the audit log.
+
+An ``AuditSerializer`` builds an entry from what the instance already
+holds: local field values and foreign key ids. It never follows a
+relation that is not loaded yet, so writing the entry costs no SELECTs.
+``AuditLog.target_repr`` therefore deliberately differs from the model's
+``__str__``, which may dereference relations.
+
+Changes are worked out against a snapshot of the tracked fields. The
+snapshot is taken when the instance is loaded or built (``post_init``)
+and refreshed after every audited save. Deferred fields are left out
+rather than fetched.
+
+Personal data in ``masked`` fields is tracked, so the entry shows that it
+changed, but its values are written as ``MASK``. The audit log is append
+only and ``compact_audit`` archives it for good.
+"""
+from django.core.serializers.json import DjangoJSONEncoder
+
+_encoder = DjangoJSONEncoder()
+
+SNAPSHOT_ATTR = '_audit_snapshot'
+
+MASK = '[masked]'
+
+
+def _jsonable(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    try:
+        return _encoder.default(value)
+    except TypeError:
+        return str(value)
+
+
+class AuditSerializer:
+    def __init__(self, fields, describe, actor=None, masked=()):
+        # attnames, so foreign keys are tracked by id
+        self.fields = fields
+        # tracked fields whose values stay out of the log
+        self.masked = frozenset(masked)
+        # str.format template over the loaded field values, e.g. 'Voter {voter_id}'
+        self.describe = describe
+        # dotted path to the acting user's id, e.g. 'user_id' or 'voter.user_id'
+        self.actor = actor
+
+    def values(self, instance):
+        loaded = instance.__dict__
+        return {field: loaded[field] for field in self.fields if field in loaded}
+
+    def snapshot(self, instance):
+        setattr(instance, SNAPSHOT_ATTR, self.values(instance))
+
+    def changes(self, instance, action):
+        """``{field: [old, new]}`` for the tracked fields ``action`` touched."""
+        current = self.values(instance)
+        if action == 'create':
+            changed = {field: [None, value] for field, value in current.items()}
+        elif action == 'delete':
+            changed = {field: [value, None] for field, value in current.items()}
+        else:
+            before = getattr(instance, SNAPSHOT_ATTR, {})
+            changed = {
+                field: [before.get(field), value]
+                for field, value in current.items()
+                if field not in before or before[field] != value
+            }
+        setattr(instance, SNAPSHOT_ATTR, current)
+        return {
+            field: [self._logged(field, old), self._logged(field, new)]
+            for field, (old, new) in changed.items()
+        }
+
+    def _logged(self, field, value):
+        if field in self.masked and value not in (None, ''):
+            return MASK
+        return _jsonable(value)
+
+    def target_repr(self, instance):
+        try:
+            return self.describe.format_map(instance.__dict__)
+        except KeyError:
+            # a field it names was deferred
+            return f'{instance._meta.object_name} #{instance.pk}'
+
+    def actor_id(self, instance):
+        """The acting user's id, following only relations that are already cached."""
+        if not self.actor:
+            return None
+        *relations, attname = self.actor.split('.')
+        obj = instance
+        for name in relations:
+            if not obj._meta.get_field(name).is_cached(obj):
+                return None
+            obj = getattr(obj, name)
+            if obj is None:
+                return None
+        return obj.__dict__.get(attname)
+
+    def entry(self, instance, action):
+        """``AuditLog`` field values for ``action`` on ``instance``."""
+        return {
+            'actor_id': self.actor_id(instance),
+            'action': action,
+            'target_model': instance._meta.label,
+            'target_repr': self.target_repr(instance),
+            'details': {'pk': instance.pk, 'changes': self.changes(instance, action)},
+        }
+
+
+SERIALIZERS = {
+    'users.Party': AuditSerializer(
+        ('name',),
+        '{name}',
+    ),
+    'users.Candidate': AuditSerializer(
+        ('name', 'age', 'area', 'party_id', 'is_approved', 'user_id'),
+        '{name} (party {party_id})',
+        actor='user_id',
+    ),
+    'users.Voter': AuditSerializer(
+        ('user_id', 'voter_id', 'mobile_no', 'address', 'verification_status', 'verification_date'),
+        'Voter {voter_id}',
+        actor='user_id',
+        masked=('mobile_no', 'address'),
+    ),
+    'users.Vote': AuditSerializer(
+        ('voter_id', 'candidate_id', 'election_id'),
+        'Vote by voter {voter_id} for candidate {candidate_id} in election {election_id}',
+        actor='voter.user_id',
+    ),
+}
@@ -1,56 +1,31 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_init, post_save, post_delete
 from django.dispatch import receiver
-from django.apps import apps
 
+from .serializers import SERIALIZERS
+from .sink import emit
 
-def get_audit_model():
-    return apps.get_model('audit', 'AuditLog')
 
+def take_snapshot(sender, instance, **kwargs):
+    SERIALIZERS[sender._meta.label].snapshot(instance)
 
-@receiver(post_save)
-def on_model_save(sender, instance, created, **kwargs):
-    # Only watch select models (Party, Candidate, Voter, Vote) in users app
-    if sender._meta.app_label != 'users':
-        return
 
-    name = sender.__name__
-    if name not in ('Party', 'Candidate', 'Voter', 'Vote'):
-        return
+# Only the audited models pay for a snapshot on load
+for label in SERIALIZERS:
+    post_init.connect(take_snapshot, sender=label, dispatch_uid=f'audit_snapshot_{label}')
 
-    AuditLog = get_audit_model()
-    try:
-        actor = getattr(instance, 'user', None)
-    except Exception:
-        actor = None
 
-    AuditLog.objects.create(
-        actor=actor if hasattr(actor, 'pk') else None,
-        action='create' if created else 'update',
-        target_model=f"users.{name}",
-        target_repr=str(instance),
-        details={},
-    )
+@receiver(post_save)
+def on_model_save(sender, instance, created, **kwargs):
+    # Only watch the models in audit.serializers (Party, Candidate, Voter, Vote)
+    serializer = SERIALIZERS.get(sender._meta.label)
+    if serializer is None:
+        return
+    emit(**serializer.entry(instance, 'create' if created else 'update'))
 
 
 @receiver(post_delete)
 def on_model_delete(sender, instance, **kwargs):
-    if sender._meta.app_label != 'users':
+    serializer = SERIALIZERS.get(sender._meta.label)
+    if serializer is None:
         return
-
-    name = sender.__name__
-    if name not in ('Party', 'Candidate', 'Voter', 'Vote'):
-        return
-
-    AuditLog = get_audit_model()
-    try:
-        actor = getattr(instance, 'user', None)
-    except Exception:
-        actor = None
-
-    AuditLog.objects.create(
-        actor=actor if hasattr(actor, 'pk') else None,
-        action='delete',
-        target_model=f"users.{name}",
-        target_repr=str(instance),
-        details={},
-    )
+    emit(**serializer.entry(instance, 'delete'))
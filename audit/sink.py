@@ -0,0 +1,239 @@
+"""Batched writer for the model audit trail.
+
+``audit.signals`` hands every entry to ``emit``. In ``'async'`` mode
+(``AUDIT_SINK_MODE``) an entry is queued in memory once the saving
+transaction commits, and a background thread writes the queue with
+``bulk_create``. It writes ``AUDIT_SINK_BATCH_SIZE`` rows at a time, or
+whatever has waited ``AUDIT_SINK_FLUSH_INTERVAL`` seconds. A rolled-back
+save leaves no entry behind, as before. ``created_at`` is stamped when the
+entry is emitted, not when it is written.
+
+``flush()`` blocks until everything queued so far is in the database. It
+runs at interpreter exit, so a clean shutdown loses nothing. When the
+queue is full (``AUDIT_SINK_MAX_QUEUE``), ``emit`` writes in the caller's
+thread instead of dropping the entry.
+
+A batch that still fails after ``WRITE_ATTEMPTS`` tries is spooled to a
+JSON lines file in ``AUDIT_SINK_SPOOL_DIR``. After every later successful
+write, and on ``flush()``, the spooled files are written again, oldest
+first, and deleted. Each file is renamed before it is replayed, so only one
+process replays it.
+
+``'sync'`` mode writes each entry inside the save, in the same
+transaction. The test suite runs in this mode.
+
+Entries go to ``AuditLog`` rows, or with ``AUDIT_BACKEND = 'segments'``
+to the hash-chained files of ``audit.segments``. A file append cannot be
+rolled back, so with segments even ``'sync'`` mode waits for the commit.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+WRITE_ATTEMPTS = 3
+
+# Queued by flush() to make the thread write what it holds without waiting
+_FLUSH = object()
+
+
+def get_audit_model():
+    return apps.get_model('audit', 'AuditLog')
+
+
+def write_entries(entries):
+    if settings.AUDIT_BACKEND == 'segments':
+        from .segments import get_store
+        get_store().append(entries)
+        return
+    AuditLog = get_audit_model()
+    AuditLog.objects.bulk_create([AuditLog(**fields) for fields in entries])
+
+
+def record(entries):
+    """Write entries as part of the current transaction (or, for segments, once it commits)."""
+    if settings.AUDIT_BACKEND == 'segments':
+        transaction.on_commit(lambda: write_entries(entries))
+    else:
+        write_entries(entries)
+
+
+class AuditSink:
+    """An in-memory queue of audit entries drained by one daemon thread."""
+
+    def __init__(self, batch_size, flush_interval, max_queue=0, writer=write_entries, spool_dir=None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.writer = writer
+        self.spool_dir = Path(spool_dir) if spool_dir else None
+        self.queue = queue.Queue(max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = os.getpid()
+
+    def put(self, entry):
+        self._ensure_thread()
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            self._write([entry])
+
+    def flush(self):
+        """Block until everything queued so far has been written."""
+        self._ensure_thread()
+        self.queue.put(_FLUSH)
+        self.queue.join()
+        self._replay()
+
+    def _ensure_thread(self):
+        if self._pid != os.getpid():
+            # Forked worker: the parent's thread and queue did not come along
+            self.__init__(self.batch_size, self.flush_interval, self.queue.maxsize, self.writer, self.spool_dir)
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='audit-sink', daemon=True)
+                    self._thread.start()
+
+    def _drain(self):
+        """Take up to ``batch_size`` entries, waiting at most ``flush_interval`` after the first."""
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            timeout = None if deadline is None else deadline - time.monotonic()
+            if timeout is not None and timeout <= 0:
+                break
+            try:
+                entry = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if entry is _FLUSH:
+                self.queue.task_done()
+                break
+            batch.append(entry)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+        return batch
+
+    def _done(self, batch):
+        for _ in batch:
+            self.queue.task_done()
+
+    def _run(self):
+        while True:
+            batch = self._drain()
+            if not batch:
+                continue
+            try:
+                self._write(batch)
+            finally:
+                self._done(batch)
+                connection.close_if_unusable_or_obsolete()
+
+    def _write(self, batch):
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            try:
+                self.writer(batch)
+            except Exception:
+                if attempt == WRITE_ATTEMPTS:
+                    self._spool(batch)
+                    return
+                time.sleep(0.1 * attempt)
+            else:
+                self._replay()
+                return
+
+    def _spool(self, batch):
+        if self.spool_dir is not None:
+            path = self.spool_dir / f'{time.time_ns()}-{os.getpid()}.jsonl'
+            try:
+                self.spool_dir.mkdir(parents=True, exist_ok=True)
+                with open(path.with_suffix('.tmp'), 'w', encoding='utf-8') as fh:
+                    for entry in batch:
+                        fields = {key: value for key, value in entry.items() if key != 'actor'}
+                        if 'actor' in entry:
+                            fields['actor_id'] = getattr(entry['actor'], 'pk', None)
+                        # isoformat keeps the microseconds DjangoJSONEncoder would drop
+                        fields['created_at'] = entry['created_at'].isoformat()
+                        fh.write(json.dumps(fields, cls=DjangoJSONEncoder) + '\n')
+                    fh.flush()
+                    os.fsync(fh.fileno())
+                os.replace(path.with_suffix('.tmp'), path)
+            except OSError:
+                logger.exception('Could not spool audit entries to %s', path)
+            else:
+                logger.exception('Spooled %d audit entries to %s', len(batch), path)
+                return
+        # Keep the entries in the log rather than lose them silently
+        logger.exception('Dropped %d audit entries: %r', len(batch), batch)
+
+    def _replay(self):
+        """Write the spooled batches again, oldest first; stop at the first failure."""
+        if self.spool_dir is None or not self.spool_dir.exists():
+            return
+        for path in sorted(self.spool_dir.glob('*.jsonl')):
+            claimed = path.with_suffix('.replaying')
+            try:
+                os.replace(path, claimed)
+            except FileNotFoundError:
+                # another process took it
+                continue
+            with open(claimed, encoding='utf-8') as fh:
+                batch = [json.loads(line) for line in fh]
+            for entry in batch:
+                entry['created_at'] = parse_datetime(entry['created_at'])
+            try:
+                self.writer(batch)
+            except Exception:
+                os.replace(claimed, path)
+                logger.warning('Audit spool %s is still not writable', path, exc_info=True)
+                return
+            claimed.unlink()
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_sink():
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                _sink = AuditSink(
+                    settings.AUDIT_SINK_BATCH_SIZE,
+                    settings.AUDIT_SINK_FLUSH_INTERVAL,
+                    settings.AUDIT_SINK_MAX_QUEUE,
+                    spool_dir=settings.AUDIT_SINK_SPOOL_DIR,
+                )
+                atexit.register(flush)
+    return _sink
+
+
+def emit(**fields):
+    """Record one audit entry (``AuditLog`` field values) per ``AUDIT_SINK_MODE``."""
+    fields.setdefault('created_at', timezone.now())
+    if settings.AUDIT_SINK_MODE == 'sync':
+        record([fields])
+        return
+    sink = get_sink()
+    transaction.on_commit(lambda: sink.put(fields))
+
+
+def flush():
+    """Block until every queued entry is written. A no-op when nothing was queued."""
+    if _sink is not None:
+        _sink.flush()
@@ -0,0 +1,11 @@
+"""pytest (pytest-django) hook: the same test-only settings as online_voting.test_runner."""
+import pytest
+
+
+@pytest.fixture(autouse=True, scope='session')
+def test_settings():
+    from django.test.utils import override_settings
+    from online_voting.test_runner import TEST_SETTINGS
+
+    with override_settings(**TEST_SETTINGS):
+        yield
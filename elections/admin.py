@@ -3,6 +3,7 @@ from django.contrib.messages import constants as messages
 from django.utils import timezone
 from .models import Election
 from users.models import Candidate, Party, Vote, Campaign
+from users.services import publish_election_results
 
 @admin.action(description='Publish results for selected elections')
 def publish_results_action(modeladmin, request, queryset):
@@ -11,8 +12,7 @@ def publish_results_action(modeladmin, request, queryset):
     
     for election in queryset:
         if election.end_date <= now:
-            election.results_published = True
-            election.save()
+            publish_election_results(election)
             count += 1
         else:
             modeladmin.message_user(
@@ -43,15 +43,18 @@ class PartyAdmin(admin.ModelAdmin):
 @admin.register(Candidate)
 class CandidateAdmin(admin.ModelAdmin):
     list_display = ('name', 'party', 'age', 'area')
+    list_select_related = ('party',)
     list_filter = ('party',)
     search_fields = ('name',)
 
 @admin.register(Vote)
 class VoteAdmin(admin.ModelAdmin):
     list_display = ('id', 'voter', 'candidate', 'election')
+    list_select_related = ('voter__user', 'candidate__party', 'election')
     list_filter = ('election', 'candidate__party')
 
 @admin.register(Campaign)
 class CampaignAdmin(admin.ModelAdmin):
     list_display = ('candidate', 'election',)
+    list_select_related = ('candidate__party', 'election')
     list_filter = ('election',)
\ No newline at end of file
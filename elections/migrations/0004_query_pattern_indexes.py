@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0003_alter_election_results_published'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='election',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['start_date'], name='election_active_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='election',
+            index=models.Index(condition=models.Q(('results_published', True)), fields=['-end_date'], name='election_published_end_idx'),
+        ),
+    ]
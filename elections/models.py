@@ -19,6 +19,12 @@ class Election(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        # Partial indexes: boolean filters compile to a bare ``WHERE is_active``,
+        # which a composite (is_active, start_date) index cannot serve.
+        indexes = [
+            models.Index(fields=['start_date'], condition=models.Q(is_active=True), name='election_active_start_idx'),
+            models.Index(fields=['-end_date'], condition=models.Q(results_published=True), name='election_published_end_idx'),
+        ]
 
     def __str__(self):
         return self.title
\ No newline at end of file
@@ -57,6 +57,9 @@ AUTH_USER_MODEL = 'users.CustomUser'
 
 
 MIDDLEWARE = [
+    # Inactive unless QUERY_INSTRUMENTATION is True; listed first so it sees every query
+    'users.middleware.QueryInstrumentationMiddleware',
+    'users.middleware.NPlusOneMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,6 +69,17 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-view query count / SQL time / render time headers, log lines and the
+# admin query stats page (/users/admin/query-stats/).
+QUERY_INSTRUMENTATION = False
+
+# N+1 detection: repeated lazy loads of one relation in a request are logged
+# ('log'), raised as users.nplusone.NPlusOneError ('raise') or ignored ('off').
+# The test suite runs in 'raise' mode (online_voting.test_runner) so
+# regressions fail as they land.
+NPLUSONE_MODE = 'log'
+NPLUSONE_THRESHOLD = 2
+
 ROOT_URLCONF = 'online_voting.urls'
 
 TEMPLATES = [
@@ -78,6 +92,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'users.context_processors.notifications',
             ],
         },
     },
@@ -96,6 +111,92 @@ DATABASES = {
     }
 }
 
+# Vote ingestion: 'direct' inserts each ballot in its own transaction,
+# 'journal' fsyncs ballots to VOTE_JOURNAL_DIR and leaves the inserts to
+# `python manage.py flush_vote_journal --follow`.
+VOTE_INGESTION_MODE = 'direct'
+VOTE_JOURNAL_DIR = BASE_DIR / 'vote_journal'
+VOTE_JOURNAL_BATCH_SIZE = 500
+
+# Deleting elections, candidates and voters goes through users.DeletionJob,
+# which removes dependents DELETION_CHUNK_SIZE rows per transaction.
+# 'background' leaves it to `python manage.py run_deletion_jobs --follow`,
+# so no admin request runs a large deletion. 'inline' runs the job in the
+# request, which is handy in development without a worker.
+DELETION_MODE = 'background'
+DELETION_CHUNK_SIZE = 1000
+
+# Bulk voter verification from the management page queues a
+# users.VerificationJob, run VERIFICATION_CHUNK_SIZE voters per transaction
+# by `python manage.py run_verification_jobs --follow` ('background') or in
+# the request ('inline'). `python manage.py verify_voters` verifies directly.
+VERIFICATION_MODE = 'background'
+VERIFICATION_CHUNK_SIZE = 1000
+
+# Election open and reminder notifications are queued as users.NotificationFanout
+# rows and written by `python manage.py run_notification_fanout --follow`,
+# NOTIFICATION_FANOUT_CHUNK_SIZE per transaction. Reminders fall due
+# ELECTION_REMINDER_LEAD_HOURS before an election closes.
+NOTIFICATION_FANOUT_CHUNK_SIZE = 1000
+ELECTION_REMINDER_LEAD_HOURS = 24
+
+# Model audit entries (audit.signals) go through audit.sink. 'async' queues
+# them when the saving transaction commits and a background thread
+# bulk-inserts AUDIT_SINK_BATCH_SIZE at a time, or whatever has waited
+# AUDIT_SINK_FLUSH_INTERVAL seconds; the queue is flushed at exit. 'sync'
+# writes each entry inside the save. The test suite runs in 'sync' mode
+# (online_voting.test_runner). A batch the thread cannot write is spooled to
+# AUDIT_SINK_SPOOL_DIR and written again once writes succeed.
+AUDIT_SINK_MODE = 'async'
+AUDIT_SINK_BATCH_SIZE = 500
+AUDIT_SINK_FLUSH_INTERVAL = 1.0
+AUDIT_SINK_MAX_QUEUE = 10000
+AUDIT_SINK_SPOOL_DIR = BASE_DIR / 'audit_spool'
+
+# Where audit.sink stores model audit entries. 'database' writes AuditLog
+# rows; 'segments' appends hash-chained records to rotating files in
+# AUDIT_SEGMENT_DIR (see audit.segments), checked with `python manage.py
+# verify_audit_chain`. The AuditLog admin, the audit list and both exports
+# then read the segment store. compact_audit does not: the chain cannot
+# drop records, so it only compacts rows left from the 'database' backend.
+AUDIT_BACKEND = 'database'
+AUDIT_SEGMENT_DIR = BASE_DIR / 'audit_segments'
+AUDIT_SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+
+# `python manage.py compact_audit` rolls AuditLog entries older than
+# AUDIT_RETENTION_DAYS into AuditDailySummary rows and moves the raw rows,
+# AUDIT_COMPACT_CHUNK_SIZE per transaction, into one gzipped JSONL file per
+# day under AUDIT_ARCHIVE_DIR (see audit.archive).
+AUDIT_RETENTION_DAYS = 90
+AUDIT_ARCHIVE_DIR = BASE_DIR / 'audit_archive'
+AUDIT_COMPACT_CHUNK_SIZE = 5000
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Published results are cached here. LocMemCache is per process; use
+# FileBasedCache or a shared cache so several workers coalesce on one miss.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'online-voting',
+    }
+}
+RESULTS_CACHE_TIMEOUT = 300
+# The broadcast count behind every unread badge. A new or deleted broadcast
+# clears it only in the process that wrote it; other workers see the change
+# once their copy expires.
+BROADCAST_TOTAL_CACHE_TIMEOUT = 30
+RESULTS_CACHE_LOCK_TIMEOUT = 10
+
+# How long "N found" totals on cursor-paginated admin listings are cached
+LISTING_COUNT_CACHE_TIMEOUT = 60
+
+# Ranked matches per page of an admin voter search (see users.search). A
+# query matching more than VOTER_SEARCH_RANK_LIMIT voters is listed unranked.
+VOTER_SEARCH_RESULTS = 50
+VOTER_SEARCH_RANK_LIMIT = 20000
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -141,3 +242,7 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Applies the test-only settings (N+1 'raise', audit sink 'sync') for
+# `manage.py test`; conftest.py does the same under pytest.
+TEST_RUNNER = 'online_voting.test_runner.TestRunner'
@@ -0,0 +1,26 @@
+"""Test runner that switches on the test-only settings.
+
+``manage.py test`` and ``python -m django test`` both go through
+``TEST_RUNNER``, so the suite gets these settings however it is started.
+Under pytest, ``conftest.py`` applies the same ``TEST_SETTINGS``.
+"""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+TEST_SETTINGS = {
+    # a lazy load per row fails the test that introduces it
+    'NPLUSONE_MODE': 'raise',
+    # audit entries are written inside the save, with no background thread
+    'AUDIT_SINK_MODE': 'sync',
+}
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._test_settings = override_settings(**TEST_SETTINGS)
+        self._test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._test_settings.disable()
+        super().teardown_test_environment(**kwargs)
@@ -1,8 +1,9 @@
 
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
-from .models import CustomUser, Voter, Notification
+from .models import CustomUser, Voter, Notification, DeletionJob, BroadcastNotification, NotificationFanout, VerificationJob
 from .forms import CustomUserCreationForm, CustomUserChangeForm
+from .services import bulk_verify_voters
 
 @admin.register(CustomUser)
 class CustomUserAdmin(DjangoUserAdmin):
@@ -84,18 +85,65 @@ class CustomUserAdmin(DjangoUserAdmin):
 @admin.register(Voter)
 class VoterAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'voter_id', 'verification_status')
+    list_select_related = ('user',)
     list_filter = ('verification_status',)
     search_fields = ('user__username', 'voter_id')
     actions = ['verify_voters']
 
     def verify_voters(self, request, queryset):
-        queryset.update(verification_status='verified')
-        self.message_user(request, "Selected voters have been verified.")
+        verified = bulk_verify_voters(queryset=queryset, actor=request.user)
+        self.message_user(request, f"{verified} pending voter(s) have been verified.")
     verify_voters.short_description = "Mark selected voters as Verified"
 
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
     list_display = ('voter', 'title', 'notification_type', 'is_read', 'created_at')
+    list_select_related = ('voter__user',)
     list_filter = ('notification_type', 'is_read')
-    search_fields = ('voter__user__username', 'title')
\ No newline at end of file
+    search_fields = ('voter__user__username', 'title')
+
+
+@admin.register(BroadcastNotification)
+class BroadcastNotificationAdmin(admin.ModelAdmin):
+    list_display = ('title', 'notification_type', 'election', 'created_at')
+    list_filter = ('notification_type',)
+    list_select_related = ('election',)
+    search_fields = ('title',)
+
+
+@admin.register(DeletionJob)
+class DeletionJobAdmin(admin.ModelAdmin):
+    list_display = ('target_type', 'target_repr', 'status', 'requested_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'target_type')
+    list_select_related = ('requested_by',)
+    readonly_fields = ('target_type', 'target_id', 'target_repr', 'status', 'requested_by', 'progress', 'error', 'created_at', 'finished_at')
+
+    def has_add_permission(self, request):
+        # jobs are queued by the delete views
+        return False
+
+
+@admin.register(VerificationJob)
+class VerificationJobAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'status', 'verified', 'total', 'requested_by', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    list_select_related = ('requested_by',)
+    readonly_fields = ('voter_codes', 'search_query', 'filter_status', 'status', 'requested_by', 'total', 'verified', 'error', 'created_at', 'finished_at')
+
+    def has_add_permission(self, request):
+        # jobs are queued from the voter management page
+        return False
+
+
+@admin.register(NotificationFanout)
+class NotificationFanoutAdmin(admin.ModelAdmin):
+    list_display = ('election', 'notification_type', 'status', 'sent', 'created_at', 'finished_at')
+    list_filter = ('status', 'notification_type')
+    list_select_related = ('election',)
+    readonly_fields = ('election', 'notification_type', 'status', 'last_voter_id', 'sent', 'error', 'created_at', 'finished_at')
+
+    def has_add_permission(self, request):
+        # queued by users.fanout.schedule_due_fanouts
+        return False
+
@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_save, post_delete, pre_delete
 
 
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        from elections.models import Election
+        from .models import BroadcastNotification
+        from .notifications import on_broadcast_saved, on_broadcast_deleting
+        from .results_cache import on_election_changed
+
+        post_save.connect(on_election_changed, sender=Election, dispatch_uid='results_cache_election_saved')
+        post_delete.connect(on_election_changed, sender=Election, dispatch_uid='results_cache_election_deleted')
+        post_save.connect(on_broadcast_saved, sender=BroadcastNotification, dispatch_uid='broadcast_total_saved')
+        pre_delete.connect(on_broadcast_deleting, sender=BroadcastNotification, dispatch_uid='broadcast_receipts_deleting')
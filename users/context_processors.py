@@ -0,0 +1,26 @@
+from django.utils.functional import SimpleLazyObject
+
+from .models import Voter
+from .notifications import unread_count
+
+
+def request_unread_count(request):
+    """The signed-in voter's unread notification count, computed once per request.
+
+    Costs one Voter lookup the first time, and nothing afterwards.
+    """
+    if not hasattr(request, '_unread_notification_count'):
+        user = getattr(request, 'user', None)
+        count = 0
+        if user is not None and user.is_authenticated and getattr(user, 'role', '') == 'voter':
+            try:
+                count = unread_count(user.voter)
+            except Voter.DoesNotExist:
+                pass
+        request._unread_notification_count = count
+    return request._unread_notification_count
+
+
+def notifications(request):
+    # Lazy, so pages that do not show the badge run no query
+    return {'unread_notification_count': SimpleLazyObject(lambda: request_unread_count(request))}
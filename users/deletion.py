@@ -0,0 +1,222 @@
+"""Chunked deletion of elections, candidates and voters.
+
+``Model.delete()`` makes Django's collector load every dependent row into
+memory, then delete them in one transaction while firing ``post_delete``
+per row. For a large election that holds the SQLite write lock for
+minutes. A ``DeletionJob`` instead walks an explicit plan of dependent
+tables and removes each one ``DELETION_CHUNK_SIZE`` rows per transaction,
+using ``_raw_delete`` (no collector, no per-row signals). Nullable
+references are cleared in chunks the same way. Progress per table is stored
+on the job, and one summary audit entry is written when it finishes.
+Re-running a failed job picks up where it stopped, because every step only
+touches rows that are still there. A job whose worker died stays
+``'running'``; ``run_deletion_jobs --retry-failed`` requeues it too.
+
+The plans below must list every relation pointing at the target. A missing
+one fails the final delete with a foreign key error rather than leaving
+orphans.
+"""
+import logging
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.admin.models import LogEntry
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from audit.models import AuditDailySummary, AuditLog
+from audit.sink import record
+from elections.models import Election
+from .models import (
+    BroadcastNotification, BroadcastReceipt, Candidate, Campaign, DeletionJob, ElectionTally,
+    Notification, NotificationFanout, ResultSnapshot, VerificationJob, Vote, Voter,
+)
+from .results_cache import invalidate_election
+
+logger = logging.getLogger(__name__)
+
+TARGETS = {
+    'election': Election,
+    'candidate': Candidate,
+    'voter': Voter,
+}
+
+
+def _label(queryset, field=None):
+    label = queryset.model._meta.label
+    return f'{label}.{field} (cleared)' if field else label
+
+
+def _record(job, label, count):
+    job.progress[label] = job.progress.get(label, 0) + count
+    DeletionJob.objects.filter(pk=job.pk).update(progress=job.progress)
+
+
+def _delete_chunks(job, queryset, chunk_size, before_delete=None):
+    model = queryset.model
+    label = _label(queryset)
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return
+        with transaction.atomic():
+            batch = model._base_manager.filter(pk__in=pks)
+            if before_delete:
+                before_delete(batch)
+            deleted = batch._raw_delete(batch.db)
+            _record(job, label, deleted)
+
+
+def _clear_chunks(job, queryset, field, chunk_size):
+    model = queryset.model
+    label = _label(queryset, field)
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return
+        with transaction.atomic():
+            updated = model._base_manager.filter(pk__in=pks).update(**{field: None})
+            _record(job, label, updated)
+
+
+def _release_tallies(votes):
+    """Take the votes about to be deleted off their candidates' tallies."""
+    counts = votes.values('election_id', 'candidate_id').annotate(n=Count('id')).order_by()
+    elections = set()
+    for row in counts:
+        ElectionTally.objects.filter(
+            election_id=row['election_id'], candidate_id=row['candidate_id'],
+        ).update(count=F('count') - row['n'])
+        elections.add(row['election_id'])
+    for election_id in elections:
+        transaction.on_commit(lambda election_id=election_id: invalidate_election(election_id))
+
+
+def _delete_election(job, election_id, chunk_size):
+    LegacyVote = apps.get_model('voting', 'Vote')
+    Through = Candidate.elections.through
+    _delete_chunks(job, Vote.objects.filter(election_id=election_id), chunk_size)
+    _delete_chunks(job, LegacyVote.objects.filter(election_id=election_id), chunk_size)
+    _delete_chunks(job, ElectionTally.objects.filter(election_id=election_id), chunk_size)
+    _delete_chunks(job, Campaign.objects.filter(election_id=election_id), chunk_size)
+    _delete_chunks(job, Through.objects.filter(election_id=election_id), chunk_size)
+    _clear_chunks(job, Notification.objects.filter(election_id=election_id), 'election', chunk_size)
+    _clear_chunks(job, BroadcastNotification.objects.filter(election_id=election_id), 'election', chunk_size)
+    _delete_chunks(job, NotificationFanout.objects.filter(election_id=election_id), chunk_size)
+    _delete_chunks(job, ResultSnapshot.objects.filter(election_id=election_id), chunk_size)
+    _delete_chunks(job, Election.objects.filter(pk=election_id), chunk_size)
+    invalidate_election(election_id, published=True)
+
+
+def _delete_candidate(job, candidate_id, chunk_size):
+    LegacyVote = apps.get_model('voting', 'Vote')
+    Through = Candidate.elections.through
+    election_ids = list(Through.objects.filter(candidate_id=candidate_id).values_list('election_id', flat=True))
+    # The candidate's tally rows go too, so the other tallies stay correct
+    _delete_chunks(job, Vote.objects.filter(candidate_id=candidate_id), chunk_size)
+    _delete_chunks(job, LegacyVote.objects.filter(candidate_id=candidate_id), chunk_size)
+    _delete_chunks(job, ElectionTally.objects.filter(candidate_id=candidate_id), chunk_size)
+    _delete_chunks(job, Campaign.objects.filter(candidate_id=candidate_id), chunk_size)
+    _delete_chunks(job, Through.objects.filter(candidate_id=candidate_id), chunk_size)
+    _delete_chunks(job, Candidate.objects.filter(pk=candidate_id), chunk_size)
+    for election_id in election_ids:
+        invalidate_election(election_id)
+
+
+def _delete_voter(job, voter_id, chunk_size):
+    User = get_user_model()
+    LegacyVote = apps.get_model('voting', 'Vote')
+    BackupRecord = apps.get_model('backup', 'BackupRecord')
+    user_id = Voter.objects.filter(pk=voter_id).values_list('user_id', flat=True).first()
+    _delete_chunks(job, Vote.objects.filter(voter_id=voter_id), chunk_size, before_delete=_release_tallies)
+    _delete_chunks(job, Notification.objects.filter(voter_id=voter_id), chunk_size)
+    _delete_chunks(job, BroadcastReceipt.objects.filter(voter_id=voter_id), chunk_size)
+    if user_id is None:
+        return
+    # The login account goes with the voter record. The Voter row is removed
+    # last but one, so a retried job can still find the user it belongs to.
+    _delete_chunks(job, LegacyVote.objects.filter(voter_id=user_id), chunk_size)
+    _delete_chunks(job, LogEntry.objects.filter(user_id=user_id), chunk_size)
+    _delete_chunks(job, User.groups.through.objects.filter(customuser_id=user_id), chunk_size)
+    _delete_chunks(job, User.user_permissions.through.objects.filter(customuser_id=user_id), chunk_size)
+    _clear_chunks(job, AuditLog.objects.filter(actor_id=user_id), 'actor', chunk_size)
+    _clear_chunks(job, AuditDailySummary.objects.filter(actor_id=user_id), 'actor', chunk_size)
+    _clear_chunks(job, BackupRecord.objects.filter(performed_by_id=user_id), 'performed_by', chunk_size)
+    _clear_chunks(job, Candidate.objects.filter(user_id=user_id), 'user', chunk_size)
+    _clear_chunks(job, DeletionJob.objects.filter(requested_by_id=user_id), 'requested_by', chunk_size)
+    _clear_chunks(job, VerificationJob.objects.filter(requested_by_id=user_id), 'requested_by', chunk_size)
+    _delete_chunks(job, Voter.objects.filter(pk=voter_id), chunk_size)
+    _delete_chunks(job, User.objects.filter(pk=user_id), chunk_size)
+
+
+PLANS = {
+    'election': _delete_election,
+    'candidate': _delete_candidate,
+    'voter': _delete_voter,
+}
+
+
+def run_deletion_job(job, chunk_size=None):
+    """Run one pending (or retried) job to completion. Returns False if another worker has it."""
+    claimed = DeletionJob.objects.filter(pk=job.pk, status='pending').update(status='running')
+    if not claimed:
+        return False
+    job.status = 'running'
+    chunk_size = chunk_size or settings.DELETION_CHUNK_SIZE
+    try:
+        PLANS[job.target_type](job, job.target_id, chunk_size)
+    except Exception as exc:
+        logger.exception('Deletion job %s failed', job.pk)
+        job.status, job.error = 'failed', str(exc)
+        job.save(update_fields=['status', 'error'])
+        return True
+
+    model = TARGETS[job.target_type]
+    # Cleared if the requester deleted their own account
+    job.requested_by_id = DeletionJob.objects.values_list('requested_by_id', flat=True).get(pk=job.pk)
+    with transaction.atomic():
+        job.status, job.error, job.finished_at = 'done', '', timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        record([{
+            'actor_id': job.requested_by_id,
+            'action': 'delete',
+            'target_model': model._meta.label,
+            'target_repr': job.target_repr,
+            'details': {'source': 'deletion_job', 'job': job.pk, 'rows': job.progress},
+        }])
+    return True
+
+
+def run_pending_jobs(chunk_size=None):
+    """Run every pending job, oldest first. Returns the jobs that were run."""
+    ran = []
+    for job in DeletionJob.objects.filter(status='pending').order_by('created_at'):
+        if run_deletion_job(job, chunk_size):
+            ran.append(job)
+    return ran
+
+
+def schedule_deletion(target, requested_by=None):
+    """Queue ``target`` (an Election, Candidate or Voter) for deletion.
+
+    Returns the job. With ``DELETION_MODE = 'inline'`` it has already run;
+    with ``'background'`` it waits for ``manage.py run_deletion_jobs``.
+    """
+    target_type = next(name for name, model in TARGETS.items() if isinstance(target, model))
+    open_jobs = DeletionJob.objects.filter(target_type=target_type, target_id=target.pk, status__in=['pending', 'running'])
+    job = open_jobs.first()
+    if job is None:
+        try:
+            with transaction.atomic():
+                job = DeletionJob.objects.create(
+                    target_type=target_type, target_id=target.pk,
+                    target_repr=str(target)[:255], requested_by=requested_by,
+                )
+        except IntegrityError:
+            # Someone queued the same target a moment ago
+            return open_jobs.first()
+    if settings.DELETION_MODE == 'inline' and job.status == 'pending':
+        run_deletion_job(job)
+    return job
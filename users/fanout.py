@@ -0,0 +1,164 @@
+"""Fan-out of election event notifications to the voter roll.
+
+An election opening or a reminder falling due queues one
+``NotificationFanout`` row per (election, type); the unique constraint on
+that pair makes queueing idempotent. ``manage.py run_notification_fanout``
+picks the rows up outside any request. It reads eligible voter ids in pk
+order, one keyset chunk (``pk > last``, ``LIMIT``) at a time, and writes
+each chunk of notifications with ``notify_many`` in its own transaction,
+together with the job's ``last_voter_id`` checkpoint. A chunk is fully
+fetched before it is written, so no read cursor is open on the connection
+during the writes. A crashed run is requeued with
+``--retry-failed`` and carries on after the last voter it reached, so
+nobody is notified twice.
+
+Reminders go only to verified voters with no ballot in the election. That
+set is a ``NOT EXISTS`` anti-join: the verified voters are walked in pk
+order on ``voter_status_idx``, and each one is probed against the
+``unique_vote_per_voter_per_election`` index, an index-only lookup. It is
+fetched one keyset chunk at a time, so a voter who votes while the
+reminder is going out is skipped.
+
+Results are not fanned out: ``publish_election_results`` already tells
+every voter with a single broadcast row.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from elections.models import Election
+from .models import Notification, NotificationFanout, Vote, Voter
+from .notifications import notify_many
+
+logger = logging.getLogger(__name__)
+
+
+def _open_message(election):
+    closes = timezone.localtime(election.end_date)
+    return "Election Open", f"{election.title} is open for voting until {closes:%d %b %Y %H:%M}."
+
+
+def _reminder_message(election):
+    closes = timezone.localtime(election.end_date)
+    return "Election Reminder", f"{election.title} closes on {closes:%d %b %Y %H:%M}. Don't forget to vote."
+
+
+MESSAGES = {
+    'election_open': _open_message,
+    'election_reminder': _reminder_message,
+}
+
+
+def non_voters(election_id):
+    """Verified voters with no ballot in ``election_id``."""
+    ballots = Vote.objects.filter(election_id=election_id, voter_id=OuterRef('pk'))
+    return Voter.objects.filter(verification_status='verified').filter(~Exists(ballots))
+
+
+def pk_chunks(voters, chunk_size, after=0):
+    """Yield lists of ``voters``' pks in pk order, starting after pk ``after``."""
+    voter_ids = voters.order_by('pk').values_list('pk', flat=True)
+    while chunk := list(voter_ids.filter(pk__gt=after)[:chunk_size]):
+        yield chunk
+        after = chunk[-1]
+
+
+def non_voter_chunks(election_id, chunk_size, after=0):
+    """Yield lists of non-voter pks in pk order, starting after pk ``after``."""
+    return pk_chunks(non_voters(election_id), chunk_size, after)
+
+
+def turnout(election_id):
+    """``(ballots cast, verified voters yet to vote)`` for an election."""
+    return Vote.objects.filter(election_id=election_id).count(), non_voters(election_id).count()
+
+
+def recipient_chunks(job, chunk_size):
+    """Yield lists of the voter pks still to be notified for ``job``, in pk order."""
+    if job.notification_type == 'election_reminder':
+        yield from non_voter_chunks(job.election_id, chunk_size, after=job.last_voter_id)
+        return
+    yield from pk_chunks(Voter.objects.filter(verification_status='verified'), chunk_size, after=job.last_voter_id)
+
+
+def due_elections(notification_type, now=None):
+    """Active elections whose ``notification_type`` event is due and not yet queued."""
+    now = now or timezone.now()
+    elections = Election.objects.filter(is_active=True, start_date__lte=now, end_date__gt=now)
+    if notification_type == 'election_reminder':
+        lead = timedelta(hours=settings.ELECTION_REMINDER_LEAD_HOURS)
+        elections = elections.filter(end_date__lte=now + lead)
+    return elections.exclude(fanouts__notification_type=notification_type)
+
+
+def schedule_due_fanouts(elections=None, now=None):
+    """Queue a fan-out for every event that is due. Returns the new jobs' count.
+
+    ``elections`` narrows the scan, e.g. to the election an admin just opened.
+    """
+    jobs = []
+    for notification_type in MESSAGES:
+        due = due_elections(notification_type, now)
+        if elections is not None:
+            due = due.filter(pk__in=elections)
+        jobs += [NotificationFanout(election_id=pk, notification_type=notification_type) for pk in due.values_list('pk', flat=True)]
+    # A concurrent scheduler may have queued the same event
+    NotificationFanout.objects.bulk_create(jobs, ignore_conflicts=True)
+    return len(jobs)
+
+
+def schedule_fanout(election, notification_type):
+    """Queue ``notification_type`` for ``election`` now, whether due or not; returns its job."""
+    job, _ = NotificationFanout.objects.get_or_create(election=election, notification_type=notification_type)
+    job.election = election
+    return job
+
+
+def run_fanout(job, chunk_size=None):
+    """Deliver one pending (or requeued) fan-out. Returns False if another worker has it."""
+    claimed = NotificationFanout.objects.filter(pk=job.pk, status='pending').update(status='running')
+    if not claimed:
+        return False
+    job.status = 'running'
+    chunk_size = chunk_size or settings.NOTIFICATION_FANOUT_CHUNK_SIZE
+    election = job.election
+    title, message = MESSAGES[job.notification_type](election)
+    try:
+        # An event that went stale while queued (the election closed) is dropped
+        if election.is_active and election.end_date > timezone.now():
+            for chunk in recipient_chunks(job, chunk_size):
+                with transaction.atomic():
+                    notify_many([
+                        Notification(
+                            voter_id=voter_id, title=title, message=message,
+                            notification_type=job.notification_type, election=election,
+                        )
+                        for voter_id in chunk
+                    ])
+                    job.last_voter_id = chunk[-1]
+                    job.sent += len(chunk)
+                    NotificationFanout.objects.filter(pk=job.pk).update(
+                        last_voter_id=job.last_voter_id, sent=F('sent') + len(chunk),
+                    )
+    except Exception as exc:
+        logger.exception('Notification fan-out %s failed', job.pk)
+        job.status, job.error = 'failed', str(exc)
+        job.save(update_fields=['status', 'error'])
+        return True
+
+    job.status, job.error, job.finished_at = 'done', '', timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    return True
+
+
+def run_pending_fanouts(chunk_size=None):
+    """Run every pending fan-out, oldest first. Returns the jobs that were run."""
+    ran = []
+    for job in NotificationFanout.objects.filter(status='pending').select_related('election').order_by('created_at'):
+        if run_fanout(job, chunk_size):
+            ran.append(job)
+    return ran
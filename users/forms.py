@@ -1,3 +1,7 @@
+import csv
+import io
+import json
+
 from django import forms
 from .models import Voter, Campaign, Election,Candidate
 from django.contrib.auth import get_user_model
@@ -68,13 +72,65 @@ class ElectionForm(forms.ModelForm):
             'is_active': forms.CheckboxInput(attrs={'class': 'form-check-input', 'style': 'width: 20px; height: 20px;'}),
         }
 
+    slate = forms.FileField(
+        required=False,
+        help_text="Optional JSON or CSV ballot: rows of name, party, age, area, or an id of an existing candidate.",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.json,.csv'}),
+    )
+
     def __init__(self, *args, **kwargs):
         super(ElectionForm, self).__init__(*args, **kwargs)
         # ✅ FORCE REFRESH: Fetch all candidates every time the form loads
-        self.fields['candidates'].queryset = Candidate.objects.all()
+        self.fields['candidates'].queryset = Candidate.objects.select_related('party')
         # Optional: Custom label for the checkboxes
         self.fields['candidates'].label_from_instance = lambda obj: f"{obj.name} ({obj.party.name})"
 
+    def clean_slate(self):
+        upload = self.cleaned_data.get('slate')
+        if not upload:
+            return []
+        try:
+            text = upload.read().decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise forms.ValidationError("The slate must be a UTF-8 JSON or CSV file.")
+        if upload.name.lower().endswith('.json'):
+            try:
+                rows = json.loads(text)
+            except ValueError as exc:
+                raise forms.ValidationError(f"Invalid JSON slate: {exc}")
+            if isinstance(rows, dict):
+                rows = rows.get('candidates')
+            if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                raise forms.ValidationError("A JSON slate must be a list of candidate objects.")
+        else:
+            rows = list(csv.DictReader(io.StringIO(text)))
+
+        slate, errors = [], []
+        for number, row in enumerate(rows, start=1):
+            row = {key.strip().lower(): str(value).strip() for key, value in row.items() if key and value is not None}
+            if row.get('id'):
+                if not row['id'].isdigit():
+                    errors.append(f"Row {number}: id must be a number.")
+                else:
+                    slate.append({'id': int(row['id'])})
+                continue
+            missing = [field for field in ('name', 'party', 'age', 'area') if not row.get(field)]
+            if missing:
+                errors.append(f"Row {number}: missing {', '.join(missing)}.")
+            elif not row['age'].isdigit():
+                errors.append(f"Row {number}: age must be a whole number.")
+            elif len(row['name']) > 100 or len(row['party']) > 100 or len(row['area']) > 100:
+                errors.append(f"Row {number}: name, party and area are limited to 100 characters.")
+            else:
+                slate.append({'name': row['name'], 'party': row['party'], 'age': int(row['age']), 'area': row['area']})
+        ids = {row['id'] for row in slate if 'id' in row}
+        unknown = ids - set(Candidate.objects.filter(pk__in=ids).values_list('pk', flat=True))
+        if unknown:
+            errors.append(f"Unknown candidate id(s): {', '.join(map(str, sorted(unknown)))}.")
+        if errors:
+            raise forms.ValidationError(errors[:20])
+        return slate
+
 # --- 5. Voter Profile Update Form ---from django import forms
 from django.contrib.auth.models import User
 from .models import Voter
@@ -0,0 +1,210 @@
+"""Streaming bulk import of voters from CSV.
+
+The file is read row by row and processed in chunks, so memory use does
+not grow with the file. Each chunk is:
+
+1. validated against in-memory sets of every username, email and voter id
+   already taken (preloaded once from the database and extended as rows
+   are accepted, so duplicates inside the file are caught too);
+2. password-hashed in a process pool, since PBKDF2 is CPU bound;
+3. written with ``bulk_create`` for ``CustomUser`` then ``Voter`` in one
+   transaction, followed by a checkpoint recording how many data rows are
+   done.
+
+Rejected rows go to an error report CSV (without the password). An
+interrupted import resumes from the checkpoint.
+"""
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from audit.sink import record
+from .models import Voter
+
+REQUIRED_COLUMNS = ('username', 'email', 'password', 'voter_id', 'mobile_no', 'address')
+ERROR_COLUMNS = ('line', 'errors', 'username', 'email', 'voter_id')
+STATUSES = {choice for choice, _ in Voter.VERIFICATION_STATUS_CHOICES}
+
+
+def _init_worker():
+    # Spawned workers (non-fork platforms) start without app registry
+    import django
+    django.setup()
+
+
+def _read_checkpoint(path):
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_checkpoint(path, state):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as fh:
+        json.dump(state, fh)
+    os.replace(tmp, path)
+
+
+class VoterImporter:
+    def __init__(self, chunk_size=1000, workers=None, error_path=None, checkpoint_path=None, progress=None):
+        self.chunk_size = chunk_size
+        self.workers = os.cpu_count() if workers is None else workers
+        self.error_path = error_path
+        self.checkpoint_path = checkpoint_path
+        self.progress = progress or (lambda state: None)
+        self.User = get_user_model()
+
+    def load_taken(self):
+        users = self.User.objects.values_list('username', 'email')
+        self.usernames, self.emails = set(), set()
+        for username, email in users.iterator(chunk_size=10000):
+            self.usernames.add(username)
+            self.emails.add(email.lower())
+        self.voter_ids = set(Voter.objects.values_list('voter_id', flat=True).iterator(chunk_size=10000))
+
+    def validate(self, row):
+        errors = []
+        for column in REQUIRED_COLUMNS:
+            if not row.get(column):
+                errors.append(f'{column} is required')
+        if errors:
+            return errors
+        username, email, voter_id = row['username'], row['email'], row['voter_id']
+        try:
+            validate_email(email)
+        except ValidationError:
+            errors.append('email is invalid')
+        for column, limit in (('username', 150), ('voter_id', 20), ('mobile_no', 15)):
+            if len(row[column]) > limit:
+                errors.append(f'{column} is longer than {limit} characters')
+        if row.get('verification_status') and row['verification_status'] not in STATUSES:
+            errors.append('verification_status is invalid')
+        if username in self.usernames:
+            errors.append('username already exists')
+        if email.lower() in self.emails:
+            errors.append('email already exists')
+        if voter_id in self.voter_ids:
+            errors.append('voter_id already exists')
+        return errors
+
+    def run(self, path, resume=False):
+        """Import ``path``. Returns the final checkpoint state."""
+        state = {'source': os.path.abspath(path), 'rows': 0, 'imported': 0, 'failed': 0}
+        if resume and self.checkpoint_path:
+            saved = _read_checkpoint(self.checkpoint_path)
+            if saved and saved.get('source') == state['source']:
+                state = saved
+        self.load_taken()
+
+        pool = ProcessPoolExecutor(self.workers, initializer=_init_worker) if self.workers > 1 else None
+        errors_fh = open(self.error_path, 'a' if state['rows'] else 'w', newline='') if self.error_path else None
+        try:
+            self.errors = csv.writer(errors_fh) if errors_fh else None
+            if self.errors and not state['rows']:
+                self.errors.writerow(ERROR_COLUMNS)
+            with open(path, newline='', encoding='utf-8') as fh:
+                reader = csv.DictReader(fh)
+                missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or ())]
+                if missing:
+                    raise ValueError(f"CSV is missing column(s): {', '.join(missing)}")
+                chunk = []
+                for number, row in enumerate(reader, start=1):
+                    if number <= state['rows']:
+                        continue
+                    # line in the file, counting the header
+                    chunk.append((number + 1, row))
+                    if len(chunk) == self.chunk_size:
+                        self.import_chunk(chunk, state, pool)
+                        chunk = []
+                if chunk:
+                    self.import_chunk(chunk, state, pool)
+        finally:
+            if pool:
+                pool.shutdown()
+            if errors_fh:
+                errors_fh.close()
+        return state
+
+    def reject(self, line, row, errors):
+        if self.errors:
+            self.errors.writerow([line, '; '.join(errors), row.get('username', ''), row.get('email', ''), row.get('voter_id', '')])
+
+    def import_chunk(self, chunk, state, pool):
+        valid = []
+        for line, row in chunk:
+            errors = self.validate(row)
+            if errors:
+                self.reject(line, row, errors)
+                continue
+            self.usernames.add(row['username'])
+            self.emails.add(row['email'].lower())
+            self.voter_ids.add(row['voter_id'])
+            valid.append((line, row))
+
+        passwords = [row['password'] for _, row in valid]
+        if pool:
+            hashes = list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (self.workers * 4))))
+        else:
+            hashes = [make_password(p) for p in passwords]
+
+        try:
+            with transaction.atomic():
+                imported = self.write(list(zip(valid, hashes)))
+        except IntegrityError:
+            # A concurrent writer took one of the keys; fall back to row by row
+            imported = 0
+            for (line, row), password in zip(valid, hashes):
+                try:
+                    with transaction.atomic():
+                        imported += self.write([((line, row), password)])
+                except IntegrityError as exc:
+                    self.reject(line, row, [f'database rejected row: {exc}'])
+
+        state['rows'] += len(chunk)
+        state['imported'] += imported
+        state['failed'] += len(chunk) - imported
+        if self.checkpoint_path:
+            _write_checkpoint(self.checkpoint_path, state)
+        self.progress(state)
+
+    def write(self, rows):
+        if not rows:
+            return 0
+        now = timezone.now()
+        users = self.User.objects.bulk_create([
+            self.User(
+                username=row['username'],
+                email=self.User.objects.normalize_email(row['email']),
+                full_name=row.get('full_name') or '',
+                password=password,
+                role='voter',
+            )
+            for (_, row), password in rows
+        ])
+        Voter.objects.bulk_create([
+            Voter(
+                user_id=user.pk,
+                voter_id=row['voter_id'],
+                mobile_no=row['mobile_no'],
+                address=row['address'],
+                verification_status=row.get('verification_status') or 'pending',
+                verification_date=now if row.get('verification_status') == 'verified' else None,
+            )
+            for user, ((_, row), _) in zip(users, rows)
+        ])
+        record([{
+            'action': 'create', 'target_model': 'users.Voter',
+            'target_repr': f'{len(rows)} voters imported',
+            'details': {'source': 'import', 'voter_ids': [row['voter_id'] for (_, row), _ in rows]},
+        }])
+        return len(rows)
@@ -0,0 +1,170 @@
+"""Per-request SQL and render instrumentation.
+
+``QueryRecorder`` hooks a database connection with ``execute_wrapper`` and
+records every query's time and fingerprint. ``QueryInstrumentationMiddleware``
+(see ``users.middleware``) uses it per request, and tests can use it directly
+to enforce query budgets::
+
+    with QueryRecorder() as recorder:
+        self.client.get(url)
+    recorder.assert_budget(8)
+"""
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from django.db import connection as default_connection
+
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_SPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Normalise SQL so the same statement with different values compares equal."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER_LIST.sub('(...)', sql)
+    return _SPACE.sub(' ', sql.replace('%s', '?')).strip()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryRecorder:
+    """Record the queries run on ``connection`` while the context is active."""
+
+    def __init__(self, connection=None):
+        self.connection = connection or default_connection
+        self.count = 0
+        self.sql_time = 0.0
+        self.fingerprints = Counter()
+        self._wrapper = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def __enter__(self):
+        self._wrapper = self.connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self._wrapper.__exit__(*exc)
+        self._wrapper = None
+
+    def duplicates(self):
+        """Fingerprints that ran more than once, with their counts."""
+        return {fp: n for fp, n in self.fingerprints.items() if n > 1}
+
+    def assert_budget(self, max_queries):
+        if self.count > max_queries:
+            repeated = '\n'.join(f'  {n}x {fp}' for fp, n in self.duplicates().items())
+            raise QueryBudgetExceeded(
+                f'{self.count} queries executed, budget is {max_queries}.'
+                + (f'\nRepeated:\n{repeated}' if repeated else '')
+            )
+
+
+# Template render time for the current request, measured on the outermost
+# Template._render call only so {% extends %} / {% include %} are not counted twice.
+_render_time = ContextVar('render_time', default=None)
+_render_depth = ContextVar('render_depth', default=0)
+_render_patched = False
+
+
+def install_render_timer():
+    global _render_patched
+    if _render_patched:
+        return
+    from django.template.base import Template
+
+    original = Template._render
+
+    def timed_render(self, context):
+        totals = _render_time.get()
+        if totals is None:
+            return original(self, context)
+        depth = _render_depth.get()
+        _render_depth.set(depth + 1)
+        started = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            _render_depth.set(depth)
+            if depth == 0:
+                totals[0] += time.perf_counter() - started
+
+    Template._render = timed_render
+    _render_patched = True
+
+
+class RenderTimer:
+    def __enter__(self):
+        self.totals = [0.0]
+        self._token = _render_time.set(self.totals)
+        return self
+
+    def __exit__(self, *exc):
+        _render_time.reset(self._token)
+
+    @property
+    def seconds(self):
+        return self.totals[0]
+
+
+class ViewStats:
+    """In-memory per-view aggregates for the admin stats page."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view_name, queries, sql_time, render_time, total_time, duplicates):
+        with self._lock:
+            row = self._views.setdefault(view_name, {
+                'view': view_name, 'requests': 0, 'queries': 0, 'max_queries': 0,
+                'sql_ms': 0.0, 'render_ms': 0.0, 'total_ms': 0.0, 'duplicates': Counter(),
+            })
+            row['requests'] += 1
+            row['queries'] += queries
+            row['max_queries'] = max(row['max_queries'], queries)
+            row['sql_ms'] += sql_time * 1000
+            row['render_ms'] += render_time * 1000
+            row['total_ms'] += total_time * 1000
+            row['duplicates'].update(duplicates)
+
+    def snapshot(self):
+        """Per-view averages, most queries per request first."""
+        with self._lock:
+            rows = []
+            for row in self._views.values():
+                n = row['requests']
+                rows.append({
+                    'view': row['view'],
+                    'requests': n,
+                    'avg_queries': round(row['queries'] / n, 1),
+                    'max_queries': row['max_queries'],
+                    'avg_sql_ms': round(row['sql_ms'] / n, 2),
+                    'avg_render_ms': round(row['render_ms'] / n, 2),
+                    'avg_total_ms': round(row['total_ms'] / n, 2),
+                    'top_duplicates': row['duplicates'].most_common(3),
+                })
+        return sorted(rows, key=lambda r: r['avg_queries'], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+view_stats = ViewStats()
@@ -0,0 +1,205 @@
+import json
+import platform
+import subprocess
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+
+# scenario name -> status code a successful request returns
+SCENARIOS = {
+    'login': 302,
+    'voter_elections_list': 200,
+    'voter_view_campaigns': 200,
+    'voter_cast_vote': 302,
+    'voter_view_results': 200,
+    'admin_dashboard': 200,
+}
+
+BENCH_PASSWORD = 'bench-pass-123'
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the voting hot paths against a seeded throwaway test database and '
+            'write throughput and p50/p95/p99 latency per view as JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--voters', type=int, default=200, help='Verified voters to seed')
+        parser.add_argument('--candidates', type=int, default=10, help='Candidates per election')
+        parser.add_argument('--elections', type=int, default=2, help='Closed elections to seed (one open election is always added)')
+        parser.add_argument('--turnout', type=float, default=0.5, help='Mean turnout of the seeded elections')
+        parser.add_argument('--requests', type=int, default=100, help='Requests per scenario')
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='Only run this scenario (repeatable)')
+        parser.add_argument('--output', help='Write the JSON report here (default: stdout)')
+        parser.add_argument('--db-file', metavar='PATH',
+                            help='Seed a throwaway SQLite file here instead of an in-memory database, so commit '
+                                 'and fsync costs are measured (it is deleted afterwards)')
+
+    def handle(self, *args, **options):
+        # import lazily to avoid startup circular imports
+        from audit.sink import flush as flush_audit
+
+        setup_test_environment()
+        # create_test_db reads TEST['NAME']; SQLite defaults to an in-memory database
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        old_test_name = test_settings.get('NAME')
+        if options['db_file']:
+            test_settings['NAME'] = options['db_file']
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            dataset = self.seed(options)
+            report = {
+                'started_at': timezone.now().isoformat(),
+                'commit': self.git_commit(),
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'database': settings.DATABASES['default']['ENGINE'],
+                'database_name': connection.settings_dict['NAME'],
+                'in_memory': connection.vendor == 'sqlite' and connection.is_in_memory_db(),
+                'dataset': {
+                    'voters': options['voters'],
+                    'candidates_per_election': options['candidates'],
+                    'elections': options['elections'] + 1,
+                    'turnout': options['turnout'],
+                },
+                'scenarios': {},
+            }
+            for name in options['scenario'] or SCENARIOS:
+                report['scenarios'][name] = self.run_scenario(name, dataset, options['requests'])
+                self.stderr.write(self.format_line(name, report['scenarios'][name]))
+        finally:
+            # the async audit sink would otherwise write after the database is gone
+            flush_audit()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            test_settings['NAME'] = old_test_name
+            teardown_test_environment()
+
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(payload + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Benchmark report written to {options['output']}"))
+        else:
+            self.stdout.write(payload)
+
+    def seed(self, options):
+        # import lazily to avoid startup circular imports
+        from django.contrib.auth import get_user_model
+        from elections.models import Election
+        from users.models import Candidate
+        from users.seeding import seed_electorate
+        from users.services import publish_election_results
+
+        User = get_user_model()
+        summary = seed_electorate(
+            voters=options['voters'],
+            candidates=options['candidates'],
+            elections=options['elections'] + 1,
+            turnout=options['turnout'],
+            password=BENCH_PASSWORD,
+            prefix='bench',
+        )
+        admin = User.objects.create_superuser(
+            'bench-admin', 'bench-admin@example.com', BENCH_PASSWORD, role='admin', is_admin_approved=True,
+        )
+        open_election = Election.objects.get(pk=summary['elections'][0])
+        publish_election_results(Election.objects.get(pk=summary['elections'][-1]))
+
+        # Ballot and campaign scenarios need voters who have not voted yet
+        users = list(
+            User.objects.filter(voter__isnull=False)
+            .exclude(voter__vote__election=open_election).order_by('pk')
+        )
+        if len(users) < options['requests']:
+            raise CommandError(
+                f"Only {len(users)} seeded voters have not voted yet; raise --voters or lower --turnout"
+            )
+        return {
+            'admin': admin,
+            'users': users,
+            'elections': [open_election],
+            'candidates': list(Candidate.objects.filter(pk__in=summary['candidates']).order_by('pk')),
+        }
+
+    def run_scenario(self, name, dataset, count):
+        from django.test import Client
+
+        users = dataset['users']
+        election = dataset['elections'][0]
+        candidate = dataset['candidates'][0]
+        timings = []
+        queries = 0
+        errors = 0
+
+        shared = Client()
+        if name == 'admin_dashboard':
+            shared.force_login(dataset['admin'])
+        elif name in ('voter_elections_list', 'voter_view_results'):
+            shared.force_login(users[0])
+
+        for i in range(count):
+            client = shared
+            if name in ('login', 'voter_view_campaigns', 'voter_cast_vote'):
+                client = Client()
+                if name != 'login':
+                    client.force_login(users[i])
+
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                if name == 'login':
+                    resp = client.post(reverse('login'), {'username': users[i].username, 'password': BENCH_PASSWORD})
+                elif name == 'voter_elections_list':
+                    resp = client.get(reverse('voter_elections_list'))
+                elif name == 'voter_view_campaigns':
+                    resp = client.get(reverse('voter_view_campaigns', args=[election.pk]))
+                elif name == 'voter_cast_vote':
+                    resp = client.post(reverse('voter_cast_vote', args=[election.pk]), {'candidate_id': candidate.pk})
+                elif name == 'voter_view_results':
+                    resp = client.get(reverse('voter_view_results'))
+                else:
+                    resp = client.get(reverse('admin_dashboard'))
+                timings.append(time.perf_counter() - started)
+            queries += len(ctx.captured_queries)
+            if resp.status_code != SCENARIOS[name]:
+                errors += 1
+
+        total = sum(timings)
+        ordered = sorted(t * 1000 for t in timings)
+        return {
+            'requests': count,
+            'errors': errors,
+            'total_seconds': round(total, 4),
+            'throughput_rps': round(count / total, 2) if total else 0.0,
+            'mean_queries': round(queries / count, 2) if count else 0.0,
+            'p50_ms': round(percentile(ordered, 50), 3),
+            'p95_ms': round(percentile(ordered, 95), 3),
+            'p99_ms': round(percentile(ordered, 99), 3),
+        }
+
+    @staticmethod
+    def format_line(name, stats):
+        return (f"{name:<22} {stats['throughput_rps']:>9.1f} req/s  p50 {stats['p50_ms']:.1f}ms  "
+                f"p95 {stats['p95_ms']:.1f}ms  p99 {stats['p99_ms']:.1f}ms  queries {stats['mean_queries']}")
+
+    @staticmethod
+    def git_commit():
+        try:
+            return subprocess.check_output(
+                ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL, text=True,
+            ).strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
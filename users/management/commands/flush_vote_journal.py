@@ -0,0 +1,23 @@
+import time
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Flush journalled ballots into users.Vote in batches, replaying any segments left by a crash.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Ballots per bulk_create batch (default: VOTE_JOURNAL_BATCH_SIZE)')
+        parser.add_argument('--follow', action='store_true', help='Keep running and flush every --interval seconds')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds between flushes with --follow')
+
+    def handle(self, *args, **options):
+        # import lazily to avoid startup circular imports
+        from users.vote_journal import flush_journal
+
+        while True:
+            read, written = flush_journal(batch_size=options['batch_size'])
+            if read or not options['follow']:
+                self.stdout.write(self.style.SUCCESS(f'Flushed {written} ballot(s) ({read} read from journal)'))
+            if not options['follow']:
+                break
+            time.sleep(options['interval'])
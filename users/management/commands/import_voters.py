@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Stream voters from a CSV (username, email, password, full_name, voter_id, mobile_no, address, '
+            'optional verification_status) into the database in chunks, hashing passwords in parallel.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', help='CSV file with a header row')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows validated and written per transaction')
+        parser.add_argument('--workers', type=int, help='Password hashing processes (default: CPU count, 1 hashes in-process)')
+        parser.add_argument('--checkpoint', help='Checkpoint file (default: <csv_path>.checkpoint.json)')
+        parser.add_argument('--errors', help='Rejected rows report (default: <csv_path>.errors.csv)')
+        parser.add_argument('--resume', action='store_true', help='Continue after the rows recorded in the checkpoint')
+
+    def handle(self, *args, **options):
+        # import lazily to avoid startup circular imports
+        from users.importing import VoterImporter
+
+        path = options['csv_path']
+        error_path = options['errors'] or f'{path}.errors.csv'
+
+        def progress(state):
+            self.stdout.write(f"Rows {state['rows']}: imported {state['imported']}, rejected {state['failed']}")
+
+        importer = VoterImporter(
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            error_path=error_path,
+            checkpoint_path=options['checkpoint'] or f'{path}.checkpoint.json',
+            progress=progress,
+        )
+        try:
+            state = importer.run(path, resume=options['resume'])
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {state['imported']} voter(s) from {state['rows']} row(s)"))
+        if state['failed']:
+            self.stdout.write(self.style.WARNING(f"{state['failed']} row(s) rejected; see {error_path}"))
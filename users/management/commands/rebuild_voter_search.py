@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+class Command(BaseCommand):
+    help = ('Recreate the SQLite FTS5 voter search index and its triggers and repopulate it. '
+            'Run after a migration that rebuilds users_voter or users_customuser.')
+
+    def handle(self, *args, **options):
+        # import lazily to avoid startup circular imports
+        from users.search import rebuild_search_index, search_index_supported
+
+        if not search_index_supported():
+            self.stdout.write(self.style.WARNING('Voter search index is SQLite only; searches use icontains here'))
+            return
+        with transaction.atomic():
+            indexed = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} voter(s) for search'))
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+
+
+class Command(BaseCommand):
+    help = 'Verify users.ElectionTally against raw votes and rebuild any election whose tallies have drifted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--election', type=int, action='append', help='Only reconcile this election id (repeatable)')
+        parser.add_argument('--check', action='store_true', help='Report drift and exit with an error instead of rebuilding')
+
+    def handle(self, *args, **options):
+        # import lazily to avoid startup circular imports
+        from users.models import Vote, ElectionTally
+
+        votes = Vote.objects.all()
+        tallies = ElectionTally.objects.filter(count__gt=0)
+        if options['election']:
+            votes = votes.filter(election_id__in=options['election'])
+            tallies = tallies.filter(election_id__in=options['election'])
+
+        expected = self.counts(votes)
+        actual = {
+            (row['election_id'], row['candidate_id']): row['count']
+            for row in tallies.values('election_id', 'candidate_id', 'count')
+        }
+
+        drifted = sorted({
+            election_id for election_id, candidate_id in expected.keys() | actual.keys()
+            if expected.get((election_id, candidate_id), 0) != actual.get((election_id, candidate_id), 0)
+        })
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS(f'Tallies match raw votes ({len(expected)} candidate row(s) checked)'))
+            return
+
+        for election_id in drifted:
+            self.stdout.write(self.style.WARNING(f'Election {election_id}: tallies differ from raw votes'))
+        if options['check']:
+            raise CommandError(f'{len(drifted)} election(s) have drifted tallies')
+
+        with transaction.atomic():
+            # The delete takes the write lock first, so no ballot can commit
+            # between the recount below and the rebuild; the counts taken
+            # above may already be stale.
+            ElectionTally.objects.filter(election_id__in=drifted).delete()
+            ElectionTally.objects.bulk_create(
+                ElectionTally(election_id=election_id, candidate_id=candidate_id, count=total)
+                for (election_id, candidate_id), total in self.counts(votes.filter(election_id__in=drifted)).items()
+            )
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt tallies for {len(drifted)} election(s)'))
+
+    @staticmethod
+    def counts(votes):
+        """``{(election id, candidate id): votes}`` counted from the raw ``Vote`` rows."""
+        return {
+            (row['election_id'], row['candidate_id']): row['total']
+            for row in votes.values('election_id', 'candidate_id').annotate(total=Count('id')).order_by()
+        }
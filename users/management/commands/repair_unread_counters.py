@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Recompute every voter\'s unread notification counters from the notification and receipt rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Voters checked per batch')
+        parser.add_argument('--check', action='store_true', help='Report drift and exit with an error instead of repairing')
+
+    def handle(self, *args, **options):
+        # import lazily to avoid startup circular imports
+        from users.notifications import repair_unread_counters
+
+        drifted = repair_unread_counters(chunk_size=options['chunk_size'], dry_run=options['check'])
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('Unread counters match the notification rows'))
+        elif options['check']:
+            raise CommandError(f'{drifted} voter(s) have wrong unread counters')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Repaired unread counters for {drifted} voter(s)'))
@@ -0,0 +1,31 @@
+import time
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Run queued election, candidate and voter deletions in chunked transactions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=None, help='Rows deleted per transaction (default: DELETION_CHUNK_SIZE)')
+        parser.add_argument('--retry-failed', action='store_true', help='Requeue failed and interrupted jobs before running; they resume where they stopped')
+        parser.add_argument('--follow', action='store_true', help='Keep running and pick up new jobs every --interval seconds')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls with --follow')
+
+    def handle(self, *args, **options):
+        # import lazily to avoid startup circular imports
+        from users.deletion import run_pending_jobs
+        from users.models import DeletionJob
+
+        if options['retry_failed']:
+            # 'running' rows are left behind by a worker that died mid-job
+            DeletionJob.objects.filter(status__in=['failed', 'running']).update(status='pending')
+
+        while True:
+            for job in run_pending_jobs(chunk_size=options['chunk_size']):
+                if job.status == 'done':
+                    self.stdout.write(self.style.SUCCESS(f'Deleted {job.target_type} {job.target_repr}: {job.deleted_rows} row(s)'))
+                else:
+                    self.stdout.write(self.style.ERROR(f'Failed to delete {job.target_type} {job.target_repr}: {job.error}'))
+            if not options['follow']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,35 @@
+import time
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Queue due election open/reminder notifications and write them to voters in chunked transactions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=None, help='Notifications written per transaction (default: NOTIFICATION_FANOUT_CHUNK_SIZE)')
+        parser.add_argument('--retry-failed', action='store_true', help='Requeue failed and interrupted fan-outs before running; they resume after the last voter reached')
+        parser.add_argument('--follow', action='store_true', help='Keep running, checking for due events every --interval seconds')
+        parser.add_argument('--interval', type=float, default=60.0, help='Seconds between polls with --follow')
+
+    def handle(self, *args, **options):
+        # import lazily to avoid startup circular imports
+        from users.fanout import schedule_due_fanouts, run_pending_fanouts
+        from users.models import NotificationFanout
+
+        if options['retry_failed']:
+            # 'running' rows are left behind by a worker that died mid-run
+            NotificationFanout.objects.filter(status__in=['failed', 'running']).update(status='pending')
+
+        while True:
+            queued = schedule_due_fanouts()
+            if queued:
+                self.stdout.write(f'Queued {queued} fan-out(s)')
+            for job in run_pending_fanouts(chunk_size=options['chunk_size']):
+                label = f'{job.get_notification_type_display()} for {job.election.title}'
+                if job.status == 'done':
+                    self.stdout.write(self.style.SUCCESS(f'{label}: {job.sent} voter(s) notified'))
+                else:
+                    self.stdout.write(self.style.ERROR(f'{label} failed after {job.sent} voter(s): {job.error}'))
+            if not options['follow']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,31 @@
+import time
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Run bulk voter verifications queued from the voter management page, in chunked transactions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=None, help='Voters verified per transaction (default: VERIFICATION_CHUNK_SIZE)')
+        parser.add_argument('--retry-failed', action='store_true', help='Requeue failed and interrupted jobs before running; they resume where they stopped')
+        parser.add_argument('--follow', action='store_true', help='Keep running and pick up new jobs every --interval seconds')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls with --follow')
+
+    def handle(self, *args, **options):
+        # import lazily to avoid startup circular imports
+        from users.models import VerificationJob
+        from users.verification import run_pending_jobs
+
+        if options['retry_failed']:
+            # 'running' rows are left behind by a worker that died mid-job
+            VerificationJob.objects.filter(status__in=['failed', 'running']).update(status='pending')
+
+        while True:
+            for job in run_pending_jobs(chunk_size=options['chunk_size']):
+                if job.status == 'done':
+                    self.stdout.write(self.style.SUCCESS(f'Verified {job.verified} voter(s): {job.description}'))
+                else:
+                    self.stdout.write(self.style.ERROR(f'Failed to verify {job.description}: {job.error}'))
+            if not options['follow']:
+                break
+            time.sleep(options['interval'])
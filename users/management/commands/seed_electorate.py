@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = ('Generate a synthetic electorate (parties, candidates, elections, verified voters and votes) '
+            'with chunked bulk inserts and a deterministic seed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--voters', type=int, default=10000, help='Verified voters to create')
+        parser.add_argument('--parties', type=int, default=5)
+        parser.add_argument('--candidates', type=int, default=20, help='Candidates, spread across --areas')
+        parser.add_argument('--areas', type=int, default=10)
+        parser.add_argument('--elections', type=int, default=2, help='The first is open, the rest have closed')
+        parser.add_argument('--turnout', type=float, default=0.6, help='Mean share of voters who vote in each election')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; the same seed gives the same data')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per bulk_create / transaction')
+        parser.add_argument('--password', default='voter-pass', help='Password shared by every generated voter')
+        parser.add_argument('--prefix', default='seed', help='Prefix for generated names; use a new one to seed again')
+
+    def handle(self, *args, **options):
+        # import lazily to avoid startup circular imports
+        from users.seeding import seed_electorate
+
+        summary = seed_electorate(
+            voters=options['voters'],
+            parties=options['parties'],
+            candidates=options['candidates'],
+            areas=options['areas'],
+            elections=options['elections'],
+            turnout=options['turnout'],
+            seed=options['seed'],
+            chunk_size=options['chunk_size'],
+            password=options['password'],
+            prefix=options['prefix'],
+            progress=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {summary['voters']} voters and {summary['votes']} votes "
+            f"across {len(summary['elections'])} election(s)"
+        ))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Report turnout and remind verified voters who have not voted yet in active elections.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--election', type=int, action='append', dest='elections', help='Election id (repeatable; default: every open election)')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Reminders written per transaction (default: NOTIFICATION_FANOUT_CHUNK_SIZE)')
+        parser.add_argument('--report-only', action='store_true', help='Print turnout without sending anything')
+
+    def handle(self, *args, **options):
+        # import lazily to avoid startup circular imports
+        from django.utils import timezone
+        from elections.models import Election
+        from users.fanout import run_fanout, schedule_fanout, turnout
+
+        now = timezone.now()
+        elections = Election.objects.filter(is_active=True, start_date__lte=now, end_date__gt=now).order_by('end_date')
+        if options['elections']:
+            elections = elections.filter(pk__in=options['elections'])
+            missing = set(options['elections']) - set(elections.values_list('pk', flat=True))
+            if missing:
+                raise CommandError(f"Not open for voting: election(s) {', '.join(map(str, sorted(missing)))}")
+
+        for election in elections:
+            cast, waiting = turnout(election.pk)
+            share = cast / (cast + waiting) if cast + waiting else 0
+            self.stdout.write(f'{election.title}: {cast} ballot(s) cast, {waiting} verified voter(s) yet to vote ({share:.0%} turnout)')
+            if options['report_only']:
+                continue
+            job = schedule_fanout(election, 'election_reminder')
+            # One reminder per election; a failed or interrupted one is resumed
+            if job.status == 'failed':
+                job.status = 'pending'
+                job.save(update_fields=['status'])
+            if job.status != 'pending':
+                self.stdout.write(f'  reminder already {job.get_status_display().lower()} ({job.sent} sent)')
+                continue
+            run_fanout(job, chunk_size=options['chunk_size'])
+            if job.status == 'done':
+                self.stdout.write(self.style.SUCCESS(f'  reminded {job.sent} voter(s)'))
+            else:
+                self.stdout.write(self.style.ERROR(f'  reminder failed after {job.sent} voter(s): {job.error}'))
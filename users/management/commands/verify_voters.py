@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Bulk-verify pending voters, either all of them or those listed in a file of voter ids, '
+            'and send each one a verification notification.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all-pending', action='store_true', help='Verify every pending voter')
+        parser.add_argument('--file', help='Text or CSV file of voter ids (first column), one per line')
+        parser.add_argument('--voter-id', action='append', default=[], help='Verify this voter id (repeatable)')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Voters updated per transaction')
+
+    def handle(self, *args, **options):
+        # import lazily to avoid startup circular imports
+        from users.models import Voter
+        from users.services import bulk_verify_voters, parse_voter_codes
+
+        codes = list(options['voter_id'])
+        if options['file']:
+            try:
+                with open(options['file'], encoding='utf-8') as fh:
+                    codes.extend(parse_voter_codes(fh))
+            except OSError as exc:
+                raise CommandError(f"Cannot read {options['file']}: {exc}")
+        if options['all_pending'] == bool(codes):
+            raise CommandError('Pass either --all-pending or voter ids (--file / --voter-id)')
+
+        def progress(done, total):
+            self.stdout.write(f'Verified {done}/{total}')
+
+        if options['all_pending']:
+            verified = bulk_verify_voters(queryset=Voter.objects.all(), chunk_size=options['chunk_size'], progress=progress)
+        else:
+            verified = bulk_verify_voters(voter_codes=codes, chunk_size=options['chunk_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f'Verified {verified} voter(s)'))
@@ -0,0 +1,70 @@
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .instrumentation import QueryRecorder, RenderTimer, install_render_timer, view_stats
+from . import nplusone
+
+logger = logging.getLogger('users.instrumentation')
+
+
+class QueryInstrumentationMiddleware:
+    """Opt-in per-view query count, SQL time, duplicate and render time recording.
+
+    Enabled with ``QUERY_INSTRUMENTATION = True``. Each response gets
+    ``X-Query-Count``, ``X-Query-Time-Ms``, ``X-Render-Time-Ms`` and
+    ``X-Duplicate-Queries`` headers, one JSON log line is written to the
+    ``users.instrumentation`` logger, and totals are kept for the admin
+    query stats page.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        install_render_timer()
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with QueryRecorder() as recorder, RenderTimer() as render:
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = (match.view_name if match else None) or request.path
+        duplicates = recorder.duplicates()
+
+        response['X-Query-Count'] = str(recorder.count)
+        response['X-Query-Time-Ms'] = f'{recorder.sql_time * 1000:.2f}'
+        response['X-Render-Time-Ms'] = f'{render.seconds * 1000:.2f}'
+        response['X-Duplicate-Queries'] = str(sum(n - 1 for n in duplicates.values()))
+
+        view_stats.record(view_name, recorder.count, recorder.sql_time, render.seconds, total, duplicates)
+        logger.info(json.dumps({
+            'view': view_name,
+            'method': request.method,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'sql_ms': round(recorder.sql_time * 1000, 2),
+            'render_ms': round(render.seconds * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+            'duplicates': duplicates,
+        }))
+        return response
+
+
+class NPlusOneMiddleware:
+    """Run every request inside an N+1 detection scope (off when NPLUSONE_MODE = 'off')."""
+
+    def __init__(self, get_response):
+        if getattr(settings, 'NPLUSONE_MODE', 'log') == 'off':
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        nplusone.install()
+
+    def __call__(self, request):
+        with nplusone.detect_n_plus_one(label=request.path):
+            return self.get_response(request)
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_tallies(apps, schema_editor):
+    Vote = apps.get_model('users', 'Vote')
+    ElectionTally = apps.get_model('users', 'ElectionTally')
+    counts = (
+        Vote.objects.values('election_id', 'candidate_id')
+        .annotate(total=Count('id')).order_by()
+    )
+    ElectionTally.objects.bulk_create(
+        ElectionTally(election_id=row['election_id'], candidate_id=row['candidate_id'], count=row['total'])
+        for row in counts
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0003_alter_election_results_published'),
+        ('users', '0019_customuser_is_admin_approved'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ElectionTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('candidate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tallies', to='users.candidate')),
+                ('election', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tallies', to='elections.election')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('election', 'candidate'), name='unique_tally_per_candidate_per_election')],
+            },
+        ),
+        migrations.RunPython(backfill_tallies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0003_alter_election_results_published'),
+        ('users', '0020_electiontally'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultSnapshot',
+            fields=[
+                ('election', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='result_snapshot', serialize=False, to='elections.election')),
+                ('results', models.JSONField(default=list)),
+                ('total_votes', models.PositiveIntegerField(default=0)),
+                ('checksum', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
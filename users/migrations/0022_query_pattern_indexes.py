@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0004_query_pattern_indexes'),
+        ('users', '0021_resultsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['voter', 'is_read'], name='notification_voter_read_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vote',
+            index=models.Index(fields=['election', 'candidate'], name='vote_election_candidate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voter',
+            index=models.Index(fields=['verification_status'], name='voter_status_idx'),
+        ),
+    ]
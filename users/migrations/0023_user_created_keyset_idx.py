@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0022_query_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['-created_at', '-user_id'], name='user_created_keyset_idx'),
+        ),
+    ]
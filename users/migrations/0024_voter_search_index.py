@@ -0,0 +1,81 @@
+from django.db import migrations
+
+# The DDL as of this migration, frozen here: later changes to users.search
+# must not change what this migration does.
+SEARCH_TABLE = 'users_voter_search'
+
+CREATE_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        username, email, voter_id, mobile_no,
+        tokenize = 'unicode61', prefix = '2 3 4'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai AFTER INSERT ON users_voter BEGIN
+        INSERT INTO {SEARCH_TABLE} (rowid, username, email, voter_id, mobile_no)
+        SELECT new.id, u.username, u.email, new.voter_id, new.mobile_no
+        FROM users_customuser u WHERE u.user_id = new.user_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au AFTER UPDATE OF user_id, voter_id, mobile_no ON users_voter BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id;
+        INSERT INTO {SEARCH_TABLE} (rowid, username, email, voter_id, mobile_no)
+        SELECT new.id, u.username, u.email, new.voter_id, new.mobile_no
+        FROM users_customuser u WHERE u.user_id = new.user_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad AFTER DELETE ON users_voter BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_user_au AFTER UPDATE OF username, email ON users_customuser BEGIN
+        UPDATE {SEARCH_TABLE} SET username = new.username, email = new.email
+        WHERE rowid = (SELECT id FROM users_voter WHERE user_id = new.user_id);
+    END
+    """,
+    f'DELETE FROM {SEARCH_TABLE}',
+    f"""
+    INSERT INTO {SEARCH_TABLE} (rowid, username, email, voter_id, mobile_no)
+    SELECT v.id, u.username, u.email, v.voter_id, v.mobile_no
+    FROM users_voter v JOIN users_customuser u ON u.user_id = v.user_id
+    """,
+    f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')",
+]
+
+DROP_SQL = [
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_user_au',
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_au',
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_ai',
+    f'DROP TABLE IF EXISTS {SEARCH_TABLE}',
+]
+
+
+def create_search_index(apps, schema_editor):
+    # SQLite only; other engines fall back to icontains matching (see users.search)
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in CREATE_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0023_user_created_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
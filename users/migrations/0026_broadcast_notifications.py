@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0004_query_pattern_indexes'),
+        ('users', '0025_deletionjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BroadcastNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255)),
+                ('message', models.TextField()),
+                ('notification_type', models.CharField(choices=[('registration', 'Registration'), ('verification', 'Verification Status'), ('election_open', 'Election Open'), ('election_reminder', 'Election Reminder'), ('vote_confirmation', 'Vote Confirmation'), ('results_available', 'Results Available'), ('system', 'System Alert')], default='system', max_length=30)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('election', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='elections.election')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BroadcastReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('read_at', models.DateTimeField(auto_now_add=True)),
+                ('broadcast', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receipts', to='users.broadcastnotification')),
+                ('voter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='broadcast_receipts', to='users.voter')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='broadcastnotification',
+            index=models.Index(fields=['-created_at'], name='broadcast_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='broadcastreceipt',
+            constraint=models.UniqueConstraint(fields=('voter', 'broadcast'), name='unique_receipt_per_voter_per_broadcast'),
+        ),
+    ]
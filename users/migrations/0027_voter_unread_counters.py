@@ -0,0 +1,100 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:21
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+# The search triggers as of this migration (see 0024), frozen here: later
+# changes to users.search must not change what this migration does.
+SEARCH_TABLE = 'users_voter_search'
+
+TRIGGER_SQL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai AFTER INSERT ON users_voter BEGIN
+        INSERT INTO {SEARCH_TABLE} (rowid, username, email, voter_id, mobile_no)
+        SELECT new.id, u.username, u.email, new.voter_id, new.mobile_no
+        FROM users_customuser u WHERE u.user_id = new.user_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au AFTER UPDATE OF user_id, voter_id, mobile_no ON users_voter BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id;
+        INSERT INTO {SEARCH_TABLE} (rowid, username, email, voter_id, mobile_no)
+        SELECT new.id, u.username, u.email, new.voter_id, new.mobile_no
+        FROM users_customuser u WHERE u.user_id = new.user_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad AFTER DELETE ON users_voter BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_user_au AFTER UPDATE OF username, email ON users_customuser BEGIN
+        UPDATE {SEARCH_TABLE} SET username = new.username, email = new.email
+        WHERE rowid = (SELECT id FROM users_voter WHERE user_id = new.user_id);
+    END
+    """,
+]
+
+DROP_TRIGGERS_SQL = [
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_user_au',
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_au',
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_ai',
+]
+
+
+def drop_triggers(apps, schema_editor):
+    # Adding a NOT NULL column rebuilds users_voter on SQLite; the search
+    # triggers reference it and are recreated afterwards. The rebuild keeps
+    # every voter id, so the index itself stays valid.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_TRIGGERS_SQL:
+        schema_editor.execute(statement)
+
+
+def restore_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in TRIGGER_SQL:
+        schema_editor.execute(statement)
+
+
+def backfill_counters(apps, schema_editor):
+    Voter = apps.get_model('users', 'Voter')
+    Notification = apps.get_model('users', 'Notification')
+    BroadcastReceipt = apps.get_model('users', 'BroadcastReceipt')
+
+    def count_of(model, **filters):
+        rows = model.objects.filter(voter=OuterRef('pk'), **filters).order_by().values('voter').annotate(n=Count('pk')).values('n')
+        return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+    Voter.objects.update(
+        unread_notifications=count_of(Notification, is_read=False),
+        broadcasts_read=count_of(BroadcastReceipt),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0026_broadcast_notifications'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_triggers, restore_triggers),
+        migrations.AddField(
+            model_name='voter',
+            name='broadcasts_read',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='voter',
+            name='unread_notifications',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+        migrations.RunPython(restore_triggers, drop_triggers),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elections', '0004_query_pattern_indexes'),
+        ('users', '0027_voter_unread_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationFanout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_type', models.CharField(choices=[('election_open', 'Election Open'), ('election_reminder', 'Election Reminder')], max_length=30)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('last_voter_id', models.PositiveIntegerField(default=0)),
+                ('sent', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('election', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fanouts', to='elections.election')),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'constraints': [models.UniqueConstraint(fields=('election', 'notification_type'), name='one_fanout_per_election_event')],
+            },
+        ),
+    ]
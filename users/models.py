@@ -68,6 +68,12 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = "username"
     REQUIRED_FIELDS = ["email"]
 
+    class Meta:
+        indexes = [
+            # Keyset pagination key for the admin voter listing
+            models.Index(fields=["-created_at", "-user_id"], name="user_created_keyset_idx"),
+        ]
+
     def __str__(self):
         return self.username
 
@@ -147,6 +153,16 @@ class Voter(models.Model):
     )
     verification_date = models.DateTimeField(null=True, blank=True)
 
+    # Denormalised for the notification badge; maintained by users.notifications
+    # and rebuilt by `manage.py repair_unread_counters`.
+    unread_notifications = models.PositiveIntegerField(default=0)
+    broadcasts_read = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["verification_status"], name="voter_status_idx"),
+        ]
+
     def __str__(self):
         return self.user.username
 
@@ -172,11 +188,66 @@ class Vote(models.Model):
                 name="unique_vote_per_voter_per_election",
             )
         ]
+        indexes = [
+            # Covers per-election GROUP BY candidate counts
+            models.Index(fields=["election", "candidate"], name="vote_election_candidate_idx"),
+        ]
 
     def __str__(self):
         return f"{self.voter.user.username} voted in {self.election.title}"
 
 
+# =========================
+# ELECTION TALLY MODEL
+# =========================
+class ElectionTally(models.Model):
+    """Running vote count per candidate, bumped in the same transaction as each Vote."""
+    election = models.ForeignKey(
+        Election, on_delete=models.CASCADE, related_name="tallies"
+    )
+    candidate = models.ForeignKey(
+        Candidate, on_delete=models.CASCADE, related_name="tallies"
+    )
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["election", "candidate"],
+                name="unique_tally_per_candidate_per_election",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.candidate_id} in {self.election_id}: {self.count}"
+
+
+# =========================
+# RESULT SNAPSHOT MODEL
+# =========================
+class ResultSnapshot(models.Model):
+    """Results frozen when an election is published. Never updated afterwards."""
+    election = models.OneToOneField(
+        Election,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="result_snapshot",
+    )
+    # [{"candidate_name", "party_name", "votes", "percentage"}, ...] by votes
+    results = models.JSONField(default=list)
+    total_votes = models.PositiveIntegerField(default=0)
+    checksum = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Result snapshots are immutable once published.")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"Results for election {self.election_id} ({self.total_votes} votes)"
+
+
 # =========================
 # NOTIFICATION MODEL
 # =========================
@@ -207,6 +278,184 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["voter", "is_read"], name="notification_voter_read_idx"),
+        ]
 
     def __str__(self):
         return f"{self.voter.user.username} - {self.title}"
+
+
+# =========================
+# DELETION JOB MODEL
+# =========================
+class DeletionJob(models.Model):
+    """A queued delete of an election, candidate or voter and everything hanging off it.
+
+    Run by ``users.deletion.run_deletion_job``, which removes dependents in
+    bounded chunks instead of one ORM cascade (see that module).
+    """
+    TARGET_CHOICES = [
+        ("election", "Election"),
+        ("candidate", "Candidate"),
+        ("voter", "Voter"),
+    ]
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    target_type = models.CharField(max_length=20, choices=TARGET_CHOICES)
+    target_id = models.PositiveIntegerField()
+    target_repr = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    # {"users.Vote": 1200, ...} rows removed so far, per table
+    progress = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["target_type", "target_id"],
+                condition=models.Q(status__in=["pending", "running"]),
+                name="one_open_deletion_job_per_target",
+            )
+        ]
+
+    @property
+    def deleted_rows(self):
+        return sum(self.progress.values())
+
+    def __str__(self):
+        return f"Delete {self.target_type} {self.target_repr or self.target_id} ({self.status})"
+
+
+class NotificationFanout(models.Model):
+    """Delivery of one election event notification to every eligible voter.
+
+    One row per (election, type), so an event is never sent twice. Run by
+    ``users.fanout.run_fanout``, which inserts the notifications in chunks
+    and records the last voter reached so an interrupted run resumes there.
+    """
+    TYPE_CHOICES = [
+        ("election_open", "Election Open"),
+        ("election_reminder", "Election Reminder"),
+    ]
+    STATUS_CHOICES = DeletionJob.STATUS_CHOICES
+
+    election = models.ForeignKey(Election, on_delete=models.CASCADE, related_name="fanouts")
+    notification_type = models.CharField(max_length=30, choices=TYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    # Voter pk of the last notification written; the next chunk starts after it
+    last_voter_id = models.PositiveIntegerField(default=0)
+    sent = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["election", "notification_type"],
+                name="one_fanout_per_election_event",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.get_notification_type_display()} for election {self.election_id} ({self.status})"
+
+
+class VerificationJob(models.Model):
+    """A queued bulk verification from the voter management page.
+
+    The voters are either an uploaded list of public ids (``voter_codes``)
+    or the pending matches of the page's search and status filter. Run by
+    ``users.verification.run_verification_job``, which stores ``verified``
+    after every chunk so the page can show progress.
+    """
+    STATUS_CHOICES = DeletionJob.STATUS_CHOICES
+
+    voter_codes = models.JSONField(null=True, blank=True)
+    search_query = models.CharField(max_length=255, blank=True)
+    filter_status = models.CharField(max_length=20, default="all")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    total = models.PositiveIntegerField(default=0)
+    verified = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+
+    @property
+    def description(self):
+        if self.voter_codes is not None:
+            return f"{len(self.voter_codes)} listed voter id(s)"
+        return f"pending voters matching '{self.search_query}'" if self.search_query else "all pending voters"
+
+    def __str__(self):
+        return f"Verify {self.description} ({self.status})"
+
+
+# =========================
+# BROADCAST NOTIFICATION MODELS
+# =========================
+class BroadcastNotification(models.Model):
+    """A notification for every voter, stored once.
+
+    Read state lives in ``BroadcastReceipt``, one row per voter who has
+    read it; no row means unread. ``users.notifications.notification_feed``
+    merges broadcasts with each voter's personal ``Notification`` rows.
+    """
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    notification_type = models.CharField(
+        max_length=30, choices=Notification.NOTIFICATION_TYPE_CHOICES, default="system"
+    )
+    election = models.ForeignKey(
+        Election, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at"], name="broadcast_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.title} (all voters)"
+
+
+class BroadcastReceipt(models.Model):
+    broadcast = models.ForeignKey(
+        BroadcastNotification, on_delete=models.CASCADE, related_name="receipts"
+    )
+    voter = models.ForeignKey(
+        Voter, on_delete=models.CASCADE, related_name="broadcast_receipts"
+    )
+    read_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["voter", "broadcast"],
+                name="unique_receipt_per_voter_per_broadcast",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.voter_id} read {self.broadcast_id}"
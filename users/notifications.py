@@ -0,0 +1,174 @@
+"""Voter notification feed: personal notifications plus broadcasts.
+
+Personal ``Notification`` rows carry their own read flag. A
+``BroadcastNotification`` is stored once for all voters and counts as read
+for a voter once a ``BroadcastReceipt`` exists for the pair. The feed is a
+single ``UNION ALL`` query ordered by time, so it pages like one table.
+
+Unread counts are denormalised on ``Voter``: ``unread_notifications``
+(personal) and ``broadcasts_read`` (receipts). With the broadcast total
+cached (for ``BROADCAST_TOTAL_CACHE_TIMEOUT`` seconds, since other workers'
+writes cannot clear it), ``unread_count(voter)`` needs no query. Create personal
+notifications through ``notify`` / ``notify_many`` and mark them read
+through ``mark_all_read`` so the counters stay right;
+``manage.py repair_unread_counters`` recomputes them from the rows.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, F, IntegerField, OuterRef, Subquery, Value, CharField
+from django.db.models.functions import Coalesce
+
+from elections.models import Election
+from .models import Notification, BroadcastNotification, BroadcastReceipt, Voter
+
+BROADCAST_TOTAL_KEY = 'notifications:broadcast_total'
+
+FEED_FIELDS = ('id', 'title', 'message', 'notification_type', 'election_id', 'created_at', 'kind', 'read')
+
+_TYPE_LABELS = dict(Notification.NOTIFICATION_TYPE_CHOICES)
+
+
+class FeedItem:
+    """A feed row that renders like a ``Notification`` in templates."""
+
+    def __init__(self, row, election=None):
+        self.__dict__.update(row)
+        self.is_read = row['read']
+        self.is_broadcast = row['kind'] == 'broadcast'
+        self.election = election
+
+    def get_notification_type_display(self):
+        return _TYPE_LABELS.get(self.notification_type, self.notification_type)
+
+
+def notify(voter, **fields):
+    """Create one personal notification and bump the voter's unread counter."""
+    notification = Notification.objects.create(voter=voter, **fields)
+    Voter.objects.filter(pk=voter.pk).update(unread_notifications=F('unread_notifications') + 1)
+    return notification
+
+
+def notify_many(notifications):
+    """``bulk_create`` unsaved notifications and bump each voter's counter.
+
+    One UPDATE per distinct per-voter count, so the usual one-each batch is
+    a single statement.
+    """
+    created = Notification.objects.bulk_create(notifications)
+    per_voter = Counter(n.voter_id for n in created)
+    by_amount = {}
+    for voter_id, amount in per_voter.items():
+        by_amount.setdefault(amount, []).append(voter_id)
+    for amount, voter_ids in by_amount.items():
+        Voter.objects.filter(pk__in=voter_ids).update(unread_notifications=F('unread_notifications') + amount)
+    return created
+
+
+def broadcast_total():
+    total = cache.get(BROADCAST_TOTAL_KEY)
+    if total is None:
+        total = BroadcastNotification.objects.count()
+        # The signals below only clear this process's cache, so other workers
+        # with a per-process cache catch up when the key expires
+        cache.set(BROADCAST_TOTAL_KEY, total, timeout=getattr(settings, 'BROADCAST_TOTAL_CACHE_TIMEOUT', 30))
+    return total
+
+
+def on_broadcast_saved(sender, instance, created, **kwargs):
+    if created:
+        cache.delete(BROADCAST_TOTAL_KEY)
+
+
+def on_broadcast_deleting(sender, instance, **kwargs):
+    # Its receipts cascade away, so readers' counters must drop with them
+    Voter.objects.filter(broadcast_receipts__broadcast=instance).update(broadcasts_read=F('broadcasts_read') - 1)
+    cache.delete(BROADCAST_TOTAL_KEY)
+
+
+def broadcast(title, message, notification_type='system', election=None):
+    """Notify every voter with one row."""
+    return BroadcastNotification.objects.create(
+        title=title, message=message, notification_type=notification_type, election=election,
+    )
+
+
+def notification_feed(voter):
+    """Personal and broadcast notifications for ``voter``, newest first, as value dicts."""
+    personal = (
+        Notification.objects.filter(voter=voter)
+        .annotate(kind=Value('personal', output_field=CharField()), read=F('is_read'))
+        .values(*FEED_FIELDS)
+    )
+    broadcasts = (
+        BroadcastNotification.objects
+        .annotate(
+            kind=Value('broadcast', output_field=CharField()),
+            read=Exists(BroadcastReceipt.objects.filter(broadcast=OuterRef('pk'), voter=voter)),
+        )
+        .values(*FEED_FIELDS)
+    )
+    return personal.order_by().union(broadcasts.order_by(), all=True).order_by('-created_at', 'kind', '-id')
+
+
+def hydrate_feed(rows):
+    """Turn a page of feed rows into ``FeedItem`` objects, loading elections in one query."""
+    rows = list(rows)
+    elections = Election.objects.in_bulk({row['election_id'] for row in rows if row['election_id']})
+    return [FeedItem(row, elections.get(row['election_id'])) for row in rows]
+
+
+def unread_count(voter):
+    """Unread personal plus broadcast notifications, from the counters on ``voter``."""
+    return voter.unread_notifications + max(0, broadcast_total() - voter.broadcasts_read)
+
+
+def _count_of(model, **filters):
+    rows = (
+        model.objects.filter(voter=OuterRef('pk'), **filters)
+        .order_by().values('voter').annotate(n=Count('pk')).values('n')
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def mark_all_read(voter):
+    """Mark every personal and broadcast notification read for ``voter``."""
+    with transaction.atomic():
+        # subtract what was marked rather than zeroing: a notify() landing
+        # in between keeps its row unread and its increment
+        marked = Notification.objects.filter(voter=voter, is_read=False).update(is_read=True)
+        unread = BroadcastNotification.objects.exclude(receipts__voter=voter).values_list('pk', flat=True)
+        BroadcastReceipt.objects.bulk_create(
+            [BroadcastReceipt(broadcast_id=pk, voter=voter) for pk in unread],
+            ignore_conflicts=True,
+        )
+        Voter.objects.filter(pk=voter.pk).update(
+            unread_notifications=F('unread_notifications') - marked, broadcasts_read=_count_of(BroadcastReceipt),
+        )
+    voter.refresh_from_db(fields=['unread_notifications', 'broadcasts_read'])
+
+
+def repair_unread_counters(chunk_size=5000, dry_run=False):
+    """Recompute both counters from the notification and receipt rows.
+
+    Returns the number of voters whose counters were wrong.
+    """
+    expected = dict(unread=_count_of(Notification, is_read=False), read=_count_of(BroadcastReceipt))
+    drifted = 0
+    last_pk = 0
+    while True:
+        pks = list(Voter.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return drifted
+        last_pk = pks[-1]
+        chunk = Voter.objects.filter(pk__in=pks).annotate(**expected)
+        wrong = list(
+            chunk.exclude(unread_notifications=F('unread'), broadcasts_read=F('read')).values_list('pk', flat=True)
+        )
+        drifted += len(wrong)
+        if wrong and not dry_run:
+            Voter.objects.filter(pk__in=wrong).update(
+                unread_notifications=expected['unread'], broadcasts_read=expected['read'],
+            )
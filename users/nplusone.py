@@ -0,0 +1,82 @@
+"""Detect N+1 lazy foreign-key loads.
+
+While a detection scope is active (one per request via
+``users.middleware.NPlusOneMiddleware``, or ``detect_n_plus_one()`` in code), every lazy load
+of a forward ``ForeignKey`` / ``OneToOneField`` is counted per relation. When
+the same relation is lazily loaded ``NPLUSONE_THRESHOLD`` times, the scope
+either logs a warning (``NPLUSONE_MODE = 'log'``) or raises
+``NPlusOneError`` (``'raise'``, the default under ``manage.py test``).
+The usual fix is a ``select_related()`` for the reported relation.
+"""
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.models.fields.related_descriptors import ForwardManyToOneDescriptor
+
+logger = logging.getLogger('users.nplusone')
+
+_scope = ContextVar('nplusone_scope', default=None)
+_installed = False
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+class _Scope:
+    def __init__(self, mode, threshold, label):
+        self.mode = mode
+        self.threshold = threshold
+        self.label = label
+        self.loads = Counter()
+        self.reported = set()
+
+    def record(self, relation):
+        self.loads[relation] += 1
+        if self.loads[relation] < self.threshold or relation in self.reported:
+            return
+        self.reported.add(relation)
+        message = (
+            f'N+1 query in {self.label}: {relation} lazily loaded '
+            f'{self.loads[relation]} times; add select_related()'
+        )
+        if self.mode == 'raise':
+            raise NPlusOneError(message)
+        logger.warning(message)
+
+
+def install():
+    """Wrap the forward relation descriptor once so lazy loads are reported."""
+    global _installed
+    if _installed:
+        return
+    original = ForwardManyToOneDescriptor.get_object
+
+    def get_object(self, instance):
+        scope = _scope.get()
+        if scope is not None:
+            field = self.field
+            scope.record(f'{field.model._meta.label}.{field.name}')
+        return original(self, instance)
+
+    ForwardManyToOneDescriptor.get_object = get_object
+    _installed = True
+
+
+@contextmanager
+def detect_n_plus_one(mode=None, threshold=None, label='block'):
+    """Report repeated lazy loads of one relation inside the block."""
+    install()
+    scope = _Scope(
+        mode or getattr(settings, 'NPLUSONE_MODE', 'log'),
+        threshold or getattr(settings, 'NPLUSONE_THRESHOLD', 2),
+        label,
+    )
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
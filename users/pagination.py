@@ -0,0 +1,122 @@
+"""Keyset (cursor) pagination for large listings.
+
+``Paginator`` pages with OFFSET, so page N has to walk past every row
+before it, and it runs a COUNT on each request. ``keyset_page`` instead
+filters on the sort key of the last row shown (``WHERE (created_at, id) <
+(?, ?)``), so every page costs the same index range scan. Cursors are
+opaque URL-safe tokens; a malformed cursor falls back to the first page.
+"""
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(values):
+    payload = json.dumps([v.isoformat() if hasattr(v, 'isoformat') else v for v in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the key values in ``cursor``, or None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != 2:
+        return None
+    moment = parse_datetime(values[0]) if isinstance(values[0], str) else None
+    if moment is None or not isinstance(values[1], int):
+        return None
+    return [moment, values[1]]
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def keyset_page(queryset, keys, per_page, after=None, before=None):
+    """One page of ``queryset`` ordered newest first on the two ``keys``.
+
+    ``keys`` is a (timestamp field, unique integer field) pair, e.g.
+    ``('user__created_at', 'user_id')``. Pass the ``next_cursor`` of a page
+    as ``after`` to get the following page, or its ``previous_cursor`` as
+    ``before`` to go back.
+    """
+    moment_field, id_field = keys
+    after, before = decode_cursor(after), decode_cursor(before)
+    backwards = before is not None and after is None
+
+    if backwards:
+        moment, pk = before
+        queryset = queryset.filter(
+            Q(**{f'{moment_field}__gt': moment}) | Q(**{moment_field: moment, f'{id_field}__gt': pk})
+        ).order_by(moment_field, id_field)
+    else:
+        if after is not None:
+            moment, pk = after
+            queryset = queryset.filter(
+                Q(**{f'{moment_field}__lt': moment}) | Q(**{moment_field: moment, f'{id_field}__lt': pk})
+            )
+        queryset = queryset.order_by(f'-{moment_field}', f'-{id_field}')
+
+    # one extra row tells us whether there is another page in this direction
+    rows = list(queryset[:per_page + 1])
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def cursor(obj):
+        value = obj
+        for part in moment_field.split('__'):
+            value = getattr(value, part)
+        return encode_cursor([value, getattr(obj, id_field)])
+
+    if not rows:
+        return KeysetPage(rows, None, None)
+    if backwards:
+        next_cursor, previous_cursor = cursor(rows[-1]), cursor(rows[0]) if more else None
+    else:
+        next_cursor = cursor(rows[-1]) if more else None
+        previous_cursor = cursor(rows[0]) if after is not None else None
+    return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+def cached_count(queryset, *key_parts):
+    """``queryset.count()`` cached for ``LISTING_COUNT_CACHE_TIMEOUT`` seconds.
+
+    The total shown next to a listing may lag new rows by up to the timeout,
+    which is fine for a "N found" label and spares a COUNT on every page.
+    """
+    digest = hashlib.sha1(json.dumps(key_parts, default=str).encode()).hexdigest()
+    key = f'listing-count:{digest}'
+    total = cache.get(key)
+    if total is None:
+        total = queryset.count()
+        cache.set(key, total, getattr(settings, 'LISTING_COUNT_CACHE_TIMEOUT', 60))
+    return total
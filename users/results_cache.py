@@ -0,0 +1,151 @@
+"""Cache for published election results.
+
+Values are stored on Django's cache framework under keys that embed a
+per-election version number. Publishing or voting bumps the version, so
+stale entries are simply never read again. A miss is computed by a single
+worker: threads in the same process queue on a striped lock, and other
+processes wait on a short-lived ``cache.add`` lock and reuse the value the
+winner stores.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+_MISSING = object()
+_LOCK_STRIPES = [threading.Lock() for _ in range(64)]
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'coalesced': 0}
+
+PUBLISHED_SCOPE = 'published'
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def results_cache_stats():
+    """Hit/miss/coalesced counters for this process."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_results_cache_stats():
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
+
+
+def _version_key(scope):
+    return f'results:version:{scope}'
+
+
+def _version(scope):
+    version = cache.get(_version_key(scope))
+    if version is None:
+        cache.add(_version_key(scope), 1, timeout=None)
+        version = cache.get(_version_key(scope), 1)
+    return version
+
+
+def bump_version(scope):
+    """Invalidate every cached value for ``scope`` (an election id or 'published')."""
+    try:
+        cache.incr(_version_key(scope))
+    except ValueError:
+        cache.add(_version_key(scope), 2, timeout=None)
+
+
+def invalidate_election(election_id, published=False):
+    bump_version(election_id)
+    if published:
+        bump_version(PUBLISHED_SCOPE)
+
+
+def get_or_compute(key, compute, timeout=None):
+    """Return the cached value for ``key``, computing it at most once per miss."""
+    timeout = timeout if timeout is not None else getattr(settings, 'RESULTS_CACHE_TIMEOUT', 300)
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        _count('hits')
+        return value
+
+    with _LOCK_STRIPES[hash(key) % len(_LOCK_STRIPES)]:
+        # Another thread in this process may have filled it while we queued
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            _count('coalesced')
+            return value
+
+        lock_key = f'{key}:lock'
+        lock_timeout = getattr(settings, 'RESULTS_CACHE_LOCK_TIMEOUT', 10)
+        if not cache.add(lock_key, 1, timeout=lock_timeout):
+            # Another process is computing it: wait for its value
+            deadline = time.monotonic() + lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                value = cache.get(key, _MISSING)
+                if value is not _MISSING:
+                    _count('coalesced')
+                    return value
+        try:
+            _count('misses')
+            value = compute()
+            cache.set(key, value, timeout)
+        finally:
+            cache.delete(lock_key)
+        return value
+
+
+def get_published_elections():
+    """Published elections, newest first."""
+    from elections.models import Election
+
+    key = f'results:published:v{_version(PUBLISHED_SCOPE)}'
+    return get_or_compute(key, lambda: list(
+        Election.objects.filter(results_published=True).order_by('-end_date')
+    ))
+
+
+def get_election_results(election_id):
+    """The frozen snapshot of a published election, or None if unpublished.
+
+    Raises ``Http404`` when the election does not exist.
+    """
+    key = f'results:election:{election_id}:v{_version(election_id)}'
+    return get_or_compute(key, lambda: _load_snapshot(election_id))
+
+
+def _load_snapshot(election_id):
+    # import lazily to avoid startup circular imports
+    from django.shortcuts import get_object_or_404
+    from elections.models import Election
+    from .models import ResultSnapshot
+    from .services import ResultsNotFinal, freeze_results
+
+    snapshot = (
+        ResultSnapshot.objects.select_related('election')
+        .filter(election_id=election_id, election__results_published=True)
+        .first()
+    )
+    if snapshot is None:
+        election = get_object_or_404(Election, id=election_id)
+        if not election.results_published:
+            return None
+        # Published without a snapshot (e.g. via the admin checkbox): freeze
+        # now, unless it is still open
+        try:
+            snapshot = freeze_results(election)
+        except ResultsNotFinal:
+            return None
+        snapshot.election = election
+    return snapshot
+
+
+def on_election_changed(sender, instance, **kwargs):
+    """Publishing, unpublishing, editing or deleting an election invalidates its results."""
+    election_id = instance.pk
+    transaction.on_commit(lambda: invalidate_election(election_id, published=True))
@@ -0,0 +1,233 @@
+"""Indexed voter search for the admin listing.
+
+On SQLite, voters are indexed in the FTS5 table ``users_voter_search``
+(rowid = Voter pk) over username, email, voter_id and mobile number.
+Triggers on ``users_voter`` and ``users_customuser`` keep it in step with
+every write path, including ``bulk_create``, ``update()`` and cascading
+deletes. Each word of the query is matched as a prefix, and results are
+ordered by bm25 rank and paged on ``(rank, rowid)``.
+
+Other engines fall back to the ``icontains`` OR chain.
+
+SQLite rebuilds a table to add or alter most columns, and the triggers
+would both break the rebuild and be lost with the old table. A migration
+that changes ``users_voter`` or ``users_customuser`` must drop the
+triggers before its schema operations and recreate them after, from its
+own copy of the SQL so that later edits here leave it alone (see migration
+0027). ``manage.py rebuild_voter_search`` repairs the index by hand.
+"""
+import base64
+import json
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .pagination import KeysetPage, encode_cursor
+
+SEARCH_TABLE = 'users_voter_search'
+
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+INDEX_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        username, email, voter_id, mobile_no,
+        tokenize = 'unicode61', prefix = '2 3 4'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai AFTER INSERT ON users_voter BEGIN
+        INSERT INTO {SEARCH_TABLE} (rowid, username, email, voter_id, mobile_no)
+        SELECT new.id, u.username, u.email, new.voter_id, new.mobile_no
+        FROM users_customuser u WHERE u.user_id = new.user_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au AFTER UPDATE OF user_id, voter_id, mobile_no ON users_voter BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id;
+        INSERT INTO {SEARCH_TABLE} (rowid, username, email, voter_id, mobile_no)
+        SELECT new.id, u.username, u.email, new.voter_id, new.mobile_no
+        FROM users_customuser u WHERE u.user_id = new.user_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad AFTER DELETE ON users_voter BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_user_au AFTER UPDATE OF username, email ON users_customuser BEGIN
+        UPDATE {SEARCH_TABLE} SET username = new.username, email = new.email
+        WHERE rowid = (SELECT id FROM users_voter WHERE user_id = new.user_id);
+    END
+    """,
+]
+
+REINDEX_SQL = [
+    f'DELETE FROM {SEARCH_TABLE}',
+    f"""
+    INSERT INTO {SEARCH_TABLE} (rowid, username, email, voter_id, mobile_no)
+    SELECT v.id, u.username, u.email, v.voter_id, v.mobile_no
+    FROM users_voter v JOIN users_customuser u ON u.user_id = v.user_id
+    """,
+    f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')",
+]
+
+DROP_TRIGGERS_SQL = [
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_user_au',
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_au',
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_ai',
+]
+
+DROP_SQL = DROP_TRIGGERS_SQL + [f'DROP TABLE IF EXISTS {SEARCH_TABLE}']
+
+
+def search_index_supported(conn=None):
+    return (conn or connection).vendor == 'sqlite'
+
+
+def rebuild_search_index(conn=None):
+    """(Re)create the index table and triggers and repopulate it from the voter roll."""
+    conn = conn or connection
+    if not search_index_supported(conn):
+        return 0
+    with conn.cursor() as cursor:
+        for statement in INDEX_SQL + REINDEX_SQL:
+            cursor.execute(statement)
+        cursor.execute(f'SELECT count(*) FROM {SEARCH_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def drop_search_triggers(conn=None):
+    """Drop the sync triggers ahead of a table rebuild; ``rebuild_search_index`` restores them."""
+    conn = conn or connection
+    if not search_index_supported(conn):
+        return
+    with conn.cursor() as cursor:
+        for statement in DROP_TRIGGERS_SQL:
+            cursor.execute(statement)
+
+
+def match_expression(query):
+    """FTS5 query requiring every word of ``query`` as a prefix, or '' if it has none."""
+    return ' AND '.join(f'"{term}"*' for term in _TERM.findall(query))
+
+
+def status_voters(filter_status):
+    """Voters for the management page's status filter ('verified', 'pending' or anything else for all)."""
+    # import lazily to avoid startup circular imports
+    from .models import Voter
+
+    voters = Voter.objects.select_related('user').all()
+    if filter_status in ('verified', 'pending'):
+        voters = voters.filter(verification_status=filter_status)
+    return voters
+
+
+def filter_voters(search_query, filter_status):
+    """The management page's voters: ``(queryset, ranked)`` as from ``search_voters``."""
+    voters = status_voters(filter_status)
+    if search_query:
+        return search_voters(voters, search_query)
+    return voters, False
+
+
+def search_voters(queryset, query):
+    """Filter a Voter queryset by ``query``.
+
+    Returns ``(queryset, ranked)``. A ranked queryset matches through the
+    index but is unordered; it is for counting (one MATCH). List it with
+    ``ranked_page`` rather than ``keyset_page``.
+    """
+    expression = match_expression(query) if search_index_supported() else ''
+    if not expression:
+        return queryset.filter(
+            Q(user__username__icontains=query) |
+            Q(user__email__icontains=query) |
+            Q(voter_id__icontains=query) |
+            Q(mobile_no__icontains=query)
+        ), False
+
+    matches = RawSQL(f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', (expression,))
+    return queryset.filter(pk__in=matches), True
+
+
+def _decode(cursor, width):
+    """The ``width`` sort key values in a ranked-search cursor, or None."""
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != width:
+        return None
+    if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return None
+    return values
+
+
+def ranked_page(queryset, query, per_page, after=None, before=None):
+    """One page of ``queryset``'s voters matching ``query``, best ranked first.
+
+    Pass the queryset before ``search_voters`` filtered it: the ids come
+    from the index, and a MATCH subquery in the lookup would materialise
+    every match. Pages are keyset on ``(rank, rowid)``, like
+    ``pagination.keyset_page``, so FTS5 ranks inside one query
+    (``ORDER BY rank LIMIT``) and MATCH runs once per query rather than once
+    per matching row. Ids that ``queryset``'s own filters exclude are
+    dropped, and the next, larger block of ranked ids makes up for them.
+
+    Past ``VOTER_SEARCH_RANK_LIMIT`` matches (a one- or two-letter prefix)
+    bm25 would score most of the roll to order a handful of near-equal
+    hits, so those are paged in index order, on ``rowid`` alone.
+    """
+    expression = match_expression(query)
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT count(*) FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [expression])
+        keys = ('rank', 'rowid') if cursor.fetchone()[0] <= settings.VOTER_SEARCH_RANK_LIMIT else ('rowid',)
+        after, before = _decode(after, len(keys)), _decode(before, len(keys))
+        backwards = before is not None and after is None
+        position = before if backwards else after
+        op, direction = ('<', ' DESC') if backwards else ('>', '')
+        order = ', '.join(key + direction for key in keys)
+
+        rows, block = [], per_page + 1
+        while len(rows) <= per_page:
+            where, params = '', [expression]
+            if position is not None:
+                if len(keys) == 2:
+                    where = f' AND (rank {op} %s OR (rank = %s AND rowid {op} %s))'
+                    params += [position[0], position[0], position[1]]
+                else:
+                    where = f' AND rowid {op} %s'
+                    params += [position[0]]
+            cursor.execute(
+                f'SELECT {", ".join(keys)} FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s{where} '
+                f'ORDER BY {order} LIMIT %s',
+                params + [block],
+            )
+            fetched = cursor.fetchall()
+            voters = queryset.in_bulk([row[-1] for row in fetched])
+            rows.extend((list(row), voters[row[-1]]) for row in fetched if row[-1] in voters)
+            if len(fetched) < block:
+                break
+            position, block = fetched[-1], block * 4
+
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+    if not rows:
+        return KeysetPage([], None, None)
+    first, last = encode_cursor(rows[0][0]), encode_cursor(rows[-1][0])
+    if backwards:
+        next_cursor, previous_cursor = last, first if more else None
+    else:
+        next_cursor = last if more else None
+        previous_cursor = first if after is not None else None
+    return KeysetPage([voter for _, voter in rows], next_cursor, previous_cursor)
@@ -0,0 +1,137 @@
+"""Fast synthetic electorate generation for load testing and profiling.
+
+Everything is written with chunked ``bulk_create`` calls, one short
+transaction per chunk. Every generated user shares a single precomputed
+password hash, so no per-user PBKDF2 work is done. The same ``seed``
+always produces the same dataset.
+"""
+import random
+from collections import Counter
+from itertools import accumulate
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from elections.models import Election
+from .models import Party, Candidate, Campaign, Voter, Vote, ElectionTally
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def seed_electorate(voters=1000, parties=5, candidates=20, areas=10, elections=2,
+                    turnout=0.6, seed=42, chunk_size=5000, password='voter-pass',
+                    prefix='seed', progress=None):
+    """Create parties, candidates, elections, verified voters and votes.
+
+    ``turnout`` is the mean share of voters who vote in each election; the
+    actual turnout per election and candidate popularity are drawn from
+    ``seed``. The first election is left open (at roughly half the turnout);
+    the others have closed.
+    Returns a summary dict with the created ids.
+    """
+    rng = random.Random(seed)
+    User = get_user_model()
+    now = timezone.now()
+    report = progress or (lambda message: None)
+
+    party_objs = Party.objects.bulk_create(
+        [Party(name=f'{prefix} Party {i}') for i in range(parties)]
+    )
+    area_names = [f'{prefix} Area {i}' for i in range(areas)]
+    candidate_objs = Candidate.objects.bulk_create([
+        Candidate(
+            name=f'{prefix} Candidate {i}',
+            age=rng.randint(25, 75),
+            area=area_names[i % areas],
+            party=party_objs[i % parties],
+            is_approved=True,
+        )
+        for i in range(candidates)
+    ])
+
+    election_objs = Election.objects.bulk_create([
+        Election(
+            title=f'{prefix} Election {i}',
+            start_date=now - timedelta(days=1 if i == 0 else 30 + i),
+            end_date=now + timedelta(days=1) if i == 0 else now - timedelta(days=29 + i),
+            is_active=i == 0,
+        )
+        for i in range(elections)
+    ])
+    Through = Candidate.elections.through
+    Through.objects.bulk_create([
+        Through(candidate_id=c.pk, election_id=e.pk) for e in election_objs for c in candidate_objs
+    ])
+    Campaign.objects.bulk_create([
+        Campaign(candidate=c, election=e, message=f'Vote for {c.name} in {e.title}.')
+        for e in election_objs for c in candidate_objs
+    ])
+    report(f'Created {parties} parties, {candidates} candidates, {elections} elections')
+
+    password_hash = make_password(password)
+    voter_ids = []
+    for start in range(0, voters, chunk_size):
+        numbers = range(start, min(start + chunk_size, voters))
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(
+                    username=f'{prefix}-voter-{n}',
+                    email=f'{prefix}-voter-{n}@example.com',
+                    full_name=f'{prefix.title()} Voter {n}',
+                    password=password_hash,
+                    role='voter',
+                )
+                for n in numbers
+            ])
+            created = Voter.objects.bulk_create([
+                Voter(
+                    user_id=user.pk,
+                    voter_id=f'{prefix[:4].upper()}{n:010d}',
+                    mobile_no=f'9{rng.randrange(10 ** 9):09d}',
+                    address=f'{n} {rng.choice(area_names)}',
+                    verification_status='verified',
+                    verification_date=now,
+                )
+                for n, user in zip(numbers, users)
+            ])
+        voter_ids.extend(v.pk for v in created)
+        report(f'Voters: {len(voter_ids)}/{voters}')
+
+    votes_cast = 0
+    for election in election_objs:
+        # Polls are still open in the first election, so it is only part-way there
+        mean = turnout / 2 if election.is_active else turnout
+        share = min(1.0, max(0.0, rng.gauss(mean, 0.05))) if mean else 0.0
+        # Skewed popularity so results look like a real race
+        weights = list(accumulate(rng.gammavariate(1.5, 1.0) for _ in candidate_objs))
+        tally = Counter()
+        for ids in _chunks(voter_ids, chunk_size):
+            ballots = [
+                Vote(voter_id=voter_id, election_id=election.pk,
+                     candidate_id=rng.choices(candidate_objs, cum_weights=weights)[0].pk)
+                for voter_id in ids if rng.random() < share
+            ]
+            with transaction.atomic():
+                Vote.objects.bulk_create(ballots)
+            tally.update(vote.candidate_id for vote in ballots)
+        ElectionTally.objects.bulk_create([
+            ElectionTally(election_id=election.pk, candidate_id=candidate_id, count=count)
+            for candidate_id, count in tally.items()
+        ])
+        cast = sum(tally.values())
+        votes_cast += cast
+        report(f'{election.title}: {cast} votes ({share:.0%} turnout)')
+
+    return {
+        'parties': [p.pk for p in party_objs],
+        'candidates': [c.pk for c in candidate_objs],
+        'elections': [e.pk for e in election_objs],
+        'voters': len(voter_ids),
+        'votes': votes_cast,
+    }
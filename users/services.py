@@ -0,0 +1,279 @@
+import hashlib
+import json
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from audit.sink import record
+from .models import Party, Candidate, Campaign, Vote, Voter, Notification, ElectionTally, ResultSnapshot
+from .results_cache import invalidate_election
+from .notifications import broadcast, notify, notify_many
+
+
+def increment_tally(election_id, candidate_id, by=1):
+    """Add ``by`` votes to a candidate's tally. Call inside the vote's transaction."""
+    tallies = ElectionTally.objects.filter(election_id=election_id, candidate_id=candidate_id)
+    if tallies.update(count=F('count') + by):
+        return
+    # First vote for this candidate: create the row, or lose the race to a
+    # concurrent first vote and fall back to the increment.
+    try:
+        with transaction.atomic():
+            ElectionTally.objects.create(election_id=election_id, candidate_id=candidate_id, count=by)
+    except IntegrityError:
+        tallies.update(count=F('count') + by)
+
+
+def record_vote(voter, candidate, election):
+    """Commit a ballot and its confirmation notification in one transaction.
+
+    Returns a ``(vote, created)`` tuple, like ``get_or_create``. The
+    ``unique_vote_per_voter_per_election`` constraint is the only duplicate
+    check: if it rejects the insert, the whole transaction is rolled back and
+    the voter's existing ballot is returned with ``created=False``.
+
+    ``voter.user`` should already be cached by the caller so the audit signal
+    can render the vote without lazy-loading it.
+    """
+    try:
+        with transaction.atomic():
+            # The vote INSERT goes first so a duplicate ballot fails before
+            # anything else is written.
+            vote = Vote.objects.create(voter=voter, candidate=candidate, election=election)
+            increment_tally(election.pk, candidate.pk)
+            notify(
+                voter, title="Vote Submitted",
+                message=f"You voted in {election.title}.",
+                notification_type="vote_confirmation", election=election
+            )
+    except IntegrityError:
+        return Vote.objects.get(voter=voter, election=election), False
+    transaction.on_commit(lambda: invalidate_election(election.pk))
+    return vote, True
+
+
+class ResultsNotFinal(Exception):
+    """The election has not ended, so its results cannot be frozen yet."""
+
+
+def compute_results(election):
+    """Read an election's tallies into ``(rows, total_votes)``.
+
+    Rows are ordered by votes and carry ``candidate_name``, ``party_name``,
+    ``votes`` and ``percentage``.
+    """
+    counts = (
+        ElectionTally.objects.filter(election=election, count__gt=0)
+        .values('candidate__name', 'candidate__party__name', 'count')
+        .order_by('-count', 'candidate_id')
+    )
+    total_votes = 0
+    rows = []
+    for item in counts:
+        total_votes += item['count']
+        rows.append({
+            'candidate_name': item['candidate__name'],
+            'party_name': item['candidate__party__name'],
+            'votes': item['count'],
+        })
+    for row in rows:
+        row['percentage'] = round(row['votes'] / total_votes * 100, 2) if total_votes > 0 else 0
+    return rows, total_votes
+
+
+def results_checksum(election_id, rows, total_votes):
+    payload = json.dumps(
+        {'election': election_id, 'total_votes': total_votes, 'results': rows},
+        sort_keys=True, separators=(',', ':'),
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def freeze_results(election):
+    """Return the election's result snapshot, computing it on first use.
+
+    Raises ``ResultsNotFinal`` before ``election.end_date``: a snapshot is
+    never recomputed, so ballots cast after it would not count.
+    """
+    try:
+        return ResultSnapshot.objects.get(election=election)
+    except ResultSnapshot.DoesNotExist:
+        pass
+    if election.end_date > timezone.now():
+        raise ResultsNotFinal(f"{election.title} is open until {election.end_date:%Y-%m-%d %H:%M}.")
+    rows, total_votes = compute_results(election)
+    try:
+        with transaction.atomic():
+            return ResultSnapshot.objects.create(
+                election=election,
+                results=rows,
+                total_votes=total_votes,
+                checksum=results_checksum(election.pk, rows, total_votes),
+            )
+    except IntegrityError:
+        # Someone else froze it first; theirs is the official copy
+        return ResultSnapshot.objects.get(election=election)
+
+
+def publish_election_results(election):
+    """Freeze the results, make them visible to voters and tell every voter once.
+
+    Raises ``ResultsNotFinal`` while the election is still open.
+    """
+    with transaction.atomic():
+        snapshot = freeze_results(election)
+        if not election.results_published:
+            broadcast(
+                "Results Available", f"Results for {election.title} have been published.",
+                notification_type="results_available", election=election,
+            )
+        election.results_published = True
+        election.save(update_fields=['results_published'])
+    return snapshot
+
+
+def parse_voter_codes(lines):
+    """Voter ids from a one-per-line or CSV (first column) list, skipping blanks and a header."""
+    codes = []
+    for line in lines:
+        code = line.split(',', 1)[0].strip().strip('"')
+        if not code or (not codes and code.lower() in ('voter_id', 'voter id')):
+            continue
+        codes.append(code)
+    return codes
+
+
+def _pending_chunks(queryset, voter_codes, chunk_size):
+    pending = Voter.objects.filter(verification_status='pending')
+    if voter_codes is not None:
+        codes = list(dict.fromkeys(voter_codes))
+        for start in range(0, len(codes), chunk_size):
+            yield list(pending.filter(voter_id__in=codes[start:start + chunk_size]).values_list('pk', flat=True))
+        return
+    # Walk by pk: verified rows drop out of the filter, so OFFSET would skip rows
+    queryset = queryset.filter(verification_status='pending').order_by('pk')
+    last_pk = 0
+    while True:
+        pks = list(queryset.filter(pk__gt=last_pk).values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+
+
+def bulk_verify_voters(queryset=None, voter_codes=None, actor=None, chunk_size=1000, progress=None):
+    """Verify pending voters in chunks and notify each of them.
+
+    Select voters with a Voter ``queryset`` or a list of public ``voter_codes``
+    (``Voter.voter_id``). Only pending voters are touched. Each chunk is one
+    transaction: an ``UPDATE`` setting the status and ``verification_date``,
+    a ``bulk_create`` of the "verification" notifications and one summary
+    audit entry. ``progress(done, total)`` is called after every chunk.
+    Returns the number of voters verified.
+    """
+    if queryset is None and voter_codes is None:
+        raise ValueError('Pass a Voter queryset or a list of voter ids')
+    if voter_codes is not None:
+        total = len(set(voter_codes))
+    else:
+        total = queryset.filter(verification_status='pending').count()
+
+    done = 0
+    for pks in _pending_chunks(queryset, voter_codes, chunk_size):
+        with transaction.atomic():
+            # Re-read inside the transaction so a voter verified meanwhile is not notified twice
+            pks = list(Voter.objects.filter(pk__in=pks, verification_status='pending').values_list('pk', flat=True))
+            if not pks:
+                continue
+            now = timezone.now()
+            Voter.objects.filter(pk__in=pks).update(verification_status='verified', verification_date=now)
+            notify_many([
+                Notification(
+                    voter_id=pk, title="Account Verified",
+                    message="Your account has been verified. You can now vote.",
+                    notification_type="verification",
+                )
+                for pk in pks
+            ])
+            record([{
+                'actor_id': getattr(actor, 'pk', None), 'action': 'update', 'target_model': 'users.Voter',
+                'target_repr': f'{len(pks)} voters verified',
+                'details': {'source': 'bulk_verify', 'voter_ids': pks},
+            }])
+        done += len(pks)
+        if progress:
+            progress(done, total)
+    return done
+
+
+def _slate_candidate_ids(slate):
+    """Candidate ids for slate rows, creating missing parties and candidates in bulk."""
+    ids = [row['id'] for row in slate if 'id' in row]
+    new_rows = [row for row in slate if 'id' not in row]
+    if not new_rows:
+        return ids, 0
+
+    party_names = {row['party'] for row in new_rows}
+    parties = dict(Party.objects.filter(name__in=party_names).values_list('name', 'pk'))
+    created = Party.objects.bulk_create([Party(name=name) for name in party_names - parties.keys()])
+    parties.update((party.name, party.pk) for party in created)
+
+    # Reuse a candidate already registered under the same name and party
+    existing = {
+        (name, party_id): pk
+        for pk, name, party_id in Candidate.objects.filter(
+            name__in={row['name'] for row in new_rows}
+        ).values_list('pk', 'name', 'party_id')
+    }
+    to_create = {}
+    for row in new_rows:
+        key = (row['name'], parties[row['party']])
+        if key in existing:
+            ids.append(existing[key])
+        elif key not in to_create:
+            to_create[key] = Candidate(
+                name=row['name'], party_id=key[1], age=row['age'], area=row['area'], is_approved=True,
+            )
+    created = Candidate.objects.bulk_create(to_create.values())
+    ids.extend(candidate.pk for candidate in created)
+    if created:
+        record([{
+            'action': 'create', 'target_model': 'users.Candidate',
+            'target_repr': f'{len(created)} candidates provisioned from a slate',
+            'details': {'source': 'slate', 'candidate_ids': [c.pk for c in created]},
+        }])
+    return ids, len(created)
+
+
+def create_election_with_candidates(election, candidates=(), slate=()):
+    """Save ``election`` and put the candidates on its ballot in one transaction.
+
+    ``candidates`` are existing Candidate objects; ``slate`` holds rows parsed by
+    ``ElectionForm.clean_slate`` (``{'id': ...}`` or name/party/age/area).
+    The M2M link and each candidate's default campaign are one ``bulk_create``
+    each, so the query count does not grow with the slate.
+    Returns ``(linked, created)`` candidate counts.
+    """
+    with transaction.atomic():
+        election.save()
+        slate_ids, created = _slate_candidate_ids(list(slate))
+        candidate_ids = list(dict.fromkeys([c.pk for c in candidates] + slate_ids))
+        names = dict(Candidate.objects.filter(pk__in=candidate_ids).values_list('pk', 'name'))
+
+        Through = Candidate.elections.through
+        Through.objects.bulk_create(
+            [Through(candidate_id=pk, election_id=election.pk) for pk in candidate_ids],
+            ignore_conflicts=True,
+        )
+        Campaign.objects.bulk_create(
+            [
+                Campaign(
+                    candidate_id=pk, election=election,
+                    message=f"Vote for {names[pk]}! Campaigning for {election.title}.",
+                )
+                for pk in candidate_ids
+            ],
+            ignore_conflicts=True,
+        )
+    return len(candidate_ids), created
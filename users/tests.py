@@ -1,6 +1,7 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from io import StringIO
 
 
 class UserAuthTests(TestCase):
@@ -478,3 +479,1205 @@ class VoterWorkflowTests(TestCase):
 		resp = self.client.get(url)
 		self.assertEqual(resp.status_code, 200)
 		self.assertContains(resp, 'Concluded Election')
+
+
+class BallotFixtureMixin:
+	"""A verified voter, an approved candidate and an open election."""
+	def setUp(self):
+		from django.core.cache import cache
+		from .models import Party, Candidate, Voter
+		from .results_cache import reset_results_cache_stats
+		from elections.models import Election
+		from django.utils import timezone
+		cache.clear()
+		reset_results_cache_stats()
+		self.User = get_user_model()
+		self.user = self.User.objects.create_user(username='fastvoter', email='fast@example.com', password='pw', role='voter')
+		self.voter = Voter.objects.create(user=self.user, voter_id='FV1', mobile_no='123', address='addr', verification_status='verified')
+		party = Party.objects.create(name='Fast Party')
+		self.candidate = Candidate.objects.create(name='Fast Candidate', age=40, party=party, area='North', is_approved=True)
+		now = timezone.now()
+		self.election = Election.objects.create(title='Fast Election', start_date=now, end_date=now + timezone.timedelta(days=1), is_active=True)
+		self.election.candidates.add(self.candidate)
+		self.client.force_login(self.user)
+
+	def close_election(self):
+		from django.utils import timezone
+		self.election.end_date = timezone.now() - timezone.timedelta(minutes=1)
+		self.election.save(update_fields=['end_date'])
+
+
+class VoteCastPathTests(BallotFixtureMixin, TestCase):
+	def test_cast_vote_query_budget(self):
+		from .models import Vote, Notification, ElectionTally
+		# steady state: the candidate already has a tally row
+		ElectionTally.objects.create(election=self.election, candidate=self.candidate)
+		url = reverse('voter_cast_vote', args=[self.election.id])
+		# session + user, election + voter + candidate reads, then SAVEPOINT,
+		# vote INSERT, tally UPDATE, notification/audit INSERTs, unread
+		# counter UPDATE and RELEASE
+		with self.assertNumQueries(12):
+			resp = self.client.post(url, {'candidate_id': self.candidate.id})
+		vote = Vote.objects.get(voter=self.voter, election=self.election)
+		self.assertRedirects(resp, reverse('vote_confirmation', args=[vote.id]), fetch_redirect_response=False)
+		self.assertTrue(Notification.objects.filter(voter=self.voter, notification_type='vote_confirmation').exists())
+
+	def test_second_ballot_redirects_to_existing_vote(self):
+		from .models import Vote, Notification
+		url = reverse('voter_cast_vote', args=[self.election.id])
+		self.client.post(url, {'candidate_id': self.candidate.id})
+		resp = self.client.post(url, {'candidate_id': self.candidate.id})
+		vote = Vote.objects.get(voter=self.voter, election=self.election)
+		self.assertRedirects(resp, reverse('vote_confirmation', args=[vote.id]), fetch_redirect_response=False)
+		self.assertEqual(Vote.objects.filter(voter=self.voter).count(), 1)
+		# the rejected ballot must not leave a second confirmation behind
+		self.assertEqual(Notification.objects.filter(voter=self.voter).count(), 1)
+
+
+class VoteJournalTests(BallotFixtureMixin, TestCase):
+	def setUp(self):
+		import tempfile, shutil
+		super().setUp()
+		self.journal_dir = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.journal_dir, True)
+
+	def test_journalled_ballot_is_flushed(self):
+		from django.core.management import call_command
+		from .models import Vote, Notification
+		url = reverse('voter_cast_vote', args=[self.election.id])
+		with self.settings(VOTE_INGESTION_MODE='journal', VOTE_JOURNAL_DIR=self.journal_dir):
+			resp = self.client.post(url, {'candidate_id': self.candidate.id})
+			self.assertRedirects(resp, reverse('voter_elections_list'), fetch_redirect_response=False)
+			self.assertFalse(Vote.objects.exists())
+			# a second ballot is refused before it reaches the journal
+			self.client.post(url, {'candidate_id': self.candidate.id})
+			call_command('flush_vote_journal', stdout=StringIO())
+		self.assertEqual(Vote.objects.filter(voter=self.voter, election=self.election).count(), 1)
+		self.assertTrue(Notification.objects.filter(voter=self.voter, notification_type='vote_confirmation').exists())
+		from audit.models import AuditLog
+		entry = AuditLog.objects.get(target_model='users.Vote', details__source='journal')
+		self.assertEqual(entry.details['changes']['voter_id'], [None, self.voter.id])
+
+	def test_replay_of_leftover_segment_is_idempotent(self):
+		from .models import Vote
+		from .vote_journal import VoteJournal, flush_journal
+		journal = VoteJournal(self.journal_dir)
+		journal.append(self.voter.id, self.candidate.id, self.election.id)
+		segment = journal.rotate()
+		# simulate a crash after the batch committed but before cleanup
+		import shutil
+		shutil.copy(segment, str(segment) + '.bak')
+		self.assertEqual(flush_journal(journal), (1, 1))
+		shutil.move(str(segment) + '.bak', segment)
+		self.assertEqual(flush_journal(journal), (1, 0))
+		self.assertEqual(Vote.objects.count(), 1)
+		self.assertEqual(journal.segments(), [])
+		# a fresh process only finds the flushed ballot in the database
+		self.assertFalse(VoteJournal(self.journal_dir).accept(self.voter.id, self.candidate.id, self.election.id))
+
+	def test_concurrent_ballots_share_one_fsync(self):
+		import os
+		import threading
+		import time
+		from unittest import mock
+		from django.db import connection
+		from .vote_journal import VoteJournal
+		journal = VoteJournal(self.journal_dir)
+		fsync, syncs, results = os.fsync, [], []
+		started = threading.Event()
+
+		def slow_fsync(fd):
+			syncs.append(fd)
+			started.set()
+			time.sleep(0.2)
+			fsync(fd)
+
+		def cast(voter_id):
+			try:
+				results.append((voter_id, journal.accept(voter_id, self.candidate.id, self.election.id)))
+			finally:
+				connection.close()
+
+		with mock.patch('users.vote_journal.os.fsync', slow_fsync):
+			first = threading.Thread(target=cast, args=(1000,))
+			first.start()
+			started.wait(5)
+			# these queue up behind the first fsync and go out together
+			others = [threading.Thread(target=cast, args=(voter_id,)) for voter_id in (1001, 1002, 1003, 1001)]
+			for thread in others:
+				thread.start()
+			for thread in [first] + others:
+				thread.join()
+		self.assertEqual(len(syncs), 2)
+		self.assertEqual(sorted(voter for voter, accepted in results if accepted), [1000, 1001, 1002, 1003])
+		self.assertEqual([voter for voter, accepted in results if not accepted], [1001])
+		entries = list(VoteJournal.read_segment(journal.active_path))
+		self.assertEqual(sorted(e['voter'] for e in entries), [1000, 1001, 1002, 1003])
+
+	def test_second_session_is_refused_while_ballot_is_journalled(self):
+		from django.test import Client
+		from .vote_journal import VoteJournal
+		url = reverse('voter_cast_vote', args=[self.election.id])
+		other = Client()
+		other.force_login(self.user)
+		with self.settings(VOTE_INGESTION_MODE='journal', VOTE_JOURNAL_DIR=self.journal_dir):
+			self.client.post(url, {'candidate_id': self.candidate.id})
+			resp = other.post(url, {'candidate_id': self.candidate.id}, follow=True)
+		self.assertContains(resp, 'You have already voted.')
+		self.assertEqual(len(list(VoteJournal.read_segment(VoteJournal(self.journal_dir).active_path))), 1)
+
+	def test_entry_with_missing_rows_is_dead_lettered(self):
+		import json
+		from .models import Vote, Voter
+		from .vote_journal import VoteJournal, flush_journal
+		other = Voter.objects.create(
+			user=get_user_model().objects.create_user('second', 'second@example.com', 'pw'),
+			voter_id='V-SECOND', mobile_no='0000000001', address='x', verification_status='verified',
+		)
+		journal = VoteJournal(self.journal_dir)
+		journal.append(self.voter.id, 999999, self.election.id)
+		journal.append(other.id, self.candidate.id, self.election.id)
+		with self.assertLogs('users.vote_journal', 'WARNING'):
+			self.assertEqual(flush_journal(journal), (2, 1))
+		self.assertEqual(list(Vote.objects.values_list('voter_id', flat=True)), [other.id])
+		dead = [json.loads(line) for line in journal.dead_path.read_text().splitlines()]
+		self.assertEqual([(d['voter'], d['candidate']) for d in dead], [(self.voter.id, 999999)])
+		self.assertEqual(journal.segments(), [])
+
+
+class ElectionTallyTests(BallotFixtureMixin, TestCase):
+	def test_vote_increments_tally(self):
+		from .models import ElectionTally
+		self.client.post(reverse('voter_cast_vote', args=[self.election.id]), {'candidate_id': self.candidate.id})
+		tally = ElectionTally.objects.get(election=self.election, candidate=self.candidate)
+		self.assertEqual(tally.count, 1)
+
+	def test_reconcile_tallies_rebuilds_drift(self):
+		from django.core.management import call_command
+		from django.core.management.base import CommandError
+		from .models import Vote, ElectionTally
+		# votes written outside record_vote leave the tally behind
+		Vote.objects.create(voter=self.voter, candidate=self.candidate, election=self.election)
+		with self.assertRaises(CommandError):
+			call_command('reconcile_tallies', '--check', stdout=StringIO())
+		call_command('reconcile_tallies', stdout=StringIO())
+		self.assertEqual(ElectionTally.objects.get(election=self.election, candidate=self.candidate).count, 1)
+		call_command('reconcile_tallies', '--check', stdout=StringIO())
+
+	def test_reconcile_keeps_a_ballot_cast_during_the_check(self):
+		from unittest import mock
+		from django.core.management import call_command
+		from django.db import transaction
+		from .models import Vote, ElectionTally, Voter
+		from .services import record_vote
+		Vote.objects.create(voter=self.voter, candidate=self.candidate, election=self.election)
+		user = self.User.objects.create_user(username='latevoter', email='late@example.com', password='pw', role='voter')
+		late = Voter.objects.create(user=user, voter_id='FV2', mobile_no='1', address='a', verification_status='verified')
+		atomic, pending = transaction.atomic, [late]
+
+		def ballot_then_atomic(*args, **kwargs):
+			if pending:
+				# a ballot commits after the drift check, before the rebuild
+				record_vote(pending.pop(), self.candidate, self.election)
+			return atomic(*args, **kwargs)
+
+		with mock.patch('users.management.commands.reconcile_tallies.transaction.atomic', side_effect=ballot_then_atomic):
+			call_command('reconcile_tallies', stdout=StringIO())
+		self.assertEqual(ElectionTally.objects.get(election=self.election, candidate=self.candidate).count, 2)
+
+
+class ResultSnapshotTests(BallotFixtureMixin, TestCase):
+	def publish(self):
+		self.close_election()
+		admin = self.User.objects.create_user(username='snapadmin', email='snap@example.com', password='pw', role='admin', is_staff=True)
+		self.client.force_login(admin)
+		with self.captureOnCommitCallbacks(execute=True):
+			self.client.get(reverse('publish_results', args=[self.election.id]))
+		self.client.logout()
+
+	def test_publish_freezes_results(self):
+		from .models import Vote, ResultSnapshot
+		from .services import record_vote, results_checksum
+		self.voter.user = self.user
+		record_vote(self.voter, self.candidate, self.election)
+		self.publish()
+		snapshot = ResultSnapshot.objects.get(election=self.election)
+		self.assertEqual(snapshot.total_votes, 1)
+		self.assertEqual(snapshot.results, [{'candidate_name': 'Fast Candidate', 'party_name': 'Fast Party', 'votes': 1, 'percentage': 100.0}])
+		self.assertEqual(snapshot.checksum, results_checksum(self.election.id, snapshot.results, 1))
+		with self.assertRaises(ValueError):
+			snapshot.save()
+
+	def test_snapshot_is_read_from_tallies(self):
+		from .models import ElectionTally
+		from .services import freeze_results
+		ElectionTally.objects.create(election=self.election, candidate=self.candidate, count=41)
+		self.close_election()
+		# snapshot lookup, one tally read and the savepointed INSERT; no Vote scan
+		with self.assertNumQueries(5):
+			snapshot = freeze_results(self.election)
+		self.assertEqual((snapshot.total_votes, snapshot.results[0]['votes']), (41, 41))
+
+	def test_open_election_is_not_frozen(self):
+		from .models import ResultSnapshot
+		from .services import ResultsNotFinal, publish_election_results
+		with self.assertRaises(ResultsNotFinal):
+			publish_election_results(self.election)
+		admin = self.User.objects.create_user(username='earlyadmin', email='early@example.com', password='pw', role='admin', is_staff=True)
+		self.client.force_login(admin)
+		self.client.get(reverse('publish_results', args=[self.election.id]))
+		self.election.refresh_from_db()
+		self.assertFalse(self.election.results_published)
+		self.assertFalse(ResultSnapshot.objects.exists())
+
+	def test_results_page_serves_snapshot(self):
+		from .models import Vote
+		self.publish()
+		# votes arriving after publication do not change the official result
+		Vote.objects.create(voter=self.voter, candidate=self.candidate, election=self.election)
+		url = reverse('voter_view_results_election', args=[self.election.id])
+		# the snapshot read plus the published-elections sidebar
+		with self.assertNumQueries(2):
+			resp = self.client.get(url)
+		self.assertEqual(resp.context['total_votes'], 0)
+		self.assertContains(resp, 'Fast Election')
+
+
+class ResultsCacheTests(BallotFixtureMixin, TestCase):
+	def test_repeat_views_are_served_from_cache(self):
+		from .services import publish_election_results
+		from .results_cache import results_cache_stats
+		self.close_election()
+		publish_election_results(self.election)
+		url = reverse('voter_view_results_election', args=[self.election.id])
+		self.client.logout()
+		self.client.get(url)
+		with self.assertNumQueries(0):
+			resp = self.client.get(url)
+		self.assertContains(resp, 'Fast Election')
+		self.assertEqual(results_cache_stats(), {'hits': 2, 'misses': 2, 'coalesced': 0})
+
+	def test_publish_invalidates_cached_results(self):
+		from .services import publish_election_results
+		url = reverse('voter_view_results_election', args=[self.election.id])
+		resp = self.client.get(url)
+		self.assertRedirects(resp, reverse('voter_view_results'), fetch_redirect_response=False)
+		self.close_election()
+		with self.captureOnCommitCallbacks(execute=True):
+			publish_election_results(self.election)
+		resp = self.client.get(url)
+		self.assertEqual(resp.status_code, 200)
+
+	def test_concurrent_misses_compute_once(self):
+		import threading, time
+		from .results_cache import get_or_compute, results_cache_stats
+		calls = []
+
+		def compute():
+			calls.append(1)
+			time.sleep(0.2)
+			return 'value'
+
+		threads = [threading.Thread(target=get_or_compute, args=('results:test', compute)) for _ in range(5)]
+		for t in threads:
+			t.start()
+		for t in threads:
+			t.join()
+		self.assertEqual(len(calls), 1)
+		self.assertEqual(results_cache_stats()['coalesced'], 4)
+
+
+class BenchmarkHelperTests(TestCase):
+	def test_percentile_nearest_rank(self):
+		from .management.commands.benchmark import percentile
+		values = list(range(1, 101))
+		self.assertEqual(percentile(values, 50), 50)
+		self.assertEqual(percentile(values, 99), 99)
+		self.assertEqual(percentile([7.0], 95), 7.0)
+		self.assertEqual(percentile([], 50), 0.0)
+
+
+class SeedElectorateTests(TestCase):
+	def test_seed_is_deterministic_and_consistent(self):
+		from django.core.management import call_command
+		from .models import Voter, Vote
+		from .seeding import seed_electorate
+		first = seed_electorate(voters=120, candidates=4, areas=2, elections=2, seed=7, chunk_size=50, prefix='a')
+		second = seed_electorate(voters=120, candidates=4, areas=2, elections=2, seed=7, chunk_size=50, prefix='b')
+		self.assertEqual(first['votes'], second['votes'])
+		self.assertEqual(Voter.objects.filter(verification_status='verified').count(), 240)
+		self.assertEqual(Vote.objects.count(), first['votes'] + second['votes'])
+		# the seeded tallies agree with the seeded votes
+		call_command('reconcile_tallies', '--check', stdout=StringIO())
+		voter = Voter.objects.select_related('user').first()
+		self.assertTrue(voter.user.check_password('voter-pass'))
+
+
+class QueryPlanTests(BallotFixtureMixin, TestCase):
+	"""EXPLAIN the statements the hot views send; fail if one scans a hot table or skips its index."""
+
+	def setUp(self):
+		from django.db import connection
+		if connection.vendor != 'sqlite':
+			self.skipTest('EXPLAIN QUERY PLAN checks are SQLite-specific')
+		super().setUp()
+		self.admin = self.User.objects.create_user(
+			username='planadmin', email='plan@example.com', password='pw', role='admin', is_staff=True,
+		)
+
+	def plans(self, send):
+		"""``{sql: plan details}`` of every SELECT, UPDATE and DELETE run by ``send()``."""
+		from django.db import connection
+		from django.test.utils import CaptureQueriesContext
+		with CaptureQueriesContext(connection) as ctx:
+			send()
+		plans = {}
+		with connection.cursor() as cursor:
+			for query in ctx.captured_queries:
+				sql = query['sql']
+				if sql.split(None, 1)[0].upper() in ('SELECT', 'UPDATE', 'DELETE'):
+					cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+					plans[sql] = [row[-1] for row in cursor.fetchall()]
+		return plans
+
+	def assertUsesIndex(self, plans, table, index):
+		import re
+		touching = {sql: details for sql, details in plans.items() if f'"{table}"' in sql}
+		self.assertTrue(touching, msg=f'no statement reads {table}')
+		for sql, details in touching.items():
+			scans = [d for d in details if re.fullmatch(rf'SCAN {table}( AS \w+)?', d)]
+			self.assertFalse(scans, msg=f'{table} is scanned without an index: {sql}\n{details}')
+		used = [d for details in touching.values() for d in details if re.search(rf'\bINDEX {index}\b', d)]
+		self.assertTrue(used, msg=f'{index} is not used: {touching}')
+
+	def test_hot_views_use_indexes(self):
+		from django.core.management import call_command
+		from audit.models import AuditLog
+		from .models import Notification, Vote
+		from .notifications import notify
+		self.election.results_published = True
+		self.election.save(update_fields=['results_published'])
+		Vote.objects.create(voter=self.voter, candidate=self.candidate, election=self.election)
+		notify(self.voter, title='Unread', message='m')
+
+		plans = self.plans(lambda: self.client.get(reverse('voter_elections_list')))
+		self.assertUsesIndex(plans, 'elections_election', 'election_active_start_idx')
+		plans = self.plans(lambda: self.client.get(reverse('voter_view_results')))
+		self.assertUsesIndex(plans, 'elections_election', 'election_published_end_idx')
+		plans = self.plans(lambda: self.client.post(reverse('voter_notifications')))
+		self.assertUsesIndex(plans, Notification._meta.db_table, 'notification_voter_read_idx')
+		plans = self.plans(lambda: call_command('reconcile_tallies', '--election', str(self.election.pk), stdout=StringIO()))
+		self.assertUsesIndex(plans, Vote._meta.db_table, 'vote_election_candidate_idx')
+
+		self.client.force_login(self.admin)
+		plans = self.plans(lambda: self.client.get(reverse('admin_voter_management'), {'status': 'pending'}))
+		self.assertUsesIndex(plans, 'users_voter', 'voter_status_idx')
+		plans = self.plans(lambda: self.client.get(reverse('audit_list'), {'model': 'users.Vote'}))
+		self.assertUsesIndex(plans, AuditLog._meta.db_table, 'audit_target_created_idx')
+
+
+class QueryInstrumentationTests(BallotFixtureMixin, TestCase):
+	def test_middleware_reports_queries_per_view(self):
+		from django.test import Client
+		from .instrumentation import view_stats
+		view_stats.reset()
+		with self.settings(QUERY_INSTRUMENTATION=True):
+			client = Client()
+			client.force_login(self.user)
+			with self.assertLogs('users.instrumentation', 'INFO'):
+				resp = client.get(reverse('voter_elections_list'))
+		self.assertEqual(resp.status_code, 200)
+		self.assertGreater(int(resp['X-Query-Count']), 0)
+		self.assertIn('X-Render-Time-Ms', resp)
+		row = next(r for r in view_stats.snapshot() if r['view'] == 'voter_elections_list')
+		self.assertEqual(row['requests'], 1)
+
+	def test_middleware_is_off_by_default(self):
+		resp = self.client.get(reverse('voter_elections_list'))
+		self.assertNotIn('X-Query-Count', resp)
+
+	def test_recorder_enforces_budget(self):
+		from .instrumentation import QueryRecorder, QueryBudgetExceeded, fingerprint
+		with QueryRecorder() as recorder:
+			self.client.get(reverse('voter_elections_list'))
+		recorder.assert_budget(recorder.count)
+		with self.assertRaises(QueryBudgetExceeded):
+			recorder.assert_budget(recorder.count - 1)
+		self.assertEqual(fingerprint('SELECT 1 FROM t WHERE id IN (%s, %s, %s)'), 'SELECT ? FROM t WHERE id IN (...)')
+
+
+class NPlusOneDetectionTests(BallotFixtureMixin, TestCase):
+	def setUp(self):
+		super().setUp()
+		from .models import Vote, Voter
+		Vote.objects.create(voter=self.voter, candidate=self.candidate, election=self.election)
+		other = self.User.objects.create_user(username='othervoter', email='other@example.com', password='pw', role='voter')
+		other_voter = Voter.objects.create(user=other, voter_id='FV2', mobile_no='456', address='addr', verification_status='verified')
+		Vote.objects.create(voter=other_voter, candidate=self.candidate, election=self.election)
+
+	def test_raises_on_repeated_lazy_loads(self):
+		from .models import Vote
+		from .nplusone import detect_n_plus_one, NPlusOneError
+		with self.assertRaisesMessage(NPlusOneError, 'users.Vote.candidate'):
+			with detect_n_plus_one(mode='raise', threshold=2):
+				[vote.candidate.name for vote in Vote.objects.all()]
+
+	def test_select_related_passes(self):
+		from .models import Vote
+		from .nplusone import detect_n_plus_one
+		with detect_n_plus_one(mode='raise', threshold=2):
+			names = [vote.candidate.party.name for vote in Vote.objects.select_related('candidate__party')]
+		self.assertEqual(names, ['Fast Party', 'Fast Party'])
+
+	def test_log_mode_warns_once_per_relation(self):
+		from .models import Vote
+		from .nplusone import detect_n_plus_one
+		with self.assertLogs('users.nplusone', 'WARNING') as logs:
+			with detect_n_plus_one(mode='log', threshold=2, label='votes'):
+				[vote.election.title for vote in Vote.objects.all()]
+				[vote.election.title for vote in Vote.objects.all()]
+		self.assertEqual(len(logs.records), 1)
+		self.assertIn('N+1 query in votes: users.Vote.election', logs.output[0])
+
+	def test_voter_profile_has_no_lazy_loads(self):
+		# the test run uses NPLUSONE_MODE = 'raise', so a lazy load per vote row fails the request
+		from elections.models import Election
+		from .models import Vote
+		second = Election.objects.create(title='Second Election', start_date=self.election.start_date, end_date=self.election.end_date, is_active=True)
+		Vote.objects.create(voter=self.voter, candidate=self.candidate, election=second)
+		resp = self.client.get(reverse('voter_profile'))
+		self.assertEqual(resp.status_code, 200)
+
+
+class VoterListingPaginationTests(TestCase):
+	def setUp(self):
+		from django.core.cache import cache
+		from .seeding import seed_electorate
+		cache.clear()
+		seed_electorate(voters=45, candidates=2, elections=1, turnout=0, prefix='page')
+		self.admin = get_user_model().objects.create_superuser('pageadmin', 'pageadmin@example.com', 'pw', role='admin')
+		self.client.force_login(self.admin)
+
+	def walk(self, **params):
+		resp = self.client.get(reverse('admin_voter_management'), params)
+		self.assertEqual(resp.status_code, 200)
+		return resp.context['voters']
+
+	def test_pages_forward_and_back_without_gaps(self):
+		from .models import Voter
+		expected = list(Voter.objects.order_by('-user__created_at', '-user_id').values_list('pk', flat=True))
+		seen, pages, page = [], [], self.walk()
+		while True:
+			pages.append(page)
+			seen.extend(v.pk for v in page)
+			if not page.has_next():
+				break
+			page = self.walk(after=page.next_cursor)
+		self.assertEqual(seen, expected)
+		self.assertEqual([len(p) for p in pages], [20, 20, 5])
+		self.assertFalse(pages[0].has_previous())
+		back = self.walk(before=pages[2].previous_cursor)
+		self.assertEqual([v.pk for v in back], [v.pk for v in pages[1]])
+
+	def test_deep_page_costs_the_same_as_the_first(self):
+		from django.db import connection
+		from django.test.utils import CaptureQueriesContext
+		cursor = self.walk(after=self.walk().next_cursor).next_cursor
+		with CaptureQueriesContext(connection) as shallow:
+			self.walk()
+		with CaptureQueriesContext(connection) as deep:
+			self.walk(after=cursor)
+		self.assertEqual(len(deep.captured_queries), len(shallow.captured_queries))
+		self.assertFalse(any('COUNT' in q['sql'] for q in deep.captured_queries))
+		self.assertFalse(any('OFFSET' in q['sql'] for q in deep.captured_queries))
+
+	def test_bad_cursor_falls_back_to_first_page(self):
+		self.assertEqual([v.pk for v in self.walk(after='not-a-cursor')], [v.pk for v in self.walk()])
+
+
+class VoterSearchIndexTests(TestCase):
+	def setUp(self):
+		from .models import Voter
+		User = get_user_model()
+		self.alice = Voter.objects.create(
+			user=User.objects.create_user(username='alice', email='alice@example.com', password='pw', role='voter'),
+			voter_id='ABC1234567', mobile_no='9876543210', address='addr',
+		)
+		self.bob = Voter.objects.create(
+			user=User.objects.create_user(username='bob', email='bob@mail.org', password='pw', role='voter'),
+			voter_id='XYZ7654321', mobile_no='9123456789', address='addr',
+		)
+
+	def search(self, query):
+		from .models import Voter
+		from .search import ranked_page, search_voters
+		voters, ranked = search_voters(Voter.objects.all(), query)
+		self.assertTrue(ranked)
+		return [v.pk for v in ranked_page(Voter.objects.all(), query, 50)]
+
+	def test_prefix_matches_voter_id_mobile_and_email(self):
+		self.assertEqual(self.search('ABC12'), [self.alice.pk])
+		self.assertEqual(self.search('9123'), [self.bob.pk])
+		self.assertEqual(self.search('mail.org'), [self.bob.pk])
+		self.assertEqual(self.search('98 alice'), [self.alice.pk])
+
+	def test_index_follows_updates_and_deletes(self):
+		from .models import Voter
+		self.bob.user.username = 'robert'
+		self.bob.user.save()
+		Voter.objects.filter(pk=self.alice.pk).update(mobile_no='5550001111')
+		self.assertEqual(self.search('robert'), [self.bob.pk])
+		self.assertEqual(self.search('555'), [self.alice.pk])
+		self.assertEqual(self.search('9876'), [])
+		self.bob.delete()
+		self.assertEqual(self.search('robert'), [])
+
+	def test_rebuild_command_reindexes(self):
+		from django.core.management import call_command
+		from django.db import connection
+		with connection.cursor() as cursor:
+			cursor.execute('DELETE FROM users_voter_search')
+		out = StringIO()
+		call_command('rebuild_voter_search', stdout=out)
+		self.assertIn('Indexed 2 voter(s)', out.getvalue())
+		self.assertEqual(self.search('alice'), [self.alice.pk])
+
+	def test_admin_listing_uses_index(self):
+		admin = get_user_model().objects.create_superuser('searchadmin', 'searchadmin@example.com', 'pw', role='admin')
+		self.client.force_login(admin)
+		resp = self.client.get(reverse('admin_voter_management'), {'q': 'XYZ'})
+		self.assertEqual([v.pk for v in resp.context['voters']], [self.bob.pk])
+		self.assertEqual(resp.context['total_count'], 1)
+
+	def test_broad_prefix_ranks_in_one_fts_query(self):
+		from django.db import connection
+		from django.test.utils import CaptureQueriesContext
+		from .models import Voter
+		from .search import ranked_page, search_voters
+		User = get_user_model()
+		users = User.objects.bulk_create([
+			User(username=f'roll{i}', email=f'roll{i}@example.com', role='voter') for i in range(2000)
+		])
+		Voter.objects.bulk_create([
+			Voter(user=user, voter_id=f'P{i:09d}', mobile_no=f'7{i:09d}', address='addr',
+				  verification_status='verified' if i % 10 == 0 else 'pending')
+			for i, user in enumerate(users)
+		])
+		verified = Voter.objects.filter(verification_status='verified')
+		with CaptureQueriesContext(connection) as ctx:
+			page = ranked_page(verified, 'P', 50)
+		self.assertEqual(len(page), 50)
+		self.assertTrue(all(v.verification_status == 'verified' for v in page))
+		sql = [q['sql'] for q in ctx.captured_queries]
+		# the match count, then ranked id blocks (growing to make up for the
+		# status filter), each loaded by pk without a MATCH subquery
+		self.assertIn('count(*)', sql[0])
+		ranked = [q for q in sql[1:] if 'MATCH' in q]
+		self.assertEqual(len(ranked), 3)
+		self.assertTrue(all('ORDER BY rank' in q and 'users_voter.id' not in q for q in ranked))
+		self.assertEqual(len(sql), 7)
+		voters, _ = search_voters(verified, 'P')
+		with self.assertNumQueries(1):
+			self.assertEqual(voters.count(), 200)
+		with self.settings(VOTER_SEARCH_RANK_LIMIT=100), CaptureQueriesContext(connection) as ctx:
+			self.assertEqual(len(ranked_page(verified, 'P', 50)), 50)
+		self.assertIn('ORDER BY rowid', ctx.captured_queries[1]['sql'])
+
+	def test_ranked_pages_reach_every_match(self):
+		from .models import Voter
+		from .search import ranked_page
+		User = get_user_model()
+		users = User.objects.bulk_create([
+			User(username=f'page{i}', email=f'page{i}@example.com', role='voter') for i in range(130)
+		])
+		Voter.objects.bulk_create([
+			Voter(user=user, voter_id=f'Q{i:05d}', mobile_no='1', address='addr',
+				  verification_status='verified' if i % 3 else 'pending')
+			for i, user in enumerate(users)
+		])
+		verified = Voter.objects.filter(verification_status='verified')
+		expected = set(verified.filter(voter_id__startswith='Q').values_list('pk', flat=True))
+		for limit in (20000, 10):
+			with self.settings(VOTER_SEARCH_RANK_LIMIT=limit):
+				pages, cursor = [], None
+				while True:
+					page = ranked_page(verified, 'Q', 25, after=cursor)
+					pages.append([v.pk for v in page])
+					if not page.has_next():
+						break
+					cursor = page.next_cursor
+				seen = [pk for ids in pages for pk in ids]
+				self.assertEqual(len(seen), len(expected))
+				self.assertEqual(set(seen), expected)
+				# and back again from the last page
+				back = ranked_page(verified, 'Q', 25, before=page.previous_cursor)
+				self.assertEqual([v.pk for v in back], pages[-2])
+				self.assertEqual(ranked_page(verified, 'Q', 25, before=back.previous_cursor).object_list[0].pk, pages[-3][0])
+
+		admin = get_user_model().objects.create_superuser('pageadmin', 'pageadmin@example.com', 'pw', role='admin')
+		self.client.force_login(admin)
+		with self.settings(VOTER_SEARCH_RESULTS=25):
+			resp = self.client.get(reverse('admin_voter_management'), {'q': 'Q', 'status': 'verified'})
+			self.assertContains(resp, f"?after={resp.context['voters'].next_cursor}")
+			resp = self.client.get(reverse('admin_voter_management'), {
+				'q': 'Q', 'status': 'verified', 'after': resp.context['voters'].next_cursor,
+			})
+		self.assertEqual(len(resp.context['voters']), 25)
+		self.assertTrue(resp.context['voters'].has_previous())
+
+
+class BulkVerificationTests(TestCase):
+	def setUp(self):
+		from .models import Voter
+		User = get_user_model()
+		self.voters = [
+			Voter.objects.create(
+				user=User.objects.create_user(username=f'pending{i}', email=f'pending{i}@example.com', password='pw', role='voter'),
+				voter_id=f'PV{i:03d}', mobile_no='123', address='addr',
+			)
+			for i in range(5)
+		]
+		Voter.objects.filter(pk=self.voters[4].pk).update(verification_status='verified')
+
+	def test_verifies_pending_in_chunks_with_notifications(self):
+		from audit.models import AuditLog
+		from .models import Voter, Notification
+		from .services import bulk_verify_voters
+		calls = []
+		verified = bulk_verify_voters(queryset=Voter.objects.all(), chunk_size=3, progress=lambda d, t: calls.append((d, t)))
+		self.assertEqual(verified, 4)
+		self.assertEqual(calls, [(3, 4), (4, 4)])
+		self.assertFalse(Voter.objects.filter(verification_status='pending').exists())
+		self.assertEqual(Voter.objects.filter(verification_date__isnull=False).count(), 4)
+		self.assertEqual(Notification.objects.filter(notification_type='verification').count(), 4)
+		self.assertEqual(AuditLog.objects.filter(details__source='bulk_verify').count(), 2)
+
+	def test_command_with_id_file(self):
+		import tempfile
+		from django.core.management import call_command
+		from .models import Voter, Notification
+		with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as fh:
+			fh.write('voter_id,name\nPV000,a\n\nPV002,b\nPV004,c\nNOPE,d\n')
+		out = StringIO()
+		call_command('verify_voters', file=fh.name, stdout=out)
+		self.assertIn('Verified 2 voter(s)', out.getvalue())
+		self.assertEqual(
+			set(Voter.objects.filter(verification_status='verified').values_list('voter_id', flat=True)),
+			{'PV000', 'PV002', 'PV004'},
+		)
+		self.assertEqual(Notification.objects.count(), 2)
+
+	@override_settings(VERIFICATION_MODE='inline')
+	def test_dashboard_upload_and_filter(self):
+		from django.core.files.uploadedfile import SimpleUploadedFile
+		from .models import Voter
+		admin = get_user_model().objects.create_superuser('verifyadmin', 'verifyadmin@example.com', 'pw', role='admin')
+		self.client.force_login(admin)
+		upload = SimpleUploadedFile('ids.txt', b'PV001\n')
+		resp = self.client.post(reverse('bulk_verify_voters'), {'voter_ids_file': upload})
+		self.assertRedirects(resp, reverse('admin_voter_management'), fetch_redirect_response=False)
+		self.assertEqual(Voter.objects.get(voter_id='PV001').verification_status, 'verified')
+		self.client.post(reverse('bulk_verify_voters'), {'q': 'pending3', 'status': 'pending'})
+		self.assertEqual(
+			set(Voter.objects.filter(verification_status='pending').values_list('voter_id', flat=True)),
+			{'PV000', 'PV002'},
+		)
+
+	def test_dashboard_queues_job_and_shows_progress(self):
+		from django.core.management import call_command
+		from .models import Voter, VerificationJob
+		admin = get_user_model().objects.create_superuser('queueadmin', 'queueadmin@example.com', 'pw', role='admin')
+		self.client.force_login(admin)
+		resp = self.client.post(reverse('bulk_verify_voters'), {'q': '', 'status': 'all'}, follow=True)
+		self.assertContains(resp, 'in the background')
+		self.assertContains(resp, 'Verifying all pending voters: queued')
+		self.assertEqual([job.status for job in resp.context['verification_jobs']], ['pending'])
+		self.assertEqual(Voter.objects.filter(verification_status='pending').count(), 4)
+		out = StringIO()
+		call_command('run_verification_jobs', '--chunk-size', '3', stdout=out)
+		self.assertIn('Verified 4 voter(s)', out.getvalue())
+		job = VerificationJob.objects.get()
+		self.assertEqual((job.status, job.verified, job.total, job.requested_by), ('done', 4, 4, admin))
+		self.assertFalse(Voter.objects.filter(verification_status='pending').exists())
+
+
+class ImportVotersTests(TestCase):
+	HEADER = 'username,email,password,full_name,voter_id,mobile_no,address,verification_status\n'
+
+	def setUp(self):
+		import tempfile
+		self.tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(self.tmp.cleanup)
+		get_user_model().objects.create_user(username='taken', email='taken@example.com', password='pw', role='voter')
+
+	def write_csv(self, body):
+		import os
+		path = os.path.join(self.tmp.name, 'voters.csv')
+		with open(path, 'w') as fh:
+			fh.write(self.HEADER + body)
+		return path
+
+	def test_imports_valid_rows_and_reports_rejects(self):
+		import csv
+		from django.core.management import call_command
+		from .models import Voter
+		path = self.write_csv(
+			'ann,ann@example.com,secret-1,Ann A,IMP001,9000000001,1 Road,verified\n'
+			'taken,other@example.com,secret-2,,IMP002,9000000002,2 Road,\n'
+			'ben,BEN@example.com,secret-3,Ben B,IMP003,9000000003,3 Road,\n'
+			'ann2,ann@example.com,secret-4,,IMP001,9000000004,4 Road,\n'
+			'cat,not-an-email,secret-5,,IMP005,9000000005,,\n'
+		)
+		out = StringIO()
+		call_command('import_voters', path, workers=1, chunk_size=2, stdout=out)
+		self.assertIn('Imported 2 voter(s) from 5 row(s)', out.getvalue())
+		ann = Voter.objects.select_related('user').get(voter_id='IMP001')
+		self.assertTrue(ann.user.check_password('secret-1'))
+		self.assertEqual(ann.verification_status, 'verified')
+		self.assertIsNotNone(ann.verification_date)
+		self.assertEqual(Voter.objects.get(voter_id='IMP003').verification_status, 'pending')
+		with open(f'{path}.errors.csv') as fh:
+			rejected = list(csv.DictReader(fh))
+		self.assertEqual([r['line'] for r in rejected], ['3', '5', '6'])
+		self.assertIn('username already exists', rejected[0]['errors'])
+		self.assertIn('voter_id already exists', rejected[1]['errors'])
+		self.assertIn('address is required', rejected[2]['errors'])
+
+	def test_resume_skips_checkpointed_rows(self):
+		import json
+		import os
+		from .importing import VoterImporter
+		from .models import Voter
+		path = self.write_csv(
+			'dan,dan@example.com,secret-1,,RES001,9000000001,1 Road,\n'
+			'eve,eve@example.com,secret-2,,RES002,9000000002,2 Road,\n'
+		)
+		checkpoint = os.path.join(self.tmp.name, 'checkpoint.json')
+		with open(checkpoint, 'w') as fh:
+			json.dump({'source': os.path.abspath(path), 'rows': 1, 'imported': 1, 'failed': 0}, fh)
+		state = VoterImporter(workers=2, checkpoint_path=checkpoint).run(path, resume=True)
+		self.assertEqual(state['rows'], 2)
+		self.assertEqual(state['imported'], 2)
+		self.assertEqual(list(Voter.objects.values_list('voter_id', flat=True)), ['RES002'])
+		self.assertTrue(Voter.objects.get().user.check_password('secret-2'))
+
+
+class CreateElectionSlateTests(TestCase):
+	def setUp(self):
+		from .models import Party, Candidate
+		admin = get_user_model().objects.create_superuser('slateadmin', 'slateadmin@example.com', 'pw', role='admin')
+		self.client.force_login(admin)
+		self.party = Party.objects.create(name='Slate Party')
+		self.existing = [
+			Candidate.objects.create(name=f'Existing {i}', age=40, party=self.party, area='North', is_approved=True)
+			for i in range(3)
+		]
+
+	def post(self, title, slate=None, candidates=()):
+		data = {
+			'title': title, 'description': 'd', 'is_active': 'on',
+			'start_date': '2030-01-01T09:00', 'end_date': '2030-01-02T09:00',
+			'candidates': [c.pk for c in candidates],
+		}
+		if slate is not None:
+			data['slate'] = slate
+		return self.client.post(reverse('create_election'), data)
+
+	def test_slate_and_selection_are_linked_in_bulk(self):
+		from django.core.files.uploadedfile import SimpleUploadedFile
+		from elections.models import Election
+		from .models import Campaign, Candidate
+		slate = SimpleUploadedFile('slate.csv', (
+			'name,party,age,area,id\n'
+			'New One,Fresh Party,35,South,\n'
+			'Existing 0,Slate Party,40,North,\n'
+			f',,,,{self.existing[2].pk}\n'
+		).encode())
+		resp = self.post('Slate Election', slate, candidates=self.existing[:2])
+		self.assertRedirects(resp, reverse('admin_dashboard'), fetch_redirect_response=False)
+		election = Election.objects.get(title='Slate Election')
+		self.assertEqual(
+			set(election.candidates.values_list('name', flat=True)),
+			{'Existing 0', 'Existing 1', 'Existing 2', 'New One'},
+		)
+		self.assertEqual(Candidate.objects.get(name='New One').party.name, 'Fresh Party')
+		self.assertEqual(Campaign.objects.filter(election=election).count(), 4)
+
+	def test_query_count_does_not_grow_with_the_slate(self):
+		import json
+		from django.core.files.uploadedfile import SimpleUploadedFile
+		from django.db import connection
+		from django.test.utils import CaptureQueriesContext
+
+		def slate(n, tag):
+			rows = [{'name': f'{tag} {i}', 'party': 'Bulk Party', 'age': 30, 'area': 'East'} for i in range(n)]
+			return SimpleUploadedFile('slate.json', json.dumps(rows).encode())
+
+		self.post('Warmup', slate(1, 'Warm'))
+		with CaptureQueriesContext(connection) as small:
+			self.post('Small', slate(2, 'Small'))
+		with CaptureQueriesContext(connection) as large:
+			self.post('Large', slate(40, 'Large'))
+		self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+
+	def test_invalid_slate_is_reported(self):
+		from django.core.files.uploadedfile import SimpleUploadedFile
+		from elections.models import Election
+		resp = self.post('Bad Slate', SimpleUploadedFile('slate.csv', b'name,party,age,area\nNo Age,P,,A\n,,,\n'))
+		self.assertEqual(resp.status_code, 200)
+		self.assertIn('Row 1: missing age.', resp.context['form'].errors['slate'])
+		self.assertFalse(Election.objects.filter(title='Bad Slate').exists())
+
+
+@override_settings(DELETION_MODE='inline')
+class DeletionJobTests(TestCase):
+	def setUp(self):
+		from django.core.cache import cache
+		from .seeding import seed_electorate
+		cache.clear()
+		self.summary = seed_electorate(voters=30, candidates=3, elections=2, turnout=0.8, prefix='del')
+		self.admin = get_user_model().objects.create_superuser('deladmin', 'deladmin@example.com', 'pw', role='admin')
+		self.client.force_login(self.admin)
+
+	def test_election_is_deleted_in_chunks_with_one_audit_entry(self):
+		from audit.models import AuditLog
+		from elections.models import Election
+		from .models import Vote, Campaign, ElectionTally, Notification, Voter, DeletionJob
+		election_id = self.summary['elections'][1]
+		voter = Voter.objects.first()
+		Notification.objects.create(voter=voter, title='t', message='m', election_id=election_id)
+		votes = Vote.objects.filter(election_id=election_id).count()
+		audit_before = AuditLog.objects.count()
+		with self.settings(DELETION_CHUNK_SIZE=7):
+			resp = self.client.get(reverse('delete_election', args=[election_id]))
+		self.assertRedirects(resp, reverse('admin_dashboard'), fetch_redirect_response=False)
+		self.assertFalse(Election.objects.filter(pk=election_id).exists())
+		for model in (Vote, Campaign, ElectionTally):
+			self.assertFalse(model.objects.filter(election_id=election_id).exists())
+		self.assertTrue(Notification.objects.filter(voter=voter, election__isnull=True).exists())
+		job = DeletionJob.objects.get()
+		self.assertEqual(job.status, 'done')
+		self.assertEqual(job.progress['users.Vote'], votes)
+		self.assertEqual(AuditLog.objects.count(), audit_before + 1)
+		entry = AuditLog.objects.get(details__source='deletion_job')
+		self.assertEqual((entry.actor, entry.target_model), (self.admin, 'elections.Election'))
+
+	def test_voter_deletion_releases_tallies_and_removes_account(self):
+		from datetime import date
+		from audit.models import AuditDailySummary, AuditLog
+		from .models import Vote, Voter, ElectionTally
+		vote = Vote.objects.select_related('voter').first()
+		voter = vote.voter
+		AuditLog.objects.create(actor_id=voter.user_id, action='other')
+		summary = AuditDailySummary.objects.create(day=date(2020, 1, 1), actor_id=voter.user_id, action='other', count=3)
+		tally = ElectionTally.objects.get(election_id=vote.election_id, candidate_id=vote.candidate_id)
+		self.client.get(reverse('delete_voter', args=[voter.pk]))
+		self.assertFalse(Voter.objects.filter(pk=voter.pk).exists())
+		self.assertFalse(get_user_model().objects.filter(pk=voter.user_id).exists())
+		tally.refresh_from_db()
+		self.assertEqual(tally.count, Vote.objects.filter(election_id=vote.election_id, candidate_id=vote.candidate_id).count())
+		self.assertTrue(AuditLog.objects.filter(action='other', actor__isnull=True).exists())
+		summary.refresh_from_db()
+		self.assertIsNone(summary.actor_id)
+
+	def test_background_mode_waits_for_worker(self):
+		from django.core.management import call_command
+		from .models import Candidate, Vote, DeletionJob
+		candidate_id = self.summary['candidates'][0]
+		with self.settings(DELETION_MODE='background'):
+			self.client.get(reverse('delete_candidate', args=[candidate_id]))
+			self.client.get(reverse('delete_candidate', args=[candidate_id]))
+		self.assertEqual(DeletionJob.objects.get().status, 'pending')
+		self.assertTrue(Candidate.objects.filter(pk=candidate_id).exists())
+		out = StringIO()
+		call_command('run_deletion_jobs', stdout=out)
+		self.assertIn('Deleted candidate', out.getvalue())
+		self.assertFalse(Candidate.objects.filter(pk=candidate_id).exists())
+		self.assertFalse(Vote.objects.filter(candidate_id=candidate_id).exists())
+
+	def test_retry_requeues_job_left_running_by_a_dead_worker(self):
+		from django.core.management import call_command
+		from .deletion import schedule_deletion
+		from .models import Candidate, DeletionJob
+		candidate = Candidate.objects.get(pk=self.summary['candidates'][0])
+		with self.settings(DELETION_MODE='background'):
+			job = schedule_deletion(candidate, requested_by=self.admin)
+			DeletionJob.objects.filter(pk=job.pk).update(status='running')
+			# the open job blocks a new one for the same target
+			self.assertEqual(schedule_deletion(candidate).pk, job.pk)
+		call_command('run_deletion_jobs', stdout=StringIO())
+		self.assertEqual(DeletionJob.objects.get(pk=job.pk).status, 'running')
+		call_command('run_deletion_jobs', '--retry-failed', stdout=StringIO())
+		self.assertEqual(DeletionJob.objects.get(pk=job.pk).status, 'done')
+		self.assertFalse(Candidate.objects.filter(pk=candidate.pk).exists())
+
+
+class BroadcastNotificationTests(BallotFixtureMixin, TestCase):
+	def setUp(self):
+		super().setUp()
+		from datetime import timedelta
+		from django.utils import timezone
+		from .models import Notification, BroadcastNotification
+		from .notifications import broadcast, notify
+		now = timezone.now()
+		for i in range(3):
+			n = notify(self.voter, title=f'Personal {i}', message='m')
+			Notification.objects.filter(pk=n.pk).update(created_at=now - timedelta(minutes=10 * i))
+			b = broadcast(f'Broadcast {i}', 'to everyone', election=self.election)
+			BroadcastNotification.objects.filter(pk=b.pk).update(created_at=now - timedelta(minutes=10 * i + 5))
+
+	def test_feed_merges_in_time_order_and_pages(self):
+		resp = self.client.get(reverse('voter_notifications'))
+		titles = [n.title for n in resp.context['notifications']]
+		self.assertEqual(titles, ['Personal 0', 'Broadcast 0', 'Personal 1', 'Broadcast 1', 'Personal 2', 'Broadcast 2'])
+		self.assertEqual(resp.context['page_obj'].paginator.count, 6)
+		self.assertContains(resp, 'All voters')
+		self.assertContains(resp, 'Fast Election')
+
+	def test_receipts_are_written_only_when_read(self):
+		from .models import BroadcastReceipt
+		from .notifications import unread_count
+		self.assertEqual(BroadcastReceipt.objects.count(), 0)
+		self.voter.refresh_from_db()
+		self.assertEqual(unread_count(self.voter), 6)
+		self.client.post(reverse('voter_notifications'))
+		self.assertEqual(BroadcastReceipt.objects.filter(voter=self.voter).count(), 3)
+		self.voter.refresh_from_db()
+		self.assertEqual(unread_count(self.voter), 0)
+		resp = self.client.get(reverse('voter_notifications'))
+		self.assertTrue(all(n.is_read for n in resp.context['notifications']))
+
+	def test_publishing_broadcasts_once(self):
+		from .models import BroadcastNotification, Notification
+		from .services import publish_election_results
+		self.close_election()
+		publish_election_results(self.election)
+		publish_election_results(self.election)
+		self.assertEqual(BroadcastNotification.objects.filter(notification_type='results_available').count(), 1)
+		self.assertFalse(Notification.objects.filter(notification_type='results_available').exists())
+
+
+class UnreadCounterTests(BallotFixtureMixin, TestCase):
+	def test_broadcast_total_expires_for_other_workers(self):
+		import time
+		from unittest import mock
+		from .models import BroadcastNotification
+		from .notifications import broadcast_total
+		self.assertEqual(broadcast_total(), 0)
+		# another worker's broadcast: no signal clears this process's cache
+		BroadcastNotification.objects.bulk_create([BroadcastNotification(title='t', message='m')])
+		self.assertEqual(broadcast_total(), 0)
+		later = time.time() + 31
+		with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later):
+			self.assertEqual(broadcast_total(), 1)
+
+	def test_counters_follow_inserts_and_mark_read(self):
+		from .models import Voter
+		from .notifications import notify, notify_many, broadcast, unread_count
+		from .models import Notification
+		notify(self.voter, title='One', message='m')
+		notify_many([Notification(voter=self.voter, title=f'Bulk {i}', message='m') for i in range(2)])
+		broadcast('Everyone', 'm')
+		voter = Voter.objects.get(pk=self.voter.pk)
+		self.assertEqual((voter.unread_notifications, unread_count(voter)), (3, 4))
+		self.client.post(reverse('voter_notifications'))
+		voter.refresh_from_db()
+		self.assertEqual(unread_count(voter), 0)
+
+	def test_notify_during_mark_all_read_stays_unread(self):
+		from unittest import mock
+		from .models import BroadcastReceipt, Notification, Voter
+		from .notifications import mark_all_read, notify
+		notify(self.voter, title='Old', message='m')
+		bulk_create = BroadcastReceipt.objects.bulk_create
+
+		def notify_in_between(*args, **kwargs):
+			notify(self.voter, title='New', message='m')
+			return bulk_create(*args, **kwargs)
+
+		with mock.patch.object(BroadcastReceipt.objects, 'bulk_create', side_effect=notify_in_between):
+			mark_all_read(self.voter)
+		self.assertEqual(Voter.objects.get(pk=self.voter.pk).unread_notifications, 1)
+		self.assertEqual(list(Notification.objects.filter(is_read=False).values_list('title', flat=True)), ['New'])
+
+	def test_badge_is_computed_once_per_request(self):
+		from django.test import RequestFactory
+		from .context_processors import request_unread_count
+		from .notifications import notify, broadcast_total
+		notify(self.voter, title='One', message='m')
+		broadcast_total()
+		request = RequestFactory().get('/')
+		request.user = get_user_model().objects.get(pk=self.user.pk)
+		with self.assertNumQueries(1):
+			self.assertEqual(request_unread_count(request), 1)
+		with self.assertNumQueries(0):
+			self.assertEqual(request_unread_count(request), 1)
+		resp = self.client.get(reverse('voter_elections_list'))
+		self.assertContains(resp, 'badge bg-danger rounded-pill ms-1">1<')
+
+	def test_repair_command_recomputes(self):
+		from django.core.management import call_command
+		from django.core.management.base import CommandError
+		from .models import Voter, Notification
+		Notification.objects.create(voter=self.voter, title='Raw', message='m')
+		with self.assertRaises(CommandError):
+			call_command('repair_unread_counters', check=True, stdout=StringIO())
+		out = StringIO()
+		call_command('repair_unread_counters', stdout=out)
+		self.assertIn('Repaired unread counters for 1 voter(s)', out.getvalue())
+		self.assertEqual(Voter.objects.get(pk=self.voter.pk).unread_notifications, 1)
+
+
+class NotificationFanoutTests(TestCase):
+	def setUp(self):
+		from django.core.cache import cache
+		from .seeding import seed_electorate
+		cache.clear()
+		self.summary = seed_electorate(voters=25, candidates=3, elections=2, turnout=0.6, prefix='fan')
+		self.election_id = self.summary['elections'][0]
+
+	def run_worker(self, *args):
+		from django.core.management import call_command
+		out = StringIO()
+		call_command('run_notification_fanout', '--chunk-size', '4', *args, stdout=out)
+		return out.getvalue()
+
+	def test_due_events_are_sent_once_in_chunks(self):
+		from .models import Notification, NotificationFanout, Vote, Voter
+		verified = Voter.objects.filter(verification_status='verified')
+		voted = set(Vote.objects.filter(election_id=self.election_id).values_list('voter_id', flat=True))
+		out = self.run_worker()
+		self.assertIn('Queued 2 fan-out(s)', out)
+		opened = Notification.objects.filter(election_id=self.election_id, notification_type='election_open')
+		reminded = Notification.objects.filter(election_id=self.election_id, notification_type='election_reminder')
+		self.assertEqual(opened.count(), verified.count())
+		self.assertEqual(set(reminded.values_list('voter_id', flat=True)), set(verified.exclude(pk__in=voted).values_list('pk', flat=True)))
+		self.assertEqual(set(NotificationFanout.objects.values_list('election_id', 'status')), {(self.election_id, 'done')})
+		voter = verified.exclude(pk__in=voted).first()
+		self.assertEqual(voter.unread_notifications, Notification.objects.filter(voter=voter, is_read=False).count())
+
+		before = Notification.objects.count()
+		self.assertEqual(self.run_worker('--retry-failed'), '')
+		self.assertEqual(Notification.objects.count(), before)
+
+	def test_interrupted_fanout_resumes_after_checkpoint(self):
+		from .fanout import recipient_chunks
+		from .models import Notification, NotificationFanout, Voter
+		from .notifications import notify_many
+		job = NotificationFanout.objects.create(election_id=self.election_id, notification_type='election_open')
+		first = next(recipient_chunks(job, 6))
+		notify_many([Notification(voter_id=pk, title='Election Open', notification_type='election_open', election_id=self.election_id) for pk in first])
+		# a worker died after committing the first chunk
+		NotificationFanout.objects.filter(pk=job.pk).update(status='running', last_voter_id=first[-1], sent=6)
+		self.run_worker('--retry-failed')
+		job.refresh_from_db()
+		verified = Voter.objects.filter(verification_status='verified').count()
+		self.assertEqual((job.status, job.sent), ('done', verified))
+		sent = Notification.objects.filter(notification_type='election_open')
+		self.assertEqual(sent.count(), verified)
+		self.assertEqual(sent.values('voter').distinct().count(), verified)
+
+	def test_open_fanout_reads_each_chunk_before_writing(self):
+		from django.db import connection
+		from django.test.utils import CaptureQueriesContext
+		from .fanout import run_fanout
+		from .models import NotificationFanout, Voter
+		job = NotificationFanout.objects.create(election_id=self.election_id, notification_type='election_open')
+		with CaptureQueriesContext(connection) as ctx:
+			run_fanout(job, chunk_size=4)
+		reads = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT "users_voter"."id"')]
+		verified = Voter.objects.filter(verification_status='verified').count()
+		# one keyset query per chunk, plus the empty one that ends the walk
+		self.assertEqual(len(reads), -(-verified // 4) + 1)
+		self.assertTrue(all('LIMIT 4' in sql and '"users_voter"."id" >' in sql for sql in reads))
+
+	def test_opening_an_election_only_queues_the_fanout(self):
+		from elections.models import Election
+		from .models import Notification, NotificationFanout
+		admin = get_user_model().objects.create_superuser('fanadmin', 'fanadmin@example.com', 'pw', role='admin')
+		self.client.force_login(admin)
+		Election.objects.filter(pk=self.election_id).update(is_active=False)
+		self.client.get(reverse('toggle_election', args=[self.election_id]))
+		job = NotificationFanout.objects.get(election_id=self.election_id, notification_type='election_open')
+		self.assertEqual(job.status, 'pending')
+		self.assertFalse(Notification.objects.filter(notification_type='election_open').exists())
+
+
+class ElectionReminderTests(TestCase):
+	def setUp(self):
+		from django.core.cache import cache
+		from .seeding import seed_electorate
+		cache.clear()
+		self.summary = seed_electorate(voters=25, candidates=3, elections=2, turnout=0.6, prefix='rem')
+		self.election_id = self.summary['elections'][0]
+
+	def test_non_voters_are_an_indexed_anti_join(self):
+		from django.db import connection
+		from .fanout import non_voters
+		from .models import Vote, Voter
+		voted = Vote.objects.filter(election_id=self.election_id).values_list('voter_id', flat=True)
+		expected = list(Voter.objects.filter(verification_status='verified').exclude(pk__in=voted).order_by('pk').values_list('pk', flat=True))
+		ids = non_voters(self.election_id).order_by('pk').values_list('pk', flat=True)
+		self.assertEqual(list(ids), expected)
+		sql, params = ids.filter(pk__gt=0)[:10].query.sql_with_params()
+		with connection.cursor() as cursor:
+			cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+			plan = ' '.join(row[-1] for row in cursor.fetchall())
+		self.assertNotIn('SCAN', plan)
+		self.assertIn('COVERING INDEX', plan)
+
+	def test_reminder_command_reports_turnout_and_sends_once(self):
+		from django.core.management import call_command
+		from .fanout import non_voters
+		from .models import Notification, Vote
+		cast = Vote.objects.filter(election_id=self.election_id).count()
+		waiting = set(non_voters(self.election_id).values_list('pk', flat=True))
+		out = StringIO()
+		call_command('send_election_reminders', '--report-only', stdout=out)
+		self.assertIn(f'{cast} ballot(s) cast, {len(waiting)} verified voter(s) yet to vote', out.getvalue())
+		self.assertFalse(Notification.objects.exists())
+
+		out = StringIO()
+		call_command('send_election_reminders', '--election', str(self.election_id), '--chunk-size', '3', stdout=out)
+		self.assertIn(f'reminded {len(waiting)} voter(s)', out.getvalue())
+		reminded = Notification.objects.filter(election_id=self.election_id, notification_type='election_reminder')
+		self.assertEqual(set(reminded.values_list('voter_id', flat=True)), waiting)
+
+		out = StringIO()
+		call_command('send_election_reminders', stdout=out)
+		self.assertIn('reminder already done', out.getvalue())
+		self.assertEqual(reminded.count(), len(waiting))
+
+	def test_closed_election_is_rejected(self):
+		from django.core.management import call_command
+		from django.core.management.base import CommandError
+		with self.assertRaises(CommandError):
+			call_command('send_election_reminders', '--election', str(self.summary['elections'][1]), stdout=StringIO())
+
+
+class AuditListViewTests(TestCase):
+	def setUp(self):
+		from audit.models import AuditLog
+		self.admin = get_user_model().objects.create_superuser('logadmin', 'logadmin@example.com', 'pw', role='admin')
+		AuditLog.objects.bulk_create([
+			AuditLog(action='create', target_model='users.Vote', target_repr=f'vote {i}', actor=self.admin if i < 3 else None)
+			for i in range(60)
+		])
+		self.client.force_login(self.admin)
+
+	def test_listing_filters_and_pages_by_cursor(self):
+		resp = self.client.get(reverse('audit_list'), {'model': 'users.Vote'})
+		self.assertEqual(len(resp.context['logs']), 50)
+		self.assertTrue(resp.context['logs'].has_next())
+		resp = self.client.get(reverse('audit_list'), {'model': 'users.Vote', 'after': resp.context['logs'].next_cursor})
+		self.assertEqual(len(resp.context['logs']), 10)
+		resp = self.client.get(reverse('audit_list'), {'actor': 'logadmin', 'until': '2999-01-01'})
+		self.assertEqual(len(resp.context['logs']), 3)
+		resp = self.client.get(reverse('audit_list'), {'since': 'soon'})
+		self.assertContains(resp, 'Not a date or datetime')
+
+	def test_export_is_streamed(self):
+		import gzip
+		resp = self.client.get(reverse('audit_export'), {'actor': 'logadmin', 'gzip': '1'})
+		self.assertTrue(resp.streaming)
+		self.assertEqual(gzip.decompress(b''.join(resp.streaming_content)).count(b'\n'), 3)
@@ -35,10 +35,15 @@ urlpatterns = [
 
     path('dashboards/admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
     path('admin/verify-voter/<int:voter_id>/', views.verify_voter, name='verify_voter'),
+    path('admin/verify-voters/', views.bulk_verify_voters_view, name='bulk_verify_voters'),
     path('admin/delete-voter/<int:voter_id>/', views.delete_voter, name='delete_voter'),
     path('admin/create-election/', views.create_election, name='create_election'),
     path('admin/toggle-election/<int:election_id>/', views.toggle_election, name='toggle_election'),
     path('admin/publish-results/<int:election_id>/', views.publish_results, name='publish_results'),
+    path('admin/results-cache/', views.results_cache_status, name='results_cache_status'),
+    path('admin/query-stats/', views.query_stats, name='query_stats'),
+    path('admin/audit/', views.audit_list, name='audit_list'),
+    path('admin/audit/export/', views.audit_export, name='audit_export'),
     path('admin/delete-election/<int:election_id>/', views.delete_election, name='delete_election'), 
     path('admin/approve-candidate/<int:candidate_id>/', views.approve_candidate, name='approve_candidate'),
     path('admin/delete-candidate/<int:candidate_id>/', views.delete_candidate, name='delete_candidate'),
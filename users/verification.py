@@ -0,0 +1,77 @@
+"""Queued bulk verification of voters.
+
+Verifying tens of thousands of voters before an election takes a while,
+even at one transaction per chunk. So the voter management page only
+queues a ``VerificationJob``, and ``manage.py run_verification_jobs
+--follow`` runs it with ``services.bulk_verify_voters``. After every chunk
+the running count is stored on the job, and the page shows it.
+``VERIFICATION_MODE = 'inline'`` runs the job in the request instead.
+
+``bulk_verify_voters`` only touches voters who are still pending, so a
+requeued job (``--retry-failed``) carries on where it stopped.
+"""
+import logging
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import VerificationJob
+from .search import filter_voters
+from .services import bulk_verify_voters
+
+logger = logging.getLogger(__name__)
+
+
+def schedule_verification(requested_by=None, voter_codes=None, search_query='', filter_status='all'):
+    """Queue a bulk verification of ``voter_codes``, or of the pending voters matching the page filter.
+
+    Returns the job. With ``VERIFICATION_MODE = 'inline'`` it has already
+    run; with ``'background'`` it waits for ``manage.py run_verification_jobs``.
+    """
+    job = VerificationJob.objects.create(
+        voter_codes=voter_codes, search_query=search_query, filter_status=filter_status,
+        requested_by=requested_by,
+    )
+    if settings.VERIFICATION_MODE == 'inline':
+        run_verification_job(job)
+    return job
+
+
+def run_verification_job(job, chunk_size=None):
+    """Run one pending (or requeued) job to completion. Returns False if another worker has it."""
+    claimed = VerificationJob.objects.filter(pk=job.pk, status='pending').update(status='running')
+    if not claimed:
+        return False
+    job.status = 'running'
+    chunk_size = chunk_size or settings.VERIFICATION_CHUNK_SIZE
+    # verified by an earlier, interrupted run of this job
+    earlier = job.verified
+
+    def progress(done, total):
+        job.verified, job.total = earlier + done, max(job.total, earlier + total)
+        VerificationJob.objects.filter(pk=job.pk).update(verified=job.verified, total=job.total)
+
+    try:
+        if job.voter_codes is not None:
+            bulk_verify_voters(voter_codes=job.voter_codes, actor=job.requested_by, chunk_size=chunk_size, progress=progress)
+        else:
+            voters, _ = filter_voters(job.search_query, job.filter_status)
+            bulk_verify_voters(queryset=voters, actor=job.requested_by, chunk_size=chunk_size, progress=progress)
+    except Exception as exc:
+        logger.exception('Verification job %s failed', job.pk)
+        job.status, job.error = 'failed', str(exc)
+        job.save(update_fields=['status', 'error'])
+        return True
+
+    job.status, job.error, job.finished_at = 'done', '', timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    return True
+
+
+def run_pending_jobs(chunk_size=None):
+    """Run every pending job, oldest first. Returns the jobs that were run."""
+    ran = []
+    for job in VerificationJob.objects.filter(status='pending').select_related('requested_by').order_by('created_at'):
+        if run_verification_job(job, chunk_size):
+            ran.append(job)
+    return ran
@@ -2,22 +2,34 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout, get_user_model
 from django.contrib import messages
 from .forms import ElectionForm
-from django.db.models import Q
-from django.db import transaction 
-# ✅ ADD THIS LINE:
-from django.contrib.admin.models import LogEntry
 from django.contrib.auth.views import (
     PasswordResetView, PasswordResetDoneView,
     PasswordResetConfirmView, PasswordResetCompleteView
 )
+from django.conf import settings
 from django.utils import timezone
 from django.urls import reverse_lazy
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
-from django.db.models import Count
+from django.http import JsonResponse, StreamingHttpResponse
 
-from .models import Party, Candidate, Voter, Vote, Election, Campaign, Notification
+from .models import Party, Candidate, Voter, Vote, Election, Campaign, VerificationJob
 from .forms import VoterRegistrationForm, CampaignForm, ElectionForm
+from .services import (
+    record_vote, publish_election_results, ResultsNotFinal, parse_voter_codes,
+    create_election_with_candidates,
+)
+from .results_cache import get_election_results, get_published_elections, results_cache_stats
+from .vote_journal import journal_enabled, get_journal
+from .verification import schedule_verification
+from .instrumentation import view_stats
+from .pagination import keyset_page, cached_count
+from .search import filter_voters, ranked_page, status_voters
+from .deletion import schedule_deletion
+from .fanout import schedule_due_fanouts
+from audit.models import AuditLog
+from audit.query import audit_lines, audit_page, filters_from_params, gzip_stream
+from .notifications import notification_feed, hydrate_feed, mark_all_read, unread_count, notify
 User = get_user_model()
 
 def home_view(request):
@@ -194,7 +206,7 @@ def logout_view(request):
 @login_required
 def my_campaigns(request):
     candidate = get_object_or_404(Candidate, user=request.user)
-    campaigns = Campaign.objects.filter(candidate=candidate)
+    campaigns = Campaign.objects.filter(candidate=candidate).select_related('election')
     return render(request, 'candidate/campaign/my_campaigns.html', {'campaigns': campaigns})
 
 @login_required
@@ -289,10 +301,8 @@ def voter_profile(request):
 
     context = {
         "voter": voter,
-        "user_votes": Vote.objects.filter(voter=voter),
-        "unread_notifications": Notification.objects.filter(
-            voter=voter, is_read=False
-        ).count(),
+        "user_votes": Vote.objects.filter(voter=voter).select_related('election', 'candidate__party'),
+        "unread_notifications": unread_count(voter),
     }
 
     return render(request, 'voter/profile.html', context)
@@ -322,7 +332,8 @@ def voter_elections_list(request):
         'voter': voter,
         'elections': page_obj,
         'page_obj': page_obj,
-        'voted_elections': list(voted_elections),
+        # include ballots still waiting in the write-behind journal
+        'voted_elections': list(voted_elections) + request.session.get('pending_ballots', []),
     }
     return render(request, 'voter/elections_list.html', context)
 
@@ -369,17 +380,14 @@ def voter_cast_vote(request, election_id):
         return redirect('users_home')
 
     election = get_object_or_404(Election, pk=election_id)
-    voter = get_object_or_404(Voter, user=request.user)
+    voter = get_object_or_404(Voter, user=user)
+    # Reuse the already-authenticated user instead of lazy-loading it again
+    voter.user = user
 
     if voter.verification_status != 'verified':
         messages.error(request, "You are not verified to vote.")
         return redirect('voter_elections_list')
 
-    if Vote.objects.filter(voter=voter, election=election).exists():
-        messages.warning(request, "You have already voted.")
-        vote = Vote.objects.get(voter=voter, election=election)
-        return redirect('vote_confirmation', vote_id=vote.id)
-
     candidate_id = request.POST.get('candidate_id')
     candidate = get_object_or_404(Candidate, pk=candidate_id)
 
@@ -390,13 +398,23 @@ def voter_cast_vote(request, election_id):
             "This candidate is not approved by admin yet."
         )
         return redirect('voter_elections_list')
-    
-    vote = Vote.objects.create(voter=voter, candidate=candidate, election=election)
-    Notification.objects.create(
-        voter=voter, title="Vote Submitted",
-        message=f"You voted in {election.title}.",
-        notification_type="vote_confirmation", election=election
-    )
+
+    if journal_enabled():
+        # Write-behind mode: acknowledge once the ballot is fsync'd to the
+        # journal; flush_vote_journal inserts it later.
+        accepted = get_journal().accept(voter.id, candidate.id, election.id)
+        if not accepted:
+            messages.warning(request, "You have already voted.")
+            return redirect('voter_elections_list')
+        # only shown on the elections list until the flusher catches up
+        request.session['pending_ballots'] = request.session.get('pending_ballots', []) + [election.id]
+        messages.success(request, "Your vote has been accepted and will be counted shortly.")
+        return redirect('voter_elections_list')
+
+    # Duplicate ballots are rejected by the unique constraint, not a pre-check
+    vote, created = record_vote(voter, candidate, election)
+    if not created:
+        messages.warning(request, "You have already voted.")
     return redirect('vote_confirmation', vote_id=vote.id)
 
 @login_required
@@ -412,15 +430,15 @@ def voter_notifications(request):
     except Voter.DoesNotExist:
         return redirect('voter_register')
     
-    notifications = Notification.objects.filter(voter=voter).order_by('-created_at')
-    
     if request.method == 'POST':
-        Notification.objects.filter(voter=voter, is_read=False).update(is_read=True)
+        mark_all_read(voter)
         messages.success(request, 'Notifications marked as read.')
         return redirect('voter_notifications')
-    
-    paginator = Paginator(notifications, 20)
+
+    # Personal and broadcast notifications in one time-ordered feed
+    paginator = Paginator(notification_feed(voter), 20)
     page_obj = paginator.get_page(request.GET.get('page', 1))
+    page_obj.object_list = hydrate_feed(page_obj.object_list)
     
     return render(request, 'voter/notifications.html', {
         'voter': voter, 'notifications': page_obj, 'page_obj': page_obj
@@ -458,70 +476,43 @@ def voter_notifications(request):
 
 def voter_view_results_election(request, election_id):
 
-    election = get_object_or_404(Election, id=election_id)
-
-    if not election.results_published:
+    # Served from the results cache; a miss reads the frozen snapshot once
+    snapshot = get_election_results(election_id)
+    if snapshot is None:
         messages.error(request, "Results for this election are not yet published.")
         return redirect('voter_view_results')
 
-    stats_queryset = (
-        Vote.objects.filter(election=election)
-        .values('candidate__name', 'candidate__party__name')
-        .annotate(votes=Count('id')).order_by('-votes')
-    )
-    
-    total_votes = sum(item['votes'] for item in stats_queryset)
-    
-    stats = []
-    for item in stats_queryset:
-        percentage = (item['votes'] / total_votes * 100) if total_votes > 0 else 0
-        item['percentage'] = percentage
-        stats.append(item)
-
-    published_elections = Election.objects.filter(
-        results_published=True
-    ).order_by('-end_date')
-
     return render(request, 'voter/view_results.html', {
-        'election': election,
-        'stats': stats,            
-        'total_votes': total_votes,
-        'published_elections': published_elections,
+        'election': snapshot.election,
+        'stats': snapshot.results,
+        'total_votes': snapshot.total_votes,
+        'published_elections': get_published_elections(),
         'now': timezone.now(),
     })
 
 def voter_view_results(request):
 
-    published_elections = Election.objects.filter(
-        results_published=True
-    ).order_by('-end_date')
+    published_elections = get_published_elections()
 
-    if not published_elections.exists():
+    if not published_elections:
         return render(request, 'voter/view_results.html', {
             'published_elections': [],
             'election': None
         })
 
-    latest_election = published_elections.first()
-
-    stats_queryset = (
-        Vote.objects.filter(election=latest_election)
-        .values('candidate__name', 'candidate__party__name')
-        .annotate(votes=Count('id')).order_by('-votes')
-    )
-    
-    total_votes = sum(item['votes'] for item in stats_queryset)
-    
-    stats = []
-    for item in stats_queryset:
-        percentage = (item['votes'] / total_votes * 100) if total_votes > 0 else 0
-        item['percentage'] = percentage
-        stats.append(item)
+    latest_election = published_elections[0]
+    snapshot = get_election_results(latest_election.pk)
+    if snapshot is None:
+        # unpublished since the list was cached
+        return render(request, 'voter/view_results.html', {
+            'published_elections': published_elections,
+            'election': None
+        })
 
     context = {
         'election': latest_election,         
-        'stats': stats,                      
-        'total_votes': total_votes,
+        'stats': snapshot.results,
+        'total_votes': snapshot.total_votes,
         'published_elections': published_elections, 
         'now': timezone.now(),
     }
@@ -553,7 +544,7 @@ def candidate_dashboard(request):
     #         request,
     #         'candidate/pending_approval.html'
     #     )
-    campaigns = Campaign.objects.filter(candidate=candidate)
+    campaigns = Campaign.objects.filter(candidate=candidate).select_related('election')
 
     return render(request, 'candidate/dashboard.html', {
         'candidate': candidate, 
@@ -690,27 +681,16 @@ def create_election(request):
         return redirect('users_home')
 
     if request.method == 'POST':
-        form = ElectionForm(request.POST)
+        form = ElectionForm(request.POST, request.FILES)
         if form.is_valid():
-            
             election = form.save(commit=False)
-            election.save()
-            
-            selected_candidates = form.cleaned_data.get('candidates')
-            if selected_candidates:
-                for candidate in selected_candidates:
-            
-                    candidate.elections.add(election)
-                    
-                    Campaign.objects.get_or_create(
-                        candidate=candidate,
-                        election=election,
-                        defaults={
-                            'message': f"Vote for {candidate.name}! Campaigning for {election.title}."
-                        }
-                    )
-
-            messages.success(request, f"Election '{election.title}' created with {selected_candidates.count()} candidates!")
+            linked, created = create_election_with_candidates(
+                election,
+                candidates=form.cleaned_data.get('candidates') or (),
+                slate=form.cleaned_data.get('slate') or (),
+            )
+            note = f" ({created} new from the slate)" if created else ""
+            messages.success(request, f"Election '{election.title}' created with {linked} candidates{note}!")
             return redirect('admin_dashboard')
         else:
             messages.error(request, "Please correct the errors below.")
@@ -727,6 +707,9 @@ def toggle_election(request, election_id):
     election = get_object_or_404(Election, id=election_id)
     election.is_active = not election.is_active # Switch True/False
     election.save()
+    if election.is_active:
+        # Only queues the "election open" notice; run_notification_fanout sends it
+        schedule_due_fanouts(elections=[election.pk])
     
     status = "Active" if election.is_active else "Closed"
     messages.info(request, f"Election is now {status}.")
@@ -739,12 +722,84 @@ def publish_results(request, election_id):
         return redirect('users_home')
 
     election = get_object_or_404(Election, id=election_id)
-    election.results_published = True
-    election.save()
+    try:
+        publish_election_results(election)
+    except ResultsNotFinal as exc:
+        messages.error(request, f"Results cannot be published yet: {exc}")
+        return redirect('admin_dashboard')
     
     messages.success(request, f"Results for {election.title} have been published.")
     return redirect('admin_dashboard')
 
+@login_required
+def results_cache_status(request):
+    if not (request.user.is_staff or request.user.is_superuser or getattr(request.user, 'role', '') == 'admin'):
+        messages.error(request, "Access Denied: Admins only.")
+        return redirect('users_home')
+
+    return JsonResponse(results_cache_stats())
+
+@login_required
+def audit_list(request):
+    if not (request.user.is_staff or request.user.is_superuser or getattr(request.user, 'role', '') == 'admin'):
+        messages.error(request, "Access Denied: Admins only.")
+        return redirect('users_home')
+
+    try:
+        filters = filters_from_params(request.GET)
+    except ValueError as exc:
+        messages.error(request, str(exc))
+        filters = {}
+    # Every filter is served by an (x, created_at) index, or the segment
+    # store's time index; pages are keyset, not OFFSET
+    logs = audit_page(filters, 50, after=request.GET.get('after'), before=request.GET.get('before'))
+    params = request.GET.copy()
+    for key in ('after', 'before'):
+        params.pop(key, None)
+    return render(request, 'manage/audit_list.html', {
+        'logs': logs,
+        'filters': {key: request.GET.get(key, '') for key in ('since', 'until', 'action', 'model', 'actor')},
+        'actions': AuditLog.ACTION_CHOICES,
+        'query': params.urlencode(),
+    })
+
+@login_required
+def audit_export(request):
+    if not (request.user.is_staff or request.user.is_superuser or getattr(request.user, 'role', '') == 'admin'):
+        messages.error(request, "Access Denied: Admins only.")
+        return redirect('users_home')
+
+    try:
+        filters = filters_from_params(request.GET)
+    except ValueError as exc:
+        messages.error(request, str(exc))
+        return redirect('audit_list')
+    # Streamed in keyset chunks, so the window is never held in memory
+    lines = audit_lines(filters)
+    if request.GET.get('gzip'):
+        response = StreamingHttpResponse(gzip_stream(lines), content_type='application/gzip')
+        response['Content-Disposition'] = 'attachment; filename="audit-log.jsonl.gz"'
+    else:
+        response = StreamingHttpResponse(lines, content_type='application/x-ndjson')
+        response['Content-Disposition'] = 'attachment; filename="audit-log.jsonl"'
+    return response
+
+@login_required
+def query_stats(request):
+    if not (request.user.is_staff or request.user.is_superuser or getattr(request.user, 'role', '') == 'admin'):
+        messages.error(request, "Access Denied: Admins only.")
+        return redirect('users_home')
+
+    if request.method == 'POST':
+        view_stats.reset()
+        messages.info(request, "Query statistics cleared.")
+        return redirect('query_stats')
+
+    return render(request, 'manage/query_stats.html', {
+        'stats': view_stats.snapshot(),
+        'enabled': getattr(settings, 'QUERY_INSTRUMENTATION', False),
+    })
+
 @login_required
 def approve_candidate(request, candidate_id):
     if not (request.user.is_superuser or request.user.is_staff or getattr(request.user, 'role', '') == 'admin'):
@@ -766,6 +821,14 @@ def approve_candidate(request, candidate_id):
     return redirect('admin_dashboard')
 
 
+def _report_deletion(request, job, what):
+    if job.status == 'done':
+        messages.warning(request, f"{what} has been deleted.")
+    elif job.status == 'failed':
+        messages.error(request, f"Could not delete {what}: {job.error}")
+    else:
+        messages.info(request, f"{what} is being deleted in the background.")
+
 @login_required
 def delete_candidate(request, candidate_id):
     # Security check
@@ -775,10 +838,9 @@ def delete_candidate(request, candidate_id):
 
     candidate = get_object_or_404(Candidate, id=candidate_id)
     name = candidate.name
-    # Delete the associated user account if needed, or just the candidate profile
-    # Here we delete the profile
-    candidate.delete()
-    messages.warning(request, f"Candidate {name} has been removed.")
+    # Delete the candidate profile (not the user account) in chunks
+    job = schedule_deletion(candidate, requested_by=request.user)
+    _report_deletion(request, job, f"Candidate {name}")
     return redirect('admin_dashboard')
 
 
@@ -789,9 +851,8 @@ def delete_election(request, election_id):
         return redirect('users_home')
 
     election = get_object_or_404(Election, id=election_id)
-    title = election.title
-    election.delete()
-    messages.warning(request, f"Election '{title}' has been deleted.")
+    job = schedule_deletion(election, requested_by=request.user)
+    _report_deletion(request, job, f"Election '{election.title}'")
     return redirect('admin_dashboard')
     
 @login_required
@@ -802,33 +863,57 @@ def admin_voter_management(request):
 
     search_query = request.GET.get('q', '')
     filter_status = request.GET.get('status', 'all')
+    voters, ranked = filter_voters(search_query, filter_status)
 
-    voters = Voter.objects.select_related('user').all().order_by('-user__created_at')
-
-    if search_query:
-        voters = voters.filter(
-            Q(user__username__icontains=search_query) |
-            Q(user__email__icontains=search_query) |
-            Q(voter_id__icontains=search_query) |
-            Q(mobile_no__icontains=search_query)
+    if ranked:
+        # Best matches first, in keyset pages on (rank, id)
+        page_obj = ranked_page(
+            status_voters(filter_status), search_query, settings.VOTER_SEARCH_RESULTS,
+            after=request.GET.get('after'), before=request.GET.get('before'),
+        )
+    else:
+        # Keyset pages cost the same at any depth; the total is cached per filter
+        page_obj = keyset_page(
+            voters, ('user__created_at', 'user_id'), 20,
+            after=request.GET.get('after'), before=request.GET.get('before'),
         )
-
-    if filter_status == 'verified':
-        voters = voters.filter(verification_status='verified')
-    elif filter_status == 'pending':
-        voters = voters.filter(verification_status='pending')
-
-    paginator = Paginator(voters, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
 
     return render(request, 'admin/manage_voters.html', {
         'voters': page_obj,
+        'verification_jobs': VerificationJob.objects.filter(status__in=['pending', 'running', 'failed'])[:5],
         'search_query': search_query,
         'filter_status': filter_status,
-        'total_count': voters.count()
+        'total_count': cached_count(voters, 'voters', search_query, filter_status),
     })
 
+@login_required
+def bulk_verify_voters_view(request):
+    if not (request.user.is_superuser or request.user.is_staff or getattr(request.user, 'role', '') == 'admin'):
+        messages.error(request, "Access Denied.")
+        return redirect('users_home')
+    if request.method != 'POST':
+        return redirect('admin_voter_management')
+
+    upload = request.FILES.get('voter_ids_file')
+    if upload:
+        try:
+            codes = parse_voter_codes(line.decode('utf-8') for line in upload)
+        except UnicodeDecodeError:
+            messages.error(request, "The voter ID list must be a UTF-8 text or CSV file.")
+            return redirect('admin_voter_management')
+        job = schedule_verification(request.user, voter_codes=codes)
+    else:
+        job = schedule_verification(
+            request.user, search_query=request.POST.get('q', ''), filter_status=request.POST.get('status', 'all'),
+        )
+    if job.status == 'done':
+        messages.success(request, f"Verified {job.verified} voter(s): {job.description}.")
+    elif job.status == 'failed':
+        messages.error(request, f"Could not verify {job.description}: {job.error}")
+    else:
+        messages.info(request, f"Verifying {job.description} in the background; progress is shown on this page.")
+    return redirect('admin_voter_management')
+
 @login_required
 def verify_voter(request, voter_id):
     if not (request.user.is_superuser or request.user.is_staff or getattr(request.user, 'role', '') == 'admin'):
@@ -839,8 +924,8 @@ def verify_voter(request, voter_id):
     voter.verification_date = timezone.now()
     voter.save()
     
-    Notification.objects.create(
-        voter=voter, 
+    notify(
+        voter,
         title="Account Verified",
         message="Your account has been verified. You can now vote.", 
         notification_type="verification"
@@ -855,25 +940,10 @@ def delete_voter(request, voter_id):
         messages.error(request, "Access Denied.")
         return redirect('users_home')
 
-    try:
-        with transaction.atomic():
-            voter = get_object_or_404(Voter, id=voter_id)
-            user = voter.user
-            username = user.username
-
-            Vote.objects.filter(voter=voter).delete()
-            Notification.objects.filter(voter=voter).delete()
-
-            LogEntry.objects.filter(user_id=user.pk).delete()
-            voter.delete()
-            user.delete()
-
-            messages.warning(request, f"Voter account for {username} successfully deleted.")
-
-    except Exception as e:
-        print(f"Delete Error: {e}") 
-        messages.error(request, f"Could not delete voter: {e}")
-    
+    voter = get_object_or_404(Voter.objects.select_related('user'), id=voter_id)
+    # Removes the voter's ballots, notifications and login account in chunks
+    job = schedule_deletion(voter, requested_by=request.user)
+    _report_deletion(request, job, f"Voter account for {voter.user.username}")
     return redirect(request.META.get('HTTP_REFERER', 'admin_voter_management'))
 
 
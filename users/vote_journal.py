@@ -0,0 +1,361 @@
+"""Write-behind ballot ingestion.
+
+When ``VOTE_INGESTION_MODE = 'journal'`` the vote view appends accepted
+ballots to a local journal file (fsync'd before the voter is answered)
+instead of inserting them one by one. The ``flush_vote_journal`` command
+rotates the journal into a segment and writes each segment to ``users.Vote``
+in ``bulk_create`` batches. Segments are only deleted once every batch has
+committed, so segments left behind by a crash are replayed on the next run.
+
+``accept`` group-commits: ballots arriving while another thread is writing
+queue up, and the next writer appends them all with a single fsync. It
+refuses a second ballot for an election while the first is still in the
+journal or already in the database, whichever session it came from. Known
+``(voter, election)`` pairs are kept in memory; each group reads only the
+journal bytes other processes appended since the last group, and makes one
+database query for the pairs it has not seen. A ballot that cannot be inserted (say its candidate was deleted meanwhile)
+goes to the ``votes.dead`` file with the reason, so it cannot hold back the
+ballots behind it.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to an in-process lock only
+    fcntl = None
+
+from audit.serializers import SERIALIZERS
+from audit.sink import record
+from .models import Vote, Notification, Election, Candidate, Voter
+from .services import increment_tally
+from .notifications import notify_many
+from .results_cache import invalidate_election
+
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_NAME = 'votes.journal'
+LOCK_NAME = 'votes.lock'
+DEAD_NAME = 'votes.dead'
+SEGMENT_SUFFIX = '.flushing'
+
+
+def journal_enabled():
+    return getattr(settings, 'VOTE_INGESTION_MODE', 'direct') == 'journal'
+
+
+class VoteJournal:
+    """Append-only ballot journal shared by every worker on this node."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.active_path = self.directory / ACTIVE_NAME
+        self.lock_path = self.directory / LOCK_NAME
+        self.dead_path = self.directory / DEAD_NAME
+        self._thread_lock = threading.Lock()
+        # ballots waiting for the next group commit, and the lock whose
+        # holder writes them
+        self._queue = []
+        self._queue_lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        # (voter, election) pairs known to be journalled or in the database
+        self._ballots = set()
+        # (name, inode) -> bytes already read into _ballots, for the files
+        # still waiting to be flushed; each file is append-only until it is
+        # rotated (a new inode) or flushed (gone), so only new bytes are read
+        self._offsets = {}
+
+    def _locked(self):
+        return _JournalLock(self)
+
+    def append(self, voter_id, candidate_id, election_id):
+        """Durably record one ballot. Returns once the entry is on disk."""
+        with self._locked():
+            self._write([(voter_id, candidate_id, election_id)])
+
+    def accept(self, voter_id, candidate_id, election_id):
+        """Journal the ballot unless the voter already has one for the election.
+
+        Returns once the ballot is fsync'd, or False for a duplicate.
+        """
+        ballot = _Ballot(voter_id, candidate_id, election_id)
+        with self._queue_lock:
+            self._queue.append(ballot)
+        # whoever gets the commit lock writes every ballot queued so far; the
+        # others find theirs already done when their turn comes
+        with self._commit_lock:
+            if not ballot.done:
+                self._commit()
+        if ballot.error is not None:
+            raise ballot.error
+        return ballot.accepted
+
+    def _commit(self):
+        with self._queue_lock:
+            group, self._queue = self._queue, []
+        try:
+            with self._locked():
+                # The database is checked after the journal files: a segment
+                # is only deleted once its ballots are committed, so a ballot
+                # is always found in one or the other.
+                self._catch_up()
+                unseen = {ballot.key for ballot in group} - self._ballots
+                if unseen:
+                    self._ballots |= _voted(unseen)
+                accepted, keys = [], set()
+                for ballot in group:
+                    if ballot.key not in self._ballots and ballot.key not in keys:
+                        keys.add(ballot.key)
+                        accepted.append(ballot)
+                if accepted:
+                    stat = self._write([ballot.fields for ballot in accepted])
+                    # _catch_up read the rest of the file under this lock, so
+                    # no need to read these lines back next time
+                    self._offsets[(ACTIVE_NAME, stat.st_ino)] = stat.st_size
+                self._ballots |= keys
+            for ballot in accepted:
+                ballot.accepted = True
+        except Exception as exc:
+            for ballot in group:
+                ballot.error = exc
+        finally:
+            for ballot in group:
+                ballot.done = True
+
+    def _write(self, ballots):
+        """Append ``(voter, candidate, election)`` ballots to the active journal with one fsync.
+
+        Returns the journal's ``os.stat_result`` after the write.
+        """
+        now = time.time()
+        lines = ''.join(
+            json.dumps({'voter': voter_id, 'candidate': candidate_id, 'election': election_id, 'ts': now}) + '\n'
+            for voter_id, candidate_id, election_id in ballots
+        )
+        with open(self.active_path, 'a', encoding='utf-8') as fh:
+            fh.write(lines)
+            fh.flush()
+            os.fsync(fh.fileno())
+            return os.fstat(fh.fileno())
+
+    def _catch_up(self):
+        """Add the ballots other processes journalled since the last call to ``_ballots``."""
+        offsets = {}
+        for path in self.segments() + [self.active_path]:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            key = (path.name, stat.st_ino)
+            offset = offsets[key] = self._offsets.get(key, 0)
+            if stat.st_size <= offset:
+                continue
+            with open(path, 'rb') as fh:
+                fh.seek(offset)
+                for line in fh:
+                    if not line.endswith(b'\n'):
+                        break
+                    offset += len(line)
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._ballots.add((entry['voter'], entry['election']))
+            offsets[key] = offset
+        self._offsets = offsets
+
+    def dead_letter(self, entry, reason):
+        """Set aside a ballot that cannot be inserted."""
+        logger.warning('Vote journal entry %r moved to %s: %s', entry, self.dead_path, reason)
+        with self._locked():
+            with open(self.dead_path, 'a', encoding='utf-8') as fh:
+                fh.write(json.dumps({**entry, 'error': str(reason)}) + '\n')
+                fh.flush()
+                os.fsync(fh.fileno())
+
+    def rotate(self):
+        """Move the active journal aside so it can be flushed."""
+        with self._locked():
+            if not self.active_path.exists() or self.active_path.stat().st_size == 0:
+                return None
+            segment = self.directory / f'votes.{time.time_ns()}{SEGMENT_SUFFIX}'
+            os.replace(self.active_path, segment)
+            return segment
+
+    def segments(self):
+        """Segments waiting to be flushed, oldest first."""
+        if not self.directory.exists():
+            return []
+        return sorted(self.directory.glob(f'votes.*{SEGMENT_SUFFIX}'))
+
+    @staticmethod
+    def read_segment(path):
+        with open(path, encoding='utf-8') as fh:
+            for line in fh:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A torn final line was never fsync'd, so the voter was
+                    # never told it was accepted.
+                    continue
+
+
+class _Ballot:
+    def __init__(self, voter_id, candidate_id, election_id):
+        self.fields = (voter_id, candidate_id, election_id)
+        self.key = (voter_id, election_id)
+        self.done = False
+        self.accepted = False
+        self.error = None
+
+
+def _voted(pairs):
+    """The ``(voter, election)`` pairs in ``pairs`` that already have a ``Vote`` row, in one query."""
+    rows = Vote.objects.filter(
+        voter_id__in={voter for voter, _ in pairs}, election_id__in={election for _, election in pairs},
+    ).values_list('voter_id', 'election_id')
+    return set(rows) & pairs
+
+
+class _JournalLock:
+    def __init__(self, journal):
+        self.journal = journal
+        self.fh = None
+
+    def __enter__(self):
+        self.journal._thread_lock.acquire()
+        self.journal.directory.mkdir(parents=True, exist_ok=True)
+        if fcntl is not None:
+            self.fh = open(self.journal.lock_path, 'a')
+            fcntl.flock(self.fh, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.fh is not None:
+            fcntl.flock(self.fh, fcntl.LOCK_UN)
+            self.fh.close()
+        self.journal._thread_lock.release()
+
+
+_journal = None
+
+
+def get_journal():
+    global _journal
+    directory = Path(getattr(settings, 'VOTE_JOURNAL_DIR', Path(settings.BASE_DIR) / 'vote_journal'))
+    if _journal is None or _journal.directory != directory:
+        _journal = VoteJournal(directory)
+    return _journal
+
+
+def _write_batch(entries, journal):
+    """Insert one batch of journalled ballots. Returns the number written."""
+    # Keep the first ballot per (voter, election), in journal order
+    batch = {}
+    for entry in entries:
+        batch.setdefault((entry['voter'], entry['election']), entry)
+    try:
+        written, missing = _insert(batch)
+    except DatabaseError:
+        # one bad entry must not hold back the rest: retry them one at a time
+        written, missing = 0, []
+        for key, entry in batch.items():
+            try:
+                added, gone = _insert({key: entry})
+            except DatabaseError as exc:
+                journal.dead_letter(entry, exc)
+                continue
+            written += added
+            missing += gone
+    for entry in missing:
+        journal.dead_letter(entry, 'voter, candidate or election no longer exists')
+    return written
+
+
+def _insert(batch):
+    """Write ``batch`` in one transaction. Returns ``(written, entries whose rows are gone)``."""
+    with transaction.atomic():
+        already = set(
+            Vote.objects.filter(
+                voter_id__in={voter for voter, _ in batch},
+                election_id__in={election for _, election in batch},
+            ).values_list('voter_id', 'election_id')
+        )
+        fresh = [entry for key, entry in batch.items() if key not in already]
+        if not fresh:
+            return 0, []
+
+        # SQLite only checks foreign keys at commit, so look them up first
+        titles = dict(
+            Election.objects.filter(pk__in={e['election'] for e in fresh}).values_list('pk', 'title')
+        )
+        voters = set(Voter.objects.filter(pk__in={e['voter'] for e in fresh}).values_list('pk', flat=True))
+        candidates = set(Candidate.objects.filter(pk__in={e['candidate'] for e in fresh}).values_list('pk', flat=True))
+        missing = [
+            e for e in fresh
+            if e['election'] not in titles or e['voter'] not in voters or e['candidate'] not in candidates
+        ]
+        gone = {(e['voter'], e['election']) for e in missing}
+        fresh = [e for e in fresh if (e['voter'], e['election']) not in gone]
+        if not fresh:
+            return 0, missing
+
+        votes = Vote.objects.bulk_create([
+            Vote(voter_id=e['voter'], candidate_id=e['candidate'], election_id=e['election'])
+            for e in fresh
+        ])
+        # one F() increment per candidate rather than per ballot
+        per_candidate = Counter((e['election'], e['candidate']) for e in fresh)
+        for (election_id, candidate_id), added in per_candidate.items():
+            increment_tally(election_id, candidate_id, by=added)
+        notify_many([
+            Notification(
+                voter_id=e['voter'], title="Vote Submitted",
+                message=f"You voted in {titles.get(e['election'], 'the election')}.",
+                notification_type="vote_confirmation", election_id=e['election'],
+            )
+            for e in fresh
+        ])
+        # bulk_create skips post_save, so record the audit trail explicitly
+        audit_entries = [SERIALIZERS['users.Vote'].entry(vote, 'create') for vote in votes]
+        for audit_entry in audit_entries:
+            audit_entry['details']['source'] = 'journal'
+        record(audit_entries)
+    for election_id in {e['election'] for e in fresh}:
+        invalidate_election(election_id)
+    return len(fresh), missing
+
+
+def flush_journal(journal=None, batch_size=None):
+    """Rotate the journal and flush every pending segment to the database.
+
+    Returns ``(read, written)``: ballots read from the journal and ballots
+    actually inserted (replayed or duplicate ballots are skipped).
+    """
+    journal = journal or get_journal()
+    batch_size = batch_size or getattr(settings, 'VOTE_JOURNAL_BATCH_SIZE', 500)
+    journal.rotate()
+
+    read = written = 0
+    for segment in journal.segments():
+        batch = []
+        for entry in journal.read_segment(segment):
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                written += _write_batch(batch, journal)
+                read += len(batch)
+                batch = []
+        if batch:
+            written += _write_batch(batch, journal)
+            read += len(batch)
+        segment.unlink()
+    return read, written
@@ -4,4 +4,5 @@ from .models import Vote
 @admin.register(Vote)
 class VoteAdmin(admin.ModelAdmin):
     list_display = ('voter', 'election', 'candidate', 'voted_at')
+    list_select_related = ('voter', 'election', 'candidate__party')
     list_filter = ('election',)